@@ -0,0 +1,93 @@
+"""
+活动匹配 - 基于Aho-Corasick自动机的活动关键词识别
+
+自动机由活动分类列表构建一次，之后每次匹配只需遍历一遍文本，
+与活动数量无关。匹配语义为"最早出现、同位置取最长"，
+因此"学习"不会遮蔽从同一位置开始的更具体的活动名。
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+class ActivityMatcher:
+    """活动关键词的Aho-Corasick自动机"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: Tuple[str, ...] = tuple(sorted({kw for kw in keywords if kw}))
+        self._max_len = max((len(kw) for kw in self.keywords), default=0)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]  # 在该状态结束的关键词长度
+        self._build()
+
+    def _build(self):
+        for keyword in self.keywords:
+            node = 0
+            for ch in keyword:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (len(keyword),)
+
+        # 按BFS顺序计算失败指针，并合并失败链上的输出
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] += self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """遍历文本中所有关键词出现 (起始位置, 关键词)，按结束位置排序"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length in out[node]:
+                start = i - length + 1
+                yield start, text[start:i + 1]
+
+    def find(self, text: str) -> Optional[str]:
+        """最早出现的关键词，同一起始位置取最长；无匹配时返回 None"""
+        best: Optional[Tuple[int, str]] = None
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            # 之后的匹配起始位置不可能早于当前最优
+            if best is not None and i - self._max_len + 1 > best[0]:
+                break
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length in out[node]:
+                start = i - length + 1
+                if best is None or start < best[0] or (start == best[0] and length > len(best[1])):
+                    best = (start, text[start:i + 1])
+        return best[1] if best else None
+
+    def find_all(self, text: str) -> List[str]:
+        """按"最早出现、同位置取最长"规则切分出的所有不重叠关键词"""
+        longest: Dict[int, str] = {}
+        for start, keyword in self.iter_matches(text):
+            if len(keyword) > len(longest.get(start, '')):
+                longest[start] = keyword
+
+        result = []
+        covered = 0
+        for start in sorted(longest):
+            if start >= covered:
+                result.append(longest[start])
+                covered = start + len(longest[start])
+        return result
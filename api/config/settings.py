@@ -38,6 +38,61 @@ class Settings(BaseSettings):
     claude_model: str = Field(default="claude-3-5-sonnet-20241022", description="Claude模型")
     claude_max_tokens: int = Field(default=1000, description="Claude最大令牌数")
     claude_temperature: float = Field(default=0.1, description="Claude温度参数")
+    claude_batch_size: int = Field(default=20, description="批量解析时每次Claude请求的最大条数")
+    claude_batch_token_budget: int = Field(default=4000, description="批量解析时每次Claude请求的输出token预算")
+    
+    # 外部HTTP连接池配置（Notion / Claude客户端进程内共享）
+    http_max_connections: int = Field(default=20, description="HTTP连接池最大连接数")
+    http_max_keepalive_connections: int = Field(default=10, description="HTTP连接池最大保活连接数")
+    http_keepalive_expiry: float = Field(default=30.0, description="空闲保活连接过期时间(秒)")
+    notion_io_workers: int = Field(default=8, description="Notion/解析等阻塞调用的线程池大小")
+    batch_concurrency: int = Field(default=8, description="批量创建时间记录的最大并发条目数")
+    
+    # Notion请求限流与重试（进程内共享；多worker部署时按worker数分摊配额）
+    notion_rate_limit: float = Field(default=3.0, description="Notion请求速率上限(次/秒)，<=0不限流")
+    notion_rate_burst: int = Field(default=3, description="Notion请求允许的最大突发数")
+    notion_max_retries: int = Field(default=5, description="Notion 429/5xx 最大重试次数")
+    pagination_cache_ttl: int = Field(default=300, description="记录列表游标/总数缓存有效期(秒)")
+    
+    # 写后日志配置（开启后创建时间记录先落盘本地日志即返回，后台再写入Notion）
+    write_behind_enabled: bool = Field(default=False, description="是否启用写后日志")
+    write_journal_path: str = Field(default="write_journal.jsonl", description="写后日志文件路径")
+    write_journal_flush_interval: float = Field(default=5.0, description="写后日志重试间隔(秒)")
+    write_journal_marker_property: str = Field(
+        default="",
+        description="时间记录数据库中保存写后日志临时ID的文本属性名（用于对账去重），为空时按Task标题与开始时间对账"
+    )
+    
+    # 本地镜像配置（mirror_db_path为空时直接读取Notion）
+    mirror_db_path: str = Field(default="", description="Notion本地SQLite镜像路径")
+    mirror_sync_interval: int = Field(default=60, description="镜像增量同步间隔(秒)，超过3个间隔未成功同步时读路径回退到Notion")
+    mirror_full_sync_interval: int = Field(default=3600, description="镜像全量同步间隔(秒)，用于清理外部归档的页面")
+    
+    # 目标缓存配置
+    goal_ledger_ttl: int = Field(default=600, description="目标实际投入时间累计的有效期(秒)")
+    active_goals_cache_ttl: int = Field(default=300, description="活跃目标列表缓存有效期(秒)")
+    
+    # 报告预聚合配置（按 日期×小时×分类×活动 累计的时长）
+    time_cube_ttl: int = Field(default=600, description="预聚合数据的有效期(秒)，过期后从数据源重建")
+    time_cube_max_days: int = Field(default=800, description="预聚合数据最多保留的天数")
+    summary_cache_ttl: int = Field(default=30, description="概览统计结果缓存有效期(秒)")
+    report_cache_open_ttl: int = Field(default=60, description="进行中周期（含今天）的报告缓存有效期(秒)")
+    report_cache_max_age: int = Field(default=86400, description="已结束周期报告的HTTP缓存max-age(秒)")
+    
+    # 解析结果缓存配置（parse_cache_path为空时仅在进程内缓存；与CLI配置同一路径即可共享）
+    parse_cache_path: str = Field(default="", description="解析结果缓存SQLite路径")
+    parse_cache_max_entries: int = Field(default=5000, description="解析结果缓存最大条目数")
+    
+    # 分级解析管线配置
+    parse_pipeline: str = Field(default="rules,cache,claude", description="解析级别顺序")
+    parse_rules_min_confidence: float = Field(default=0.9, description="规则引擎结果的最低采用置信度")
+    parse_cache_min_confidence: float = Field(default=0.0, description="缓存结果的最低采用置信度")
+    parse_claude_min_confidence: float = Field(default=0.0, description="Claude结果的最低采用置信度")
+    
+    # 后台导出任务配置（Excel导出需安装openpyxl，Parquet导出需安装pyarrow）
+    export_spool_dir: str = Field(default="exports", description="导出产物暂存目录")
+    export_workers: int = Field(default=2, description="同时执行的导出任务数")
+    export_artifact_ttl: int = Field(default=3600, description="导出产物保留时间(秒)，期间相同的已结束日期范围请求直接复用")
     
     # 系统配置
     timezone: str = Field(default="Asia/Shanghai", description="时区")
@@ -3,6 +3,7 @@ SimpleTimeTracker FastAPI Application
 主应用程序入口
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -16,10 +17,23 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from api.config.settings import get_settings
 from api.routes import auth, goals, time_records, reports, notion, dashboard
 from api.middleware.auth import JWTMiddleware
+from api.services.time_agent_service import TimeAgentService
 
 # 加载配置
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时创建共享服务和后台任务，关闭时停止任务并释放连接池"""
+    service = TimeAgentService(settings)
+    app.state.time_agent_service = service
+    service.start()
+    try:
+        yield
+    finally:
+        await service.stop()
+        service.close()
+
 # 创建FastAPI应用
 app = FastAPI(
     title="SimpleTimeTracker API",
@@ -27,6 +41,7 @@ app = FastAPI(
     version="2.1.0",
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    lifespan=lifespan,
 )
 
 # CORS中间件配置
@@ -67,14 +82,18 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 # 健康检查端点
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """健康检查"""
     return {
         "success": True,
         "data": {
             "status": "healthy",
             "version": "2.1.0",
-            "service": "SimpleTimeTracker API"
+            "service": "SimpleTimeTracker API",
+            "caches": request.app.state.time_agent_service.cache_stats(),
+            "notion": request.app.state.time_agent_service.notion_stats(),
+            "write_journal": request.app.state.time_agent_service.journal_stats(),
+            "export_jobs": request.app.state.time_agent_service.export_jobs.stats()
         }
     }
 
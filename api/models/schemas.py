@@ -29,6 +29,7 @@ class CategoryEnum(str, Enum):
 class ParsingMethodEnum(str, Enum):
     CLAUDE = "Claude"
     RULES = "Rules"
+    CACHE = "Cache"
 
 # =============== 基础响应模型 ===============
 
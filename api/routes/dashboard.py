@@ -4,11 +4,12 @@
 
 from fastapi import APIRouter, HTTPException, status, Depends
 from typing import Optional
-from datetime import date
+import asyncio
 import logging
 
 from api.models.schemas import ApiResponse
-from api.services.time_agent_service import TimeAgentService
+from api.services.time_agent_service import TimeAgentService, get_time_agent_service
+from api.services.time_cube import efficiency_rate
 from api.middleware.auth import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -16,47 +17,37 @@ router = APIRouter()
 
 @router.get("/today-overview", response_model=ApiResponse)
 async def get_today_overview(
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """获取今日概览数据"""
     try:
-        service = TimeAgentService()
-        today = date.today()
+        today = service.today()
         
-        # 获取今日时间记录
-        records, total_records = await service.get_time_records(
-            target_date=today,
-            limit=100  # 获取今天所有记录
+        # 并发获取今日最近记录、今日汇总和活跃目标（三者的Notion I/O互不依赖）
+        (records, total_records, _), totals, active_goals = await asyncio.gather(
+            service.get_time_records(target_date=today, limit=5),
+            service.aggregate_range(today, today),
+            service.get_active_goals(today)
         )
         
         # 计算今日总时长
-        total_duration = sum(record.duration for record in records)
+        total_duration = round(totals.minutes)
         
         # 获取活跃目标数量
-        active_goals = await service.get_active_goals(today)
         active_goals_count = len(active_goals)
         
         # 计算分类分布
-        category_breakdown = {}
-        for record in records:
-            category = record.category
-            if category not in category_breakdown:
-                category_breakdown[category] = 0
-            category_breakdown[category] += record.duration
+        category_breakdown = {category: round(minutes) for category, minutes in totals.by_category.items()}
         
         # 计算今日效率（生产+投资类别占比）
-        productive_time = category_breakdown.get("生产", 0) + category_breakdown.get("投资", 0)
-        efficiency_rate = (productive_time / total_duration * 100) if total_duration > 0 else 0
+        efficiency = efficiency_rate(category_breakdown, total_duration)
         
         # 获取热门活动（前3个）
-        activity_stats = {}
-        for record in records:
-            activity = record.activity
-            if activity not in activity_stats:
-                activity_stats[activity] = 0
-            activity_stats[activity] += record.duration
-        
-        top_activities = sorted(activity_stats.items(), key=lambda x: x[1], reverse=True)[:3]
+        top_activities = sorted(
+            ((activity, round(minutes)) for activity, minutes in totals.by_activity.items()),
+            key=lambda x: x[1], reverse=True
+        )[:3]
         
         # 获取有进度的目标
         goals_with_progress = [goal for goal in active_goals if goal.actual_time > 0]
@@ -65,7 +56,7 @@ async def get_today_overview(
             "today_records": total_records,
             "today_duration": total_duration,
             "active_goals": active_goals_count,
-            "efficiency_rate": round(efficiency_rate, 1),
+            "efficiency_rate": efficiency,
             "category_breakdown": category_breakdown,
             "top_activities": [
                 {"activity": activity, "duration": duration}
@@ -89,15 +80,15 @@ async def get_today_overview(
 
 @router.get("/weekly-summary", response_model=ApiResponse)
 async def get_weekly_summary(
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """获取本周汇总数据"""
     try:
-        service = TimeAgentService()
-        today = date.today()
+        today = service.today()
         
         # 获取本周报告
-        weekly_report = await service.generate_weekly_report(today)
+        weekly_report = (await service.weekly_report(today)).value
         
         # 提取关键指标
         summary_data = {
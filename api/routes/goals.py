@@ -10,7 +10,7 @@ import logging
 from api.models.schemas import (
     ApiResponse, Goal, GoalCreate, GoalUpdate, GoalListResponse
 )
-from api.services.time_agent_service import TimeAgentService
+from api.services.time_agent_service import TimeAgentService, get_time_agent_service
 from api.middleware.auth import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -20,12 +20,11 @@ router = APIRouter()
 async def get_goals(
     status_filter: Optional[str] = Query(None, alias="status", description="状态过滤"),
     deadline: Optional[date] = Query(None, description="截止日期过滤"),
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """获取目标列表"""
     try:
-        service = TimeAgentService()
-        
         # 获取活跃目标
         goals = await service.get_active_goals()
         
@@ -65,11 +64,11 @@ async def get_goals(
 @router.post("", response_model=ApiResponse)
 async def create_goal(
     goal_data: GoalCreate,
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """创建目标"""
     try:
-        service = TimeAgentService()
         goal = await service.create_goal(goal_data)
         
         return ApiResponse(
@@ -126,11 +125,11 @@ async def get_goal(
 async def update_goal(
     goal_id: str,
     goal_data: GoalUpdate,
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """更新目标"""
     try:
-        service = TimeAgentService()
         goal = await service.update_goal(goal_id, goal_data)
         
         return ApiResponse(
@@ -153,11 +152,11 @@ async def update_goal(
 @router.delete("/{goal_id}", response_model=ApiResponse)
 async def delete_goal(
     goal_id: str,
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """删除目标"""
     try:
-        service = TimeAgentService()
         success = await service.delete_goal(goal_id)
         
         if not success:
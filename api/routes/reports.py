@@ -2,7 +2,8 @@
 报告统计API路由
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from typing import Optional
 from datetime import date
 import logging
@@ -10,7 +11,10 @@ import logging
 from api.models.schemas import (
     ApiResponse, DailyReport, WeeklyReport
 )
-from api.services.time_agent_service import TimeAgentService
+from api.services.time_agent_service import TimeAgentService, get_time_agent_service
+from api.services.export import STREAM_FORMATS
+from api.services.export_jobs import FILE_FORMATS
+from api.services.report_cache import CachedReport
 from api.middleware.auth import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -18,18 +22,15 @@ router = APIRouter()
 
 @router.get("/daily", response_model=ApiResponse)
 async def get_daily_report(
+    request: Request,
     target_date: Optional[date] = Query(None, description="目标日期，默认今天"),
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """获取日报数据"""
     try:
-        service = TimeAgentService()
-        report = await service.generate_daily_report(target_date)
-        
-        return ApiResponse(
-            success=True,
-            data=report.model_dump(mode='json')
-        )
+        report = await service.daily_report(target_date)
+        return _cached_report_response(request, report, service.settings.report_cache_max_age)
         
     except Exception as e:
         logger.error(f"生成日报失败: {e}")
@@ -40,18 +41,15 @@ async def get_daily_report(
 
 @router.get("/weekly", response_model=ApiResponse)
 async def get_weekly_report(
+    request: Request,
     week_date: Optional[date] = Query(None, description="周内任意日期，默认本周"),
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """获取周报数据"""
     try:
-        service = TimeAgentService()
-        report = await service.generate_weekly_report(week_date)
-        
-        return ApiResponse(
-            success=True,
-            data=report.model_dump(mode='json')
-        )
+        report = await service.weekly_report(week_date)
+        return _cached_report_response(request, report, service.settings.report_cache_max_age)
         
     except Exception as e:
         logger.error(f"生成周报失败: {e}")
@@ -60,38 +58,30 @@ async def get_weekly_report(
             detail="生成周报失败"
         )
 
+def _cached_report_response(request: Request, report: CachedReport, max_age: int) -> Response:
+    """带 ETag / Cache-Control 的报告响应；If-None-Match 命中时返回304
+    
+    已结束的周期允许客户端缓存 max_age 秒；进行中的周期每次都需用 ETag 重新验证。
+    """
+    headers = {
+        "ETag": report.etag,
+        "Cache-Control": f"private, max-age={max_age}" if report.closed else "private, no-cache"
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or report.etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    body = ApiResponse(success=True, data=report.value.model_dump(mode='json'))
+    return JSONResponse(content=body.model_dump(mode='json'), headers=headers)
+
 @router.get("/summary", response_model=ApiResponse)
 async def get_summary_stats(
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """获取概览统计数据"""
     try:
-        # TODO: 实现概览统计逻辑
-        summary_data = {
-            "today_duration": 240,
-            "week_duration": 1800,
-            "month_duration": 7200,
-            "active_goals": 5,
-            "completed_goals_this_week": 2,
-            "avg_daily_efficiency": 45.5,
-            "top_activities": [
-                {"activity": "编程", "duration": 180, "percentage": 30.0},
-                {"activity": "学习", "duration": 150, "percentage": 25.0},
-                {"activity": "运动", "duration": 90, "percentage": 15.0}
-            ],
-            "recent_achievements": [
-                {
-                    "date": "2025-07-27",
-                    "title": "完成Python基础学习",
-                    "type": "goal_completed"
-                },
-                {
-                    "date": "2025-07-26", 
-                    "title": "连续7天记录时间",
-                    "type": "streak"
-                }
-            ]
-        }
+        summary_data = await service.generate_summary()
         
         return ApiResponse(
             success=True,
@@ -108,42 +98,12 @@ async def get_summary_stats(
 @router.get("/trends", response_model=ApiResponse)
 async def get_trend_data(
     days: int = Query(7, ge=1, le=90, description="天数范围"),
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """获取趋势数据"""
     try:
-        # TODO: 实现趋势数据逻辑
-        trend_data = {
-            "period": f"past_{days}_days",
-            "daily_efficiency": [
-                {"date": "2025-07-21", "efficiency": 42.5},
-                {"date": "2025-07-22", "efficiency": 55.0},
-                {"date": "2025-07-23", "efficiency": 38.5},
-                {"date": "2025-07-24", "efficiency": 48.0},
-                {"date": "2025-07-25", "efficiency": 52.5},
-                {"date": "2025-07-26", "efficiency": 45.0},
-                {"date": "2025-07-27", "efficiency": 58.5}
-            ],
-            "category_trends": {
-                "生产": [30, 35, 25, 40, 45, 38, 42],
-                "投资": [25, 30, 20, 35, 28, 32, 38],
-                "支出": [15, 12, 18, 10, 8, 15, 12]
-            },
-            "activity_distribution": [
-                {"activity": "编程", "percentage": 28.5},
-                {"activity": "学习", "percentage": 22.3},
-                {"activity": "运动", "percentage": 15.2},
-                {"activity": "阅读", "percentage": 12.8},
-                {"activity": "其他", "percentage": 21.2}
-            ],
-            "peak_hours": [
-                {"hour": 9, "productivity": 85},
-                {"hour": 10, "productivity": 92},
-                {"hour": 14, "productivity": 78},
-                {"hour": 15, "productivity": 88},
-                {"hour": 20, "productivity": 75}
-            ]
-        }
+        trend_data = await service.generate_trends(days)
         
         return ApiResponse(
             success=True,
@@ -157,36 +117,91 @@ async def get_trend_data(
             detail="获取趋势数据失败"
         )
 
-@router.get("/export", response_model=ApiResponse)
+@router.get("/export")
 async def export_data(
+    request: Request,
     start_date: date = Query(..., description="开始日期"),
     end_date: date = Query(..., description="结束日期"),
-    format_type: str = Query("json", regex="^(json|csv|excel)$", description="导出格式"),
+    format_type: str = Query("json", regex="^(json|csv|ndjson|excel|parquet)$", description="导出格式"),
+    background: bool = Query(False, description="是否作为后台任务导出（Excel/Parquet总是后台导出）"),
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
-    """导出数据"""
-    try:
-        # TODO: 实现数据导出逻辑
-        export_info = {
-            "export_id": f"export_{start_date}_{end_date}_{format_type}",
-            "start_date": start_date,
-            "end_date": end_date,
-            "format": format_type,
-            "status": "processing",
-            "download_url": None,  # 处理完成后提供下载链接
-            "estimated_completion": "2025-07-28T11:05:00Z"
-        }
+    """导出数据
+    
+    默认格式仍为 json。CSV/NDJSON/JSON默认流式返回（边从Notion分页读取边输出，内存占用与范围大小无关）；
+    Excel/Parquet或 background=true 时提交后台任务，返回任务信息，完成后通过 download_url 下载。
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始日期不能晚于结束日期"
+        )
+    
+    if background or format_type in FILE_FORMATS:
+        try:
+            job = service.export_jobs.submit(start_date, end_date, format_type)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         
         logger.info(f"开始导出数据: {start_date} - {end_date} ({format_type})")
-        
         return ApiResponse(
             success=True,
-            data=export_info
+            data=job.to_dict(_download_url(request, job.id))
         )
-        
-    except Exception as e:
-        logger.error(f"导出数据失败: {e}")
+    
+    media_type, extension = STREAM_FORMATS[format_type]
+    filename = f"time_records_{start_date}_{end_date}.{extension}"
+    return StreamingResponse(
+        service.export_records(start_date, end_date, format_type),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/export/jobs/{export_id}", response_model=ApiResponse)
+async def get_export_job(
+    export_id: str,
+    request: Request,
+    service: TimeAgentService = Depends(get_time_agent_service),
+    current_user: dict = Depends(get_current_user)
+):
+    """查询后台导出任务进度"""
+    job = service.export_jobs.get(export_id)
+    if not job:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="导出数据失败"
-        )
\ No newline at end of file
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="导出任务不存在或已过期"
+        )
+    
+    return ApiResponse(
+        success=True,
+        data=job.to_dict(_download_url(request, job.id))
+    )
+
+@router.get("/export/jobs/{export_id}/download", name="download_export")
+async def download_export(
+    export_id: str,
+    service: TimeAgentService = Depends(get_time_agent_service),
+    current_user: dict = Depends(get_current_user)
+):
+    """下载已完成的导出产物"""
+    job = service.export_jobs.get(export_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="导出任务不存在或已过期"
+        )
+    if job.status != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"导出任务尚未完成: {job.status}"
+        )
+    
+    return FileResponse(
+        job.path,
+        media_type=service.export_jobs.media_type(job),
+        filename=service.export_jobs.filename(job)
+    )
+
+def _download_url(request: Request, export_id: str) -> str:
+    return str(request.url_for("download_export", export_id=export_id))
@@ -11,7 +11,8 @@ import logging
 from api.models.schemas import (
     ApiResponse, TimeRecord, TimeRecordCreate, TimeRecordUpdate, TimeRecordListResponse
 )
-from api.services.time_agent_service import TimeAgentService
+from api.services.time_agent_service import TimeAgentService, get_time_agent_service
+from api.services.pagination import decode_cursor
 from api.middleware.auth import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -20,11 +21,11 @@ router = APIRouter()
 @router.post("", response_model=ApiResponse)
 async def create_time_record(
     record_data: TimeRecordCreate,
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """创建时间记录"""
     try:
-        service = TimeAgentService()
         record = await service.create_time_record(record_data)
         
         return ApiResponse(
@@ -49,17 +50,24 @@ async def get_time_records(
     target_date: Optional[date] = Query(None, description="目标日期"),
     limit: int = Query(20, ge=1, le=100, description="每页数量"),
     offset: int = Query(0, ge=0, description="偏移量"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor，优先于offset）"),
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """获取时间记录列表"""
     try:
-        service = TimeAgentService()
-        records, total = await service.get_time_records(
+        records, total, next_cursor = await service.get_time_records(
             target_date=target_date,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
         
+        # 游标分页时页码按游标中记录的偏移量计算（与当前limit不对齐时无法确定页码）
+        if cursor:
+            _, offset, _ = decode_cursor(cursor)
+        page = offset // limit + 1 if offset % limit == 0 else None
+        
         # 计算总时长
         total_duration = sum(record.duration for record in records)
         
@@ -73,12 +81,18 @@ async def get_time_records(
             success=True,
             data=response_data.model_dump(),
             meta={
-                "page": offset // limit + 1,
+                "page": page,
                 "limit": limit,
-                "total": total
+                "total": total,
+                "next_cursor": next_cursor
             }
         )
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"获取时间记录失败: {e}")
         raise HTTPException(
@@ -89,11 +103,11 @@ async def get_time_records(
 @router.get("/{record_id}", response_model=ApiResponse)
 async def get_time_record(
     record_id: str,
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """获取单个时间记录详情"""
     try:
-        service = TimeAgentService()
         record = await service.get_time_record(record_id)
         
         if not record:
@@ -120,12 +134,11 @@ async def get_time_record(
 async def update_time_record(
     record_id: str,
     record_data: TimeRecordUpdate,
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """更新时间记录"""
     try:
-        service = TimeAgentService()
-        
         # 构建更新数据
         update_data = {}
         if record_data.start_time:
@@ -183,11 +196,11 @@ async def update_time_record(
 @router.delete("/{record_id}", response_model=ApiResponse)
 async def delete_time_record(
     record_id: str,
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """删除时间记录"""
     try:
-        service = TimeAgentService()
         success = await service.delete_time_record(record_id)
         
         if not success:
@@ -213,29 +226,18 @@ async def delete_time_record(
 @router.post("/batch", response_model=ApiResponse)
 async def create_batch_time_records(
     records_data: list[TimeRecordCreate],
+    service: TimeAgentService = Depends(get_time_agent_service),
     current_user: dict = Depends(get_current_user)
 ):
     """批量创建时间记录"""
     try:
-        service = TimeAgentService()
-        created_records = []
-        failed_records = []
-        
-        for i, record_data in enumerate(records_data):
-            try:
-                record = await service.create_time_record(record_data)
-                created_records.append(record)
-            except Exception as e:
-                failed_records.append({
-                    "index": i,
-                    "input_text": record_data.input_text,
-                    "error": str(e)
-                })
+        # 条目并发处理，结果按请求中的下标排序
+        created_records, failed_records = await service.create_time_records_batch(records_data)
         
         response_data = {
             "created_count": len(created_records),
             "failed_count": len(failed_records),
-            "created_records": [record.model_dump() for record in created_records],
+            "created_records": [{"index": index, **record.model_dump()} for index, record in created_records],
             "failed_records": failed_records
         }
         
@@ -0,0 +1,76 @@
+"""
+数据导出 - 把时间记录流编码为CSV / NDJSON / JSON字节流
+
+记录逐条编码、按块输出，内存占用与导出范围大小无关；
+上游按游标分页读取，第一块数据在最后一页取回之前即可发出。
+"""
+
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List
+
+from api.models.schemas import TimeRecord
+
+# 导出列（顺序即CSV列顺序）
+EXPORT_COLUMNS: List[str] = [
+    "id", "start_time", "end_time", "duration", "activity", "category", "description", "created_at"
+]
+
+# 格式 -> (媒体类型, 文件扩展名)
+STREAM_FORMATS: Dict[str, tuple] = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "json": ("application/json", "json")
+}
+
+def export_row(record: TimeRecord) -> Dict[str, Any]:
+    """导出用的扁平字段（时间为ISO格式字符串）"""
+    data = record.model_dump(mode="json", include=set(EXPORT_COLUMNS))
+    return {column: data.get(column) for column in EXPORT_COLUMNS}
+
+async def encode_records(
+    records: AsyncIterator[TimeRecord],
+    format_type: str,
+    chunk_rows: int = 200
+) -> AsyncIterator[bytes]:
+    """把记录流编码为指定格式的字节块
+
+    Args:
+        records: 时间记录异步迭代器
+        format_type: csv / ndjson / json
+        chunk_rows: 每块包含的最大行数（第一条记录单独成块，尽早发出首字节）
+    """
+    if format_type not in STREAM_FORMATS:
+        raise ValueError(f"不支持的导出格式: {format_type}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if format_type == "csv" else None
+    if writer:
+        # 带BOM，Excel打开时可正确识别UTF-8中文
+        buffer.write("\ufeff")
+        writer.writerow(EXPORT_COLUMNS)
+    elif format_type == "json":
+        buffer.write("[")
+
+    rows = 0
+    async for record in records:
+        row = export_row(record)
+        if writer:
+            writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        elif format_type == "ndjson":
+            buffer.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            buffer.write(("," if rows else "") + json.dumps(row, ensure_ascii=False))
+        rows += 1
+
+        if rows == 1 or rows % chunk_rows == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if format_type == "json":
+        buffer.write("]")
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
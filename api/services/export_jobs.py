@@ -0,0 +1,352 @@
+"""
+后台导出任务 - 进程内任务队列 + 工作协程，产物写入本地暂存目录
+
+长时间范围或需要整文件写出的格式（Excel / Parquet）不适合在请求内流式返回。
+任务提交后立即返回任务信息，工作协程按游标分页读取记录并分批写入暂存文件，
+阻塞的文件写入在线程池中执行；客户端轮询进度，完成后下载产物。
+相同参数的请求复用进行中的任务；已完成的产物只对已结束的日期范围（不含今天）复用，
+范围包含今天或以后时之后还可能有新记录，重新导出。
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from api.models.schemas import TimeRecord
+from api.services.export import EXPORT_COLUMNS, STREAM_FORMATS, encode_records
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# 列式格式 -> (媒体类型, 文件扩展名)
+FILE_FORMATS: Dict[str, tuple] = {
+    "excel": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet")
+}
+JOB_FORMATS: Dict[str, tuple] = {**STREAM_FORMATS, **FILE_FORMATS}
+
+ARTIFACT_PREFIX = "export_"
+
+def format_available(format_type: str) -> bool:
+    """导出格式是否可用（Excel/Parquet 依赖可选的 openpyxl / pyarrow）"""
+    if format_type == "excel":
+        return openpyxl is not None
+    if format_type == "parquet":
+        return pa is not None
+    return format_type in STREAM_FORMATS
+
+@dataclass
+class ExportJob:
+    """一个导出任务"""
+    id: str
+    start_date: date
+    end_date: date
+    format_type: str
+    status: str = "queued"  # queued / running / completed / failed
+    rows: int = 0
+    progress: float = 0.0   # 0-1，按已读取到的记录日期估算
+    path: Optional[str] = None
+    size: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def key(self) -> Tuple[date, date, str]:
+        return self.start_date, self.end_date, self.format_type
+
+    def estimated_completion(self) -> Optional[datetime]:
+        """按当前进度线性外推的完成时间"""
+        if self.finished_at:
+            return datetime.fromtimestamp(self.finished_at, timezone.utc)
+        if not self.started_at or self.progress <= 0:
+            return None
+        elapsed = time.time() - self.started_at
+        return datetime.fromtimestamp(self.started_at + elapsed / self.progress, timezone.utc)
+
+    def to_dict(self, download_url: Optional[str] = None) -> Dict[str, Any]:
+        estimated = self.estimated_completion()
+        return {
+            "export_id": self.id,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "format": self.format_type,
+            "status": self.status,
+            "progress": round(self.progress * 100, 1),
+            "rows": self.rows,
+            "size": self.size,
+            "error": self.error,
+            "download_url": download_url if self.status == "completed" else None,
+            "estimated_completion": estimated.isoformat() if estimated else None
+        }
+
+class _ExcelWriter:
+    """openpyxl 只写模式，行数据先落到临时文件，内存占用与行数无关"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("时间记录")
+        self.sheet.append(EXPORT_COLUMNS)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            # Excel不支持带时区的时间，按记录自身的偏移写入本地时间
+            self.sheet.append([
+                value.replace(tzinfo=None) if isinstance(value, datetime) else value
+                for value in (row[column] for column in EXPORT_COLUMNS)
+            ])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+    def abort(self):
+        """放弃写入，释放只写模式的临时文件"""
+        self.workbook.close()
+
+class _ParquetWriter:
+    """每批记录写成一个行组"""
+
+    def __init__(self, path: str):
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("start_time", pa.timestamp("us", tz="UTC")),
+            ("end_time", pa.timestamp("us", tz="UTC")),
+            ("duration", pa.int32()),
+            ("activity", pa.string()),
+            ("category", pa.string()),
+            ("description", pa.string()),
+            ("created_at", pa.timestamp("us", tz="UTC"))
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        columns = {column: [row[column] for row in rows] for column in EXPORT_COLUMNS}
+        self.writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+    def abort(self):
+        """放弃写入，关闭文件句柄（残留文件由调用方删除）"""
+        self.writer.close()
+
+_FILE_WRITERS = {"excel": _ExcelWriter, "parquet": _ParquetWriter}
+
+def _record_values(record: TimeRecord) -> Dict[str, Any]:
+    """列式格式使用的原始类型字段（时间为datetime，分类为字符串）"""
+    return {
+        "id": record.id,
+        "start_time": record.start_time,
+        "end_time": record.end_time,
+        "duration": record.duration,
+        "activity": record.activity,
+        "category": getattr(record.category, "value", record.category),
+        "description": record.description,
+        "created_at": record.created_at
+    }
+
+class ExportJobManager:
+    """导出任务队列"""
+
+    def __init__(
+        self,
+        records: Callable[[date, date], AsyncIterator[TimeRecord]],
+        run_blocking: Callable[..., Awaitable[Any]],
+        spool_dir: str,
+        tz,
+        workers: int = 2,
+        artifact_ttl: float = 3600,
+        batch_size: int = 1000
+    ):
+        """初始化
+
+        Args:
+            records: 按开始时间升序读取日期范围内记录的异步迭代器工厂
+            run_blocking: 在线程池中执行阻塞调用（文件写入）
+            spool_dir: 产物暂存目录
+            tz: 本地时区（按该时区的今天判断日期范围是否已结束）
+            workers: 并发执行的任务数
+            artifact_ttl: 产物有效期(秒)，过期后相同请求重新导出，文件被清理
+            batch_size: 列式格式每批写入的行数
+        """
+        self._records = records
+        self._run_blocking = run_blocking
+        self.spool_dir = spool_dir
+        self.tz = tz
+        self.workers = max(1, workers)
+        self.artifact_ttl = artifact_ttl
+        self.batch_size = batch_size
+        self._jobs: Dict[str, ExportJob] = {}
+        self._by_key: Dict[Tuple[date, date, str], str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+
+        os.makedirs(spool_dir, exist_ok=True)
+        # 任务信息只在内存中，上次运行留下的产物无法再被引用
+        for name in os.listdir(spool_dir):
+            if name.startswith(ARTIFACT_PREFIX):
+                try:
+                    os.remove(os.path.join(spool_dir, name))
+                except OSError:
+                    pass
+
+    def start(self) -> List[asyncio.Task]:
+        """启动工作协程（需在事件循环中调用），返回任务列表供调用方停止"""
+        self._queue = asyncio.Queue()
+        return [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, start_date: date, end_date: date, format_type: str) -> ExportJob:
+        """提交导出任务；相同参数的进行中任务、已结束范围有效期内的产物直接复用"""
+        if not format_available(format_type):
+            raise ValueError(f"导出格式不可用: {format_type}")
+        if self._queue is None:
+            raise RuntimeError("导出任务队列未启动")
+
+        self._expire()
+        existing = self._jobs.get(self._by_key.get((start_date, end_date, format_type), ""))
+        if existing and existing.status != "failed":
+            if existing.status != "completed" or existing.end_date < datetime.now(self.tz).date():
+                return existing
+
+        job = ExportJob(
+            id=f"{ARTIFACT_PREFIX}{start_date:%Y%m%d}_{end_date:%Y%m%d}_{format_type}_{uuid.uuid4().hex[:8]}",
+            start_date=start_date,
+            end_date=end_date,
+            format_type=format_type
+        )
+        self._jobs[job.id] = job
+        self._by_key[job.key] = job.id
+        self._queue.put_nowait(job)
+        logger.info(f"提交导出任务 {job.id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        """查询任务（过期的任务返回 None）"""
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def media_type(self, job: ExportJob) -> str:
+        return JOB_FORMATS[job.format_type][0]
+
+    def filename(self, job: ExportJob) -> str:
+        return f"time_records_{job.start_date}_{job.end_date}.{JOB_FORMATS[job.format_type][1]}"
+
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数"""
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _expire(self):
+        """清理过期的已结束任务及其产物"""
+        now = time.time()
+        for job in list(self._jobs.values()):
+            if job.finished_at and now - job.finished_at >= self.artifact_ttl:
+                self._discard(job)
+
+    def _discard(self, job: ExportJob):
+        self._jobs.pop(job.id, None)
+        if self._by_key.get(job.key) == job.id:
+            del self._by_key[job.key]
+        if job.path and os.path.exists(job.path):
+            try:
+                os.remove(job.path)
+            except OSError as e:
+                logger.warning(f"删除导出产物失败 {job.path}: {e}")
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                job.finished_at = time.time()
+                logger.error(f"导出任务 {job.id} 失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ExportJob):
+        job.status = "running"
+        job.started_at = time.time()
+        extension = JOB_FORMATS[job.format_type][1]
+        path = os.path.join(self.spool_dir, f"{job.id}.{extension}")
+        tmp_path = f"{path}.tmp"
+
+        try:
+            if job.format_type in FILE_FORMATS:
+                await self._write_file(job, tmp_path)
+            else:
+                await self._write_stream(job, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        job.path = path
+        job.size = os.path.getsize(path)
+        job.progress = 1.0
+        job.status = "completed"
+        job.finished_at = time.time()
+        logger.info(f"导出任务 {job.id} 完成: {job.rows}条, {job.size}字节, "
+                    f"耗时{job.finished_at - job.started_at:.1f}秒")
+
+    async def _tracked(self, job: ExportJob) -> AsyncIterator[TimeRecord]:
+        """读取记录并更新任务进度（记录按开始时间升序，按日期位置估算进度）"""
+        days = (job.end_date - job.start_date).days + 1
+        async for record in self._records(job.start_date, job.end_date):
+            job.rows += 1
+            offset = (record.start_time.astimezone(self.tz).date() - job.start_date).days + 1
+            job.progress = min(0.99, max(job.progress, offset / days))
+            yield record
+
+    async def _write_stream(self, job: ExportJob, path: str):
+        """CSV / NDJSON / JSON：复用流式导出的编码"""
+        handle = await self._run_blocking(open, path, "wb")
+        try:
+            async for chunk in encode_records(self._tracked(job), job.format_type, chunk_rows=self.batch_size):
+                await self._run_blocking(handle.write, chunk)
+        finally:
+            await self._run_blocking(handle.close)
+
+    async def _write_file(self, job: ExportJob, path: str):
+        """Excel / Parquet：分批交给线程池中的写入器"""
+        writer = await self._run_blocking(_FILE_WRITERS[job.format_type], path)
+        try:
+            batch: List[Dict[str, Any]] = []
+            async for record in self._tracked(job):
+                batch.append(_record_values(record))
+                if len(batch) >= self.batch_size:
+                    await self._run_blocking(writer.write, batch)
+                    batch = []
+            if batch:
+                await self._run_blocking(writer.write, batch)
+        except BaseException:
+            try:
+                await self._run_blocking(writer.abort)
+            except Exception as e:
+                logger.warning(f"关闭导出写入器失败 {path}: {e}")
+            raise
+        await self._run_blocking(writer.close)
@@ -0,0 +1,87 @@
+"""
+Notion异步访问层 - 在有界线程池中执行同步的Notion / time_agent调用
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class NotionGateway:
+    """Notion异步访问层
+
+    SimpleTimeAgent 和 notion_client.Client 都是同步实现（CLI 也在使用），
+    直接在事件循环里调用会阻塞同一个worker上的所有请求。
+    所有阻塞调用统一经由这里放到有界线程池中执行，线程数即对外部API的最大并发数，
+    并发请求的I/O因此可以真正重叠，同时继续共享同一个客户端和连接池。
+    """
+
+    def __init__(self, notion, max_workers: int = 8):
+        """初始化访问层
+
+        Args:
+            notion: 同步的Notion客户端（通常是 SimpleTimeAgent.notion）
+            max_workers: 线程池大小，即阻塞调用的最大并发数
+        """
+        self.notion = notion
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="notion-io"
+        )
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在线程池中执行任意阻塞函数（如 SimpleTimeAgent 的同步方法）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    # =============== Notion API 封装 ===============
+
+    async def query_database(self, **kwargs) -> Dict[str, Any]:
+        """查询数据库（databases.query）"""
+        return await self.run(self.notion.databases.query, **kwargs)
+
+    async def create_page(self, **kwargs) -> Dict[str, Any]:
+        """创建页面（pages.create）"""
+        return await self.run(self.notion.pages.create, **kwargs)
+
+    async def update_page(self, **kwargs) -> Dict[str, Any]:
+        """更新页面（pages.update）"""
+        return await self.run(self.notion.pages.update, **kwargs)
+
+    async def retrieve_page(self, page_id: str) -> Dict[str, Any]:
+        """获取页面（pages.retrieve）"""
+        return await self.run(self.notion.pages.retrieve, page_id=page_id)
+
+    async def iter_query(self, page_size: int = 100, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """按 next_cursor 逐页异步读取查询结果
+
+        调用方处理当前页时，下一页已经在线程池中请求；内存中最多保留两页。
+        """
+        async def fetch(cursor):
+            query = dict(kwargs, page_size=page_size)
+            if cursor:
+                query["start_cursor"] = cursor
+            return await self.query_database(**query)
+
+        pending = asyncio.ensure_future(fetch(None))
+        try:
+            while pending:
+                response = await pending
+                next_cursor = response.get("next_cursor") if response.get("has_more") else None
+                pending = asyncio.ensure_future(fetch(next_cursor)) if next_cursor else None
+
+                for page in response.get("results", []):
+                    yield page
+        finally:
+            if pending:
+                pending.cancel()
+
+    def close(self):
+        """关闭线程池（不等待进行中的调用）"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,102 @@
+"""
+时间记录分页 - 偏移量到Notion游标的映射缓存，以及对客户端的不透明游标
+"""
+
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+def encode_cursor(key: str, offset: int, notion_cursor: str) -> str:
+    """编码不透明分页游标（查询键 + 偏移量 + Notion游标）"""
+    payload = json.dumps({"k": key, "o": offset, "c": notion_cursor}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int, str]:
+    """解码分页游标，格式错误时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(payload["k"]), int(payload["o"]), str(payload["c"])
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise ValueError("无效的分页游标")
+
+@dataclass
+class _QueryState:
+    """单个查询（如某一天的记录列表）的分页状态"""
+    expires_at: float
+    cursors: Dict[int, str] = field(default_factory=dict)  # 偏移量 -> 从该位置开始的Notion游标
+    total: Optional[int] = None
+
+class CursorIndex:
+    """偏移量到Notion游标的映射缓存
+
+    Notion只支持游标分页。每次读取一页后记录"下一页起始偏移量 -> next_cursor"，
+    之后请求第N页时从最近的已知偏移量直接续读，无需从头扫描。
+    总数在读到最后一页时顺带得出；写入时按增减量维护，过期后重新计算。
+    """
+
+    def __init__(self, ttl: float = 300, max_keys: int = 256):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._states: "OrderedDict[str, _QueryState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, key: str) -> _QueryState:
+        """获取（必要时创建）查询状态，调用方需持有锁"""
+        state = self._states.get(key)
+        now = time.monotonic()
+        if state is None or state.expires_at <= now:
+            state = _QueryState(expires_at=now + self.ttl)
+            self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > self.max_keys:
+            self._states.popitem(last=False)
+        return state
+
+    def nearest(self, key: str, offset: int) -> Tuple[int, Optional[str]]:
+        """返回不超过 offset 的最近已知偏移量及其游标（偏移量0对应无游标）"""
+        with self._lock:
+            cursors = self._state(key).cursors
+            known = [o for o in cursors if o <= offset]
+            if not known:
+                return 0, None
+            best = max(known)
+            return best, cursors[best]
+
+    def remember(self, key: str, offset: int, notion_cursor: str):
+        """记录从 offset 开始的Notion游标"""
+        with self._lock:
+            self._state(key).cursors[offset] = notion_cursor
+
+    def get_total(self, key: str) -> Optional[int]:
+        """获取已知总数（未知时返回 None）"""
+        with self._lock:
+            return self._state(key).total
+
+    def set_total(self, key: str, total: int):
+        """记录精确总数"""
+        with self._lock:
+            self._state(key).total = total
+
+    def record_added(self, key: str, delta: int = 1):
+        """记录增删后维护总数；插入会使已有偏移量失效，因此清空游标映射"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            state.cursors.clear()
+            if state.total is not None:
+                state.total = max(0, state.total + delta)
+
+    def invalidate(self, key: Optional[str] = None):
+        """使指定查询（或全部查询）的缓存失效"""
+        with self._lock:
+            if key is None:
+                self._states.clear()
+            else:
+                self._states.pop(key, None)
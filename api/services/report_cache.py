@@ -0,0 +1,110 @@
+"""
+报告缓存 - 按 (报告类型, 周期, 数据版本) 缓存生成好的报告
+
+每个日期有自己的数据版本，记录写入时递增受影响日期的版本；目标的增删改与进度变化
+递增全局目标版本（报告中含目标进度）。周期的数据版本为其中各日期版本的最大值与目标版本，
+版本不变即可直接返回缓存结果，因此已结束的周期在无人修改历史时永久有效。
+进行中的周期（包含今天）还可能被外部（CLI、Notion中直接编辑）修改，额外设有短有效期。
+ETag 只由 (报告类型, 周期, 数据版本) 决定，有效期到期后重新生成不会改变 ETag；
+版本号只在进程内有意义，因此再加上进程启动时生成的标识，重启后旧的 ETag 不会被误认。
+"""
+
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+class CachedReport(NamedTuple):
+    """缓存的报告及其HTTP缓存信息"""
+    value: Any
+    etag: str
+    closed: bool  # 周期是否已结束（不含今天）
+
+class ReportCache:
+    """带数据版本的报告缓存"""
+
+    def __init__(self, tz, open_ttl: float = 60, max_entries: int = 512):
+        """初始化
+
+        Args:
+            tz: 本地时区（按该时区的今天判断周期是否已结束）
+            open_ttl: 进行中周期的报告有效期(秒)
+            max_entries: 最多缓存的报告数
+        """
+        self.tz = tz
+        self.open_ttl = open_ttl
+        self.max_entries = max_entries
+        self._clock = 0                       # 版本时钟，所有版本号都取自它
+        self._date_versions: Dict[date, int] = {}
+        self._base_version = 0                # 未单独记录的日期的版本（全部失效时更新）
+        self._goals_version = 0
+        self._epoch = uuid.uuid4().hex[:8]    # 本进程的版本号空间
+        self._entries: "OrderedDict[Tuple[str, date], Tuple[Tuple[int, int], float, CachedReport]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def touch(self, dates: Optional[Iterable[date]] = None, goals: bool = False):
+        """数据变化后调用
+
+        Args:
+            dates: 记录变化影响的日期；为 None 时视为所有日期都已变化
+            goals: 目标或目标进度是否变化
+        """
+        self._clock += 1
+        if dates is None:
+            self._base_version = self._clock
+            self._date_versions.clear()
+        else:
+            for day in dates:
+                self._date_versions[day] = self._clock
+        if goals:
+            self._goals_version = self._clock
+
+    def version(self, start_date: date, end_date: date) -> Tuple[int, int]:
+        """周期的数据版本 (记录版本, 目标版本)"""
+        data_version = self._base_version
+        day = start_date
+        while day <= end_date:
+            data_version = max(data_version, self._date_versions.get(day, 0))
+            day += timedelta(days=1)
+        return data_version, self._goals_version
+
+    async def get_or_compute(
+        self,
+        report_type: str,
+        start_date: date,
+        end_date: date,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> CachedReport:
+        """返回周期报告，数据版本变化或进行中周期过期时调用 compute() 重新生成"""
+        key = (report_type, start_date)
+        closed = end_date < datetime.now(self.tz).date()
+        version = self.version(start_date, end_date)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            cached_version, created_at, report = entry
+            fresh = closed or time.monotonic() - created_at < self.open_ttl
+            if cached_version == version and fresh and report.closed == closed:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return report
+
+        self._misses += 1
+        # 版本在生成前取得：生成期间发生的写入会使本次结果在下次读取时失效
+        value = await compute()
+        report = CachedReport(
+            value=value,
+            etag=f'"{report_type}-{start_date.isoformat()}-{self._epoch}-{version[0]}-{version[1]}"',
+            closed=closed
+        )
+        self._entries[key] = (version, time.monotonic(), report)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return report
+
+    def stats(self) -> Dict[str, int]:
+        """命中/未命中次数与当前缓存的报告数"""
+        return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries)}
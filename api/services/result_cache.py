@@ -0,0 +1,73 @@
+"""
+结果缓存 - 短时缓存异步计算结果，并合并同一键上的并发计算
+
+前端会定期轮询概览类接口；有效期内的重复请求直接返回上次结果，
+同一时刻到达的多个请求只触发一次计算，其余请求等待该次结果。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class ResultCache:
+    """带有效期的异步结果缓存"""
+
+    def __init__(self, ttl: float = 30, max_entries: int = 128):
+        """初始化
+
+        Args:
+            ttl: 结果有效期(秒)，<=0 时不缓存（仍合并并发计算）
+            max_entries: 最多缓存的键数
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._hits = 0
+        self._misses = 0
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """返回键对应的有效结果，没有时调用 compute() 计算并缓存（失败不缓存）"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._hits += 1
+            return await asyncio.shield(inflight)
+
+        self._misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if self.ttl > 0:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self):
+        """清空全部缓存结果"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """命中/未命中次数与当前条目数"""
+        return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries)}
@@ -4,18 +4,31 @@
 
 import sys
 import os
+import asyncio
 import logging
+import time
 from datetime import datetime, timedelta, date
-from typing import Optional, List, Tuple
-from notion_client import Client
+from typing import Any, Dict, Optional, List, Tuple, AsyncIterator
+import httpx
+from fastapi import Request
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 # 导入原有的time_agent
 from time_agent import SimpleTimeAgent
+from goal_tracking import page_goal_contribution
 
-from api.config.settings import get_settings
+from api.config.settings import Settings, get_settings
+from api.services.notion_gateway import NotionGateway
+from api.services.pagination import CursorIndex, encode_cursor, decode_cursor
+from api.services.write_journal import WriteJournal, flush_pending, is_provisional_id
+from api.services.time_cube import TimeCube, CubeTotals, efficiency_rate
+from api.services.trends import compute_trends
+from api.services.result_cache import ResultCache
+from api.services.report_cache import ReportCache, CachedReport
+from api.services.export import encode_records
+from api.services.export_jobs import ExportJobManager
 from api.models.schemas import (
     Goal, GoalCreate, GoalUpdate,
     TimeRecord, TimeRecordCreate,
@@ -28,30 +41,256 @@ logger = logging.getLogger(__name__)
 class TimeAgentService:
     """时间记录智能解析服务 - 基于原有time_agent.py"""
     
-    def __init__(self):
-        """初始化服务"""
-        self.settings = get_settings()
+    def __init__(self, settings: Optional[Settings] = None):
+        """初始化服务
         
-        # 初始化原有的SimpleTimeAgent
-        self.time_agent = SimpleTimeAgent()
+        服务在应用生命周期内只创建一次（见 api.main 的 lifespan），
+        所有请求共享同一组客户端和HTTP连接池。
+        """
+        self.settings = settings or get_settings()
         
-        # 初始化Notion客户端（用于API查询）
-        self.notion = Client(auth=self.settings.notion_token)
+        # Notion与Claude各自使用独立的连接池（notion_client会改写传入客户端的base_url和headers）
+        limits = httpx.Limits(
+            max_connections=self.settings.http_max_connections,
+            max_keepalive_connections=self.settings.http_max_keepalive_connections,
+            keepalive_expiry=self.settings.http_keepalive_expiry
+        )
+        
+        # 连接池由服务持有并负责关闭：缺少密钥时对应客户端不会创建，连接池也不会交给任何客户端
+        notion_http_client = httpx.Client(limits=limits)
+        claude_http_client = httpx.Client(limits=limits)
+        self._http_clients = [notion_http_client, claude_http_client]
+        
+        # 初始化原有的SimpleTimeAgent，配置统一来自 api.config.settings
+        try:
+            self.time_agent = SimpleTimeAgent(
+                config=self.settings.model_dump(),
+                notion_http_client=notion_http_client,
+                claude_http_client=claude_http_client
+            )
+        except Exception:
+            self._close_http_clients()
+            raise
+        
+        # 复用SimpleTimeAgent的Notion客户端（用于API查询）
+        self.notion = self.time_agent.notion
+        
+        # 所有同步的Notion/time_agent调用都经由线程池执行，避免阻塞事件循环
+        self.gateway = NotionGateway(self.notion, max_workers=self.settings.notion_io_workers)
+        
+        # 时间记录列表的偏移量->游标映射与总数缓存
+        self.page_index = CursorIndex(ttl=self.settings.pagination_cache_ttl)
+        
+        # 本地SQLite镜像（配置了 mirror_db_path 时启用，由后台任务增量同步）
+        self.mirror = self.time_agent.mirror
+        
+        # 写后日志（启用时创建记录先落盘本地日志即返回，由后台任务写入Notion）
+        self.journal = WriteJournal(self.settings.write_journal_path) if self.settings.write_behind_enabled else None
+        self._journal_event: Optional[asyncio.Event] = None
+        
+        # 报告用的预聚合时长（写入时增量更新，按日期从数据源重建）
+        self.cube = TimeCube(
+            self.time_agent.timezone,
+            ttl=self.settings.time_cube_ttl,
+            max_days=self.settings.time_cube_max_days
+        )
+        self._cube_lock = asyncio.Lock()
+        
+        # 概览统计的短时结果缓存（前端轮询时合并重复计算）
+        self.summary_cache = ResultCache(ttl=self.settings.summary_cache_ttl)
+        
+        # 日报/周报缓存：按数据版本失效，已结束的周期长期有效
+        self.report_cache = ReportCache(self.time_agent.timezone, open_ttl=self.settings.report_cache_open_ttl)
+        
+        # 后台导出任务（产物写入本地暂存目录）
+        self.export_jobs = ExportJobManager(
+            self._iter_records,
+            self.gateway.run,
+            spool_dir=self.settings.export_spool_dir,
+            tz=self.time_agent.timezone,
+            workers=self.settings.export_workers,
+            artifact_ttl=self.settings.export_artifact_ttl
+        )
+        self._background_tasks: List[asyncio.Task] = []
+    
+    def start(self):
+        """启动后台任务（需在事件循环中调用）"""
+        if self.mirror:
+            self._background_tasks.append(asyncio.create_task(self._mirror_sync_loop()))
+        if self.journal:
+            # 上次退出时未写入的条目在启动后立即重新提交
+            self._journal_event = asyncio.Event()
+            self._journal_event.set()
+            self._background_tasks.append(asyncio.create_task(self._journal_flush_loop()))
+        self._background_tasks.extend(self.export_jobs.start())
+    
+    async def stop(self):
+        """停止后台任务"""
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks.clear()
+    
+    def close(self):
+        """释放线程池、客户端和连接池（应用关闭时调用）"""
+        self.gateway.close()
+        self.time_agent.close()
+        self._close_http_clients()
+        if self.journal:
+            self.journal.close()
+    
+    def _close_http_clients(self):
+        """关闭服务创建的全部连接池（已随客户端关闭的再次关闭无副作用）"""
+        for client in self._http_clients:
+            client.close()
+    
+    def notion_stats(self) -> dict:
+        """Notion请求的重试与限流指标"""
+        return self.time_agent.notion_throttle.metrics()
+    
+    def journal_stats(self) -> Optional[dict]:
+        """写后日志的待写入/失败条目数，未启用时为 None"""
+        return self.journal.stats() if self.journal else None
+    
+    def cache_stats(self) -> dict:
+        """各级缓存的命中统计"""
+        return {
+            "active_goals": self.time_agent.active_goal_cache.stats(),
+            "parse": self.time_agent.parse_cache.stats(),
+            "parse_pipeline": self.time_agent.parse_pipeline.stats(),
+            "time_cube": self.cube.stats(),
+            "summary": self.summary_cache.stats(),
+            "reports": self.report_cache.stats()
+        }
+    
+    # =============== 本地镜像 ===============
+    
+    def _mirror_ready(self) -> bool:
+        """读路径是否可以使用本地镜像"""
+        return self.mirror is not None and self.mirror.usable
+    
+    async def _mirror_sync_loop(self):
+        """按 last_edited_time 水位线轮询同步镜像；定期全量同步以清理外部归档的页面"""
+        last_full_sync = 0.0
+        while True:
+            try:
+                full = time.monotonic() - last_full_sync >= self.settings.mirror_full_sync_interval
+                await self.gateway.run(self.mirror.sync, full)
+                if full:
+                    last_full_sync = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"本地镜像同步失败: {e}")
+            await asyncio.sleep(self.settings.mirror_sync_interval)
+    
+    async def _mirror_write_through(self, page: dict):
+        """将Notion写入接口返回的页面回写本地镜像（Notion仍是数据源）"""
+        if self.mirror:
+            try:
+                await self.gateway.run(self.mirror.upsert_page, page)
+            except Exception as e:
+                logger.warning(f"回写本地镜像失败: {e}")
+    
+    async def _mirror_archive(self, page_id: str):
+        """页面已在Notion中归档，同步删除镜像中的副本"""
+        if self.mirror:
+            try:
+                await self.gateway.run(self.mirror.mark_archived, page_id)
+            except Exception as e:
+                logger.warning(f"更新本地镜像失败: {e}")
+    
+    # =============== 写后日志 ===============
+    
+    async def _journal_flush_loop(self):
+        """有新条目时立即写入Notion；失败的条目按 write_journal_flush_interval 定期重试"""
+        while True:
+            try:
+                await asyncio.wait_for(self._journal_event.wait(), self.settings.write_journal_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._journal_event.clear()
+            try:
+                await self._flush_journal()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"写后日志提交失败: {e}")
+    
+    async def _flush_journal(self):
+        """按登记顺序把待写入条目写入Notion，目标进度在本轮结束后按目标合并回写"""
+        goals: Dict[str, int] = {}
+        try:
+            async for _, payload, _ in flush_pending(
+                self.journal, self._create_journaled_page, self._find_journaled_page, self.gateway.run
+            ):
+                self.page_index.record_added(payload["date"])
+                goal_id = payload.get("goal_id")
+                if goal_id:
+                    goals[goal_id] = payload.get("estimated_time", 0)
+        finally:
+            await self._update_goals_progress(goals)
+    
+    async def _create_journaled_page(self, entry_id: str, payload: dict) -> dict:
+        """创建写后日志条目对应的页面（配置了标记属性时写入临时ID供对账）"""
+        properties = dict(payload["properties"])
+        marker = self.settings.write_journal_marker_property
+        if marker:
+            properties[marker] = {"rich_text": [{"text": {"content": entry_id}}]}
+        return await self._create_record_page(properties, payload.get("goal_id"), payload["duration"])
+    
+    async def _find_journaled_page(self, entry_id: str, payload: dict) -> Optional[dict]:
+        """查找上次提交结果未知的条目是否已在Notion中创建；找到时补做创建后的本地维护
+        
+        配置了标记属性时按临时ID查找，否则按Task标题与开始时间查找。
+        """
+        properties = payload["properties"]
+        marker = self.settings.write_journal_marker_property
+        if marker:
+            query_filter = {"property": marker, "rich_text": {"equals": entry_id}}
+        else:
+            title = properties["Task"]["title"][0]["text"]["content"]
+            query_filter = {"property": "Task", "title": {"equals": title}}
+        start_time = datetime.fromisoformat(properties["Start Time"]["date"]["start"])
+        
+        async for page in self.gateway.iter_query(database_id=self.settings.database_id, filter=query_filter):
+            page_start = ((page["properties"].get("Start Time") or {}).get("date") or {}).get("start")
+            if marker or (page_start and datetime.fromisoformat(page_start) == start_time):
+                await self._record_page_created(page, payload.get("goal_id"), payload["duration"])
+                return page
+        return None
+    
+    async def _resolve_record_id(self, record_id: str) -> str:
+        """把写后日志的临时ID换成Notion页面ID"""
+        if not is_provisional_id(record_id):
+            return record_id
+        if not self.journal:
+            raise ValueError(f"记录不存在: {record_id}")
+        page_id, status = await self.gateway.run(self.journal.resolve, record_id)
+        if status == "pending":
+            raise ValueError(f"记录尚未写入Notion，请稍后再试: {record_id}")
+        if not page_id:
+            raise ValueError(f"记录不存在: {record_id}")
+        return page_id
     
     # =============== 目标管理服务 ===============
     
     async def get_active_goals(self, current_date: date = None) -> List[Goal]:
         """获取活跃目标列表"""
         if current_date is None:
-            current_date = date.today()
+            current_date = self.today()
         
         try:
-            daily_goals = self.time_agent.query_active_goals(current_date)
-            goals = []
+            daily_goals = await self.gateway.run(self.time_agent.query_active_goals, current_date)
+            
+            # 一次批量查询所有目标的实际投入时间（避免逐个目标请求Notion）
+            actual_times = await self.gateway.run(
+                self.time_agent.calculate_goals_actual_time, [dg.goal_id for dg in daily_goals]
+            )
             
+            goals = []
             for dg in daily_goals:
-                # 计算实际投入时间
-                actual_time = self.time_agent.calculate_goal_actual_time(dg.goal_id)
+                actual_time = actual_times.get(dg.goal_id, 0)
                 
                 goal = Goal(
                     id=dg.goal_id,
@@ -72,6 +311,34 @@ class TimeAgentService:
             logger.error(f"获取活跃目标失败: {e}")
             raise
     
+    async def get_completed_goals(self, start_date: date, end_date: date) -> List[Goal]:
+        """日期范围内完成的目标（状态为Completed且最后编辑时间在范围内，按本地日期）"""
+        tz = self.time_agent.timezone
+        since = tz.localize(datetime.combine(start_date, datetime.min.time()))
+        completed = await self.gateway.run(self.time_agent.query_completed_goals, since)
+        completed = [entry for entry in completed if entry[2].astimezone(tz).date() <= end_date]
+        if not completed:
+            return []
+        
+        actual_times = await self.gateway.run(
+            self.time_agent.calculate_goals_actual_time, [dg.goal_id for dg, _, _ in completed]
+        )
+        return [
+            Goal(
+                id=dg.goal_id,
+                title=dg.title,
+                deadline=dg.date,
+                estimated_time=dg.estimated_time,
+                actual_time=actual_times.get(dg.goal_id, 0),
+                progress=100,
+                priority=dg.priority,
+                status="Completed",
+                created_at=created,
+                updated_at=edited
+            )
+            for dg, created, edited in completed
+        ]
+    
     async def create_goal(self, goal_data: GoalCreate) -> Goal:
         """创建目标 - 直接写入Notion Goals数据库"""
         try:
@@ -110,10 +377,13 @@ class TimeAgentService:
             }
             
             # 创建Notion页面到Goals数据库
-            response = self.notion.pages.create(
+            response = await self.gateway.create_page(
                 parent={"database_id": self.settings.goals_database_id},
                 properties=properties
             )
+            await self._mirror_write_through(response)
+            self.time_agent.active_goal_cache.invalidate()
+            self._data_changed(dates=(), goals=True)
             
             # 构建返回的Goal对象
             goal = Goal(
@@ -167,10 +437,13 @@ class TimeAgentService:
                 }
             
             # 更新Notion页面
-            response = self.notion.pages.update(
+            response = await self.gateway.update_page(
                 page_id=goal_id,
                 properties=properties
             )
+            await self._mirror_write_through(response)
+            self.time_agent.active_goal_cache.invalidate()
+            self._data_changed(dates=(), goals=True)
             
             # 获取更新后的完整数据来构建返回对象
             updated_props = response["properties"]
@@ -206,7 +479,7 @@ class TimeAgentService:
                 status = status_mapping.get(notion_status, "Planned")
             
             # 计算实际投入时间和进度
-            actual_time = self.time_agent.calculate_goal_actual_time(goal_id)
+            actual_time = await self.gateway.run(self.time_agent.calculate_goal_actual_time, goal_id)
             progress = min(100, int(actual_time / estimated_time * 100)) if estimated_time > 0 else 0
             
             goal = Goal(
@@ -233,10 +506,13 @@ class TimeAgentService:
         """删除目标 - 归档Notion页面（Notion不支持真删除）"""
         try:
             # Notion API不支持删除页面，只能归档
-            response = self.notion.pages.update(
+            response = await self.gateway.update_page(
                 page_id=goal_id,
                 archived=True
             )
+            await self._mirror_archive(goal_id)
+            self.time_agent.active_goal_cache.invalidate(goal_id)
+            self._data_changed(dates=(), goals=True)
             
             logger.info(f"成功归档目标: {goal_id}")
             return True
@@ -247,11 +523,31 @@ class TimeAgentService:
     
     # =============== 时间记录服务 ===============
     
-    async def create_time_record(self, record_data: TimeRecordCreate) -> TimeRecord:
-        """创建时间记录 - 使用原有time_agent解析"""
+    async def parse_inputs(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """批量解析自然语言输入（Claude级别合并为少量批量请求），无法解析的条目为 None"""
+        return await self.gateway.run(self.time_agent.parse_many, texts)
+    
+    async def create_time_record(
+        self,
+        record_data: TimeRecordCreate,
+        parsed_data: Optional[Dict[str, Any]] = None,
+        deferred_goals: Optional[Dict[str, Any]] = None
+    ) -> TimeRecord:
+        """创建时间记录 - 使用原有time_agent解析
+        
+        Args:
+            record_data: 创建请求
+            parsed_data: 已解析的结果（批量创建时预先批量解析），为空时单独解析
+            deferred_goals: 传入时不立即回写目标进度，而是把匹配到的目标登记到该字典
+                (目标ID -> 预计时间)，由调用方在批量完成后按目标合并回写
+
+        启用写后日志时，记录落盘本地日志后即返回临时ID，Notion写入与目标进度回写由后台任务完成；
+        在此之前列表与报告中暂时看不到该记录。
+        """
         try:
             # 使用原有的time_agent解析逻辑
-            parsed_data = self.time_agent.parse_natural_input(record_data.input_text)
+            if parsed_data is None:
+                parsed_data = await self.gateway.run(self.time_agent.parse_natural_input, record_data.input_text)
             
             if not parsed_data:
                 raise ValueError(f"原有解析引擎无法解析: {record_data.input_text}")
@@ -262,7 +558,9 @@ class TimeAgentService:
             
             # 尝试匹配相关目标
             current_date = parsed_data["start_time"].date()
-            matched_goal = self.time_agent.find_matching_goal(parsed_data["description"], current_date)
+            matched_goal = await self.gateway.run(
+                self.time_agent.find_matching_goal, parsed_data["description"], current_date
+            )
             
             # 构建完整的解析数据
             complete_data = {
@@ -273,23 +571,35 @@ class TimeAgentService:
                 "end_time": parsed_data["end_time"],
                 "duration_minutes": parsed_data["duration"],  # 原始返回duration，我们映射为duration_minutes
                 "confidence": parsed_data.get("confidence", 0.95) * 100,  # 转换为百分比
-                "parsing_method": "Claude"
+                "parsing_method": parsed_data.get("parsing_method", "Claude")
             }
             
-            # 保存到Notion（包含目标关联）
+            # 保存到Notion（包含目标关联）；写后模式下只登记到本地日志
             goal_id = matched_goal.goal_id if matched_goal else None
-            notion_page = await self._save_parsed_data_to_notion(complete_data, goal_id)
+            if self.journal:
+                notion_page = await self._journal_record(complete_data, goal_id, matched_goal)
+            else:
+                notion_page = await self._save_parsed_data_to_notion(complete_data, goal_id)
             
-            # 如果匹配到目标，更新目标进度
-            if matched_goal:
-                actual_time = self.time_agent.calculate_goal_actual_time(matched_goal.goal_id)
-                self.time_agent.update_goal_progress(matched_goal.goal_id, actual_time, matched_goal.estimated_time)
-            
-            # 构建matched_goal信息
+            # 如果匹配到目标，更新目标进度（累计时间已在保存时增量更新）
             matched_goal_info = None
             if matched_goal:
-                # 计算更新后的进度
-                updated_actual_time = self.time_agent.calculate_goal_actual_time(matched_goal.goal_id)
+                updated_actual_time = await self.gateway.run(
+                    self.time_agent.calculate_goal_actual_time, matched_goal.goal_id
+                )
+                if self.journal:
+                    # 尚未写入Notion，累计中还不含本条记录
+                    updated_actual_time += complete_data["duration_minutes"]
+                elif deferred_goals is not None:
+                    deferred_goals[matched_goal.goal_id] = matched_goal.estimated_time
+                else:
+                    await self.gateway.run(
+                        self.time_agent.update_goal_progress,
+                        matched_goal.goal_id, updated_actual_time, matched_goal.estimated_time
+                    )
+                    self._data_changed(dates=(), goals=True)
+                
+                # 构建matched_goal信息
                 progress_percentage = min(100, int(updated_actual_time / matched_goal.estimated_time * 100)) if matched_goal.estimated_time > 0 else 0
                 
                 matched_goal_info = {
@@ -314,6 +624,9 @@ class TimeAgentService:
                 created_at=notion_page["created_time"]
             )
             
+            if not self.journal:
+                self.page_index.record_added(complete_data["start_time"].date().isoformat())
+            
             logger.info(f"创建时间记录到Notion: {record.activity} ({record.duration}分钟) - {record.category}")
             
             return record
@@ -322,22 +635,122 @@ class TimeAgentService:
             logger.error(f"创建时间记录失败: {e}")
             raise ValueError(f"解析时间记录失败: {str(e)}")
     
+    async def create_time_records_batch(
+        self, records_data: List[TimeRecordCreate]
+    ) -> Tuple[List[Tuple[int, TimeRecord]], List[Dict[str, Any]]]:
+        """批量创建时间记录
+        
+        所有输入先批量解析；涉及日期的活跃目标预先加载一次，供各条目共享；
+        之后在 batch_concurrency 信号量限制下并发创建，目标进度在全部完成后按目标合并回写。
+        
+        Returns:
+            (按下标排序的 [(下标, 记录)], 失败条目列表)
+        """
+        parsed_inputs = await self.parse_inputs([record_data.input_text for record_data in records_data])
+        
+        # 预热活跃目标缓存，避免并发条目同时未命中而重复查询
+        dates = {parsed["start_time"].date() for parsed in parsed_inputs if parsed}
+        await asyncio.gather(*(
+            self.gateway.run(self.time_agent.query_active_goals, current_date) for current_date in dates
+        ))
+        
+        semaphore = asyncio.Semaphore(max(1, self.settings.batch_concurrency))
+        goals: Dict[str, int] = {}
+        
+        async def create(index: int, record_data: TimeRecordCreate, parsed_data):
+            if not parsed_data:
+                return index, None, f"无法解析: {record_data.input_text}"
+            async with semaphore:
+                try:
+                    record = await self.create_time_record(record_data, parsed_data, deferred_goals=goals)
+                    return index, record, None
+                except Exception as e:
+                    return index, None, str(e)
+        
+        outcomes = await asyncio.gather(*(
+            create(i, record_data, parsed_data)
+            for i, (record_data, parsed_data) in enumerate(zip(records_data, parsed_inputs))
+        ))
+        
+        created: List[Tuple[int, TimeRecord]] = []
+        failed: List[Dict[str, Any]] = []
+        for index, record, error in outcomes:
+            if record:
+                created.append((index, record))
+            else:
+                failed.append({
+                    "index": index,
+                    "input_text": records_data[index].input_text,
+                    "error": error
+                })
+        
+        await self._update_goals_progress(goals)
+        return created, failed
+    
+    async def _update_goals_progress(self, goals: Dict[str, int]):
+        """按目标合并回写进度（每个目标只写一次Notion）
+        
+        Args:
+            goals: 目标ID -> 预计时间(分钟)
+        """
+        if not goals:
+            return
+        totals = await self.gateway.run(self.time_agent.calculate_goals_actual_time, list(goals))
+        
+        async def update(goal_id: str, estimated_time: int):
+            try:
+                await self.gateway.run(
+                    self.time_agent.update_goal_progress, goal_id, totals.get(goal_id, 0), estimated_time
+                )
+            except Exception as e:
+                logger.error(f"更新目标进度失败 {goal_id}: {e}")
+        
+        await asyncio.gather(*(update(goal_id, estimated_time) for goal_id, estimated_time in goals.items()))
+        # 目标状态可能随进度变为已完成
+        self._data_changed(dates=(), goals=True)
+    
     async def get_time_records(
         self, 
         target_date: date = None,
         limit: int = 20,
-        offset: int = 0
-    ) -> Tuple[List[TimeRecord], int]:
-        """获取时间记录列表"""
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[TimeRecord], int, Optional[str]]:
+        """获取时间记录列表
+        
+        Returns:
+            (当前页记录, 当日记录总数, 下一页游标)；cursor 优先于 target_date/offset
+        """
         try:
-            if target_date is None:
-                target_date = date.today()
+            if cursor:
+                key, offset, notion_cursor = decode_cursor(cursor)
+                target_date = date.fromisoformat(key)
+            else:
+                if target_date is None:
+                    target_date = self.today()
+                key = target_date.isoformat()
+                notion_cursor = None
+            
+            if self._mirror_ready():
+                # 本地镜像：LIMIT/OFFSET + COUNT 即可得到精确结果
+                pages, total = await self.gateway.run(self._mirror_day_page, target_date, limit, offset)
+                records = [r for r in [await self._convert_notion_page_to_record(p) for p in pages] if r]
+                end = offset + len(pages)
+                next_page = encode_cursor(key, end, "") if end < total else None
+                return records, total, next_page
+            
+            if not notion_cursor:
+                notion_cursor = await self._seek_cursor(target_date, offset)
             
             # 从Notion数据库查询数据
-            records = await self._fetch_from_notion(target_date, limit, offset)
+            records, fetched, next_cursor = await self._fetch_from_notion(target_date, limit, offset, notion_cursor)
             
-            total = len(records)  # TODO: 获取真实的总数
-            return records, total
+            total = self.page_index.get_total(key)
+            if total is None:
+                total = await self._count_records(target_date)
+            
+            next_page = encode_cursor(key, offset + fetched, next_cursor) if next_cursor else None
+            return records, total, next_page
             
         except Exception as e:
             logger.error(f"获取时间记录失败: {e}")
@@ -346,8 +759,9 @@ class TimeAgentService:
     async def get_time_record(self, record_id: str) -> Optional[TimeRecord]:
         """获取单个时间记录"""
         try:
+            record_id = await self._resolve_record_id(record_id)
             # 从Notion获取单个页面
-            page = self.notion.pages.retrieve(page_id=record_id)
+            page = await self.gateway.retrieve_page(record_id)
             record = await self._convert_notion_page_to_record(page)
             return record
         except Exception as e:
@@ -357,6 +771,7 @@ class TimeAgentService:
     async def update_time_record(self, record_id: str, update_data: dict) -> Optional[TimeRecord]:
         """更新时间记录"""
         try:
+            record_id = await self._resolve_record_id(record_id)
             # 构建更新的属性
             properties = {}
             
@@ -394,13 +809,23 @@ class TimeAgentService:
                 }
             
             # 更新Notion页面
-            updated_page = self.notion.pages.update(
+            updated_page = await self.gateway.update_page(
                 page_id=record_id,
                 properties=properties
             )
+            await self._mirror_write_through(updated_page)
+            goal_ids, duration = page_goal_contribution(updated_page)
+            self.time_agent.goal_ledger.apply_record(record_id, goal_ids, duration)
+            
+            # 开始时间可能跨日变动，清空全部分页缓存
+            self.page_index.invalidate()
             
             # 转换为TimeRecord对象
             record = await self._convert_notion_page_to_record(updated_page)
+            # 预聚合中没有旧记录时不知道原来的日期，按全部日期都已变化处理
+            old_dates = self.cube.remove(record_id)
+            new_dates = self.cube.apply(record_id, record) if record else set()
+            self._data_changed(old_dates | new_dates if old_dates else None, goals=bool(goal_ids))
             
             logger.info(f"成功更新时间记录: {record_id}")
             return record
@@ -412,11 +837,24 @@ class TimeAgentService:
     async def delete_time_record(self, record_id: str) -> bool:
         """删除时间记录（归档Notion页面）"""
         try:
+            record_id = await self._resolve_record_id(record_id)
             # Notion不支持真删除，只能归档
-            self.notion.pages.update(
+            archived_page = await self.gateway.update_page(
                 page_id=record_id,
                 archived=True
             )
+            await self._mirror_archive(record_id)
+            self.time_agent.goal_ledger.remove_record(record_id)
+            dates = self.cube.remove(record_id)
+            
+            start = ((archived_page.get("properties", {}).get("Start Time") or {}).get("date") or {}).get("start")
+            if start:
+                dates.add(date.fromisoformat(start[:10]))
+            self._data_changed(dates or None, goals=bool(page_goal_contribution(archived_page)[0]))
+            if start:
+                self.page_index.record_added(start[:10], delta=-1)
+            else:
+                self.page_index.invalidate()
             
             logger.info(f"成功删除（归档）时间记录: {record_id}")
             return True
@@ -427,50 +865,79 @@ class TimeAgentService:
     
     # =============== 报告统计服务 ===============
     
+    def today(self) -> date:
+        """配置时区下的今天（服务器本地日期可能与之不同）"""
+        return datetime.now(self.time_agent.timezone).date()
+    
+    def _data_changed(self, dates: Optional[Any], goals: bool = False):
+        """记录或目标变化后使相关报告缓存失效
+        
+        Args:
+            dates: 受影响的本地日期集合，None 表示未知（全部失效）
+            goals: 目标或目标进度是否变化
+        """
+        self.report_cache.touch(dates, goals=goals)
+        self.summary_cache.invalidate()
+    
+    async def daily_report(self, target_date: date = None) -> CachedReport:
+        """日报（带版本缓存）"""
+        if target_date is None:
+            target_date = self.today()
+        return await self.report_cache.get_or_compute(
+            "daily", target_date, target_date, lambda: self.generate_daily_report(target_date)
+        )
+    
+    async def weekly_report(self, week_date: date = None) -> CachedReport:
+        """周报（带版本缓存）"""
+        if week_date is None:
+            week_date = self.today()
+        week_start = week_date - timedelta(days=week_date.weekday())
+        return await self.report_cache.get_or_compute(
+            "weekly", week_start, week_start + timedelta(days=6), lambda: self.generate_weekly_report(week_date)
+        )
+    
+    async def aggregate_range(self, start_date: date, end_date: date) -> CubeTotals:
+        """日期范围内的时长汇总（读取预聚合数据，未加载或已过期的日期先按一次范围查询重建）"""
+        await self._ensure_cube(start_date, end_date)
+        return self.cube.totals(start_date, end_date)
+    
+    async def _ensure_cube(self, start_date: date, end_date: date):
+        """重建预聚合数据中缺失的日期（串行执行，并发请求不会重复读取同一范围）"""
+        if not self.cube.missing_ranges(start_date, end_date):
+            return
+        async with self._cube_lock:
+            for lower, upper in self.cube.missing_ranges(start_date, end_date):
+                since = self.cube.write_seq()
+                records = [(record.id, record) async for record in self._iter_records(lower, upper)]
+                self.cube.load(lower, upper, records, since)
+    
     async def generate_daily_report(self, target_date: date = None) -> DailyReport:
         """生成日报"""
         try:
             if target_date is None:
-                target_date = date.today()
+                target_date = self.today()
             
-            # 获取当日的时间记录
-            records, _ = await self.get_time_records(target_date)
+            # 从预聚合数据读取当日统计
+            totals = await self.aggregate_range(target_date, target_date)
+            total_records = totals.records
+            total_duration = round(totals.minutes)
+            category_duration = {category: round(minutes) for category, minutes in totals.by_category.items()}
+            activity_duration = {activity: round(minutes) for activity, minutes in totals.by_activity.items()}
             
-            # 计算基础统计
-            total_records = len(records)
-            total_duration = sum(record.duration for record in records)
-            
-            # 计算分类统计
+            # 计算分类统计（转换为百分比）
             category_stats = {}
-            category_duration = {}
-            
-            for record in records:
-                category = record.category
-                if category not in category_duration:
-                    category_duration[category] = 0
-                category_duration[category] += record.duration
-            
-            # 转换为百分比
             for category, duration in category_duration.items():
                 percentage = (duration / total_duration * 100) if total_duration > 0 else 0
                 category_stats[category] = CategoryStats(duration=duration, percentage=round(percentage, 1))
             
             # 计算活动统计
-            activity_duration = {}
-            for record in records:
-                activity = record.activity
-                if activity not in activity_duration:
-                    activity_duration[activity] = 0
-                activity_duration[activity] += record.duration
-            
             activity_stats = [
                 ActivityStats(activity=activity, duration=duration)
                 for activity, duration in sorted(activity_duration.items(), key=lambda x: x[1], reverse=True)
             ]
             
             # 计算有效率（生产+投资类别的占比）
-            productive_duration = category_duration.get("生产", 0) + category_duration.get("投资", 0)
-            efficiency_rate = (productive_duration / total_duration * 100) if total_duration > 0 else 0
+            efficiency = efficiency_rate(category_duration, total_duration)
             
             # 获取目标进度
             goal_progress = []
@@ -492,7 +959,7 @@ class TimeAgentService:
                 report_date=target_date,
                 total_records=total_records,
                 total_duration=total_duration,
-                efficiency_rate=round(efficiency_rate, 1),
+                efficiency_rate=efficiency,
                 category_stats=category_stats,
                 activity_stats=activity_stats,
                 goal_progress=goal_progress
@@ -505,11 +972,106 @@ class TimeAgentService:
             logger.error(f"生成日报失败: {e}")
             raise
     
+    async def generate_trends(self, days: int, end_date: date = None) -> Dict[str, Any]:
+        """最近 days 天（含 end_date）的有效率、分类、活动与时段趋势"""
+        if end_date is None:
+            end_date = self.today()
+        start_date = end_date - timedelta(days=days - 1)
+        
+        await self._ensure_cube(start_date, end_date)
+        trends = compute_trends(self.cube.cells(start_date, end_date), start_date, days)
+        trends["period"] = f"past_{days}_days"
+        return trends
+    
+    async def generate_summary(self, today: date = None) -> Dict[str, Any]:
+        """今日/本周/本月概览（有效期内的重复请求直接返回缓存结果）"""
+        if today is None:
+            today = self.today()
+        return await self.summary_cache.get_or_compute(today, lambda: self._compute_summary(today))
+    
+    async def _compute_summary(self, today: date) -> Dict[str, Any]:
+        """一次读取覆盖本周与本月的日期范围，单遍累计今日/本周/本月统计"""
+        week_start = today - timedelta(days=today.weekday())
+        month_start = today.replace(day=1)
+        range_start = min(week_start, month_start)
+        
+        _, active_goals, completed_goals = await asyncio.gather(
+            self._ensure_cube(range_start, today),
+            self.get_active_goals(today),
+            self.get_completed_goals(week_start, today)
+        )
+        
+        today_duration = week_duration = month_duration = 0.0
+        activity_duration: Dict[str, float] = {}
+        day_duration: Dict[date, float] = {}
+        day_category: Dict[date, Dict[str, float]] = {}
+        for day, _, category, activity, minutes, _ in self.cube.cells(range_start, today):
+            if day == today:
+                today_duration += minutes
+            if day >= week_start:
+                week_duration += minutes
+            if day >= month_start:
+                month_duration += minutes
+                activity_duration[activity] = activity_duration.get(activity, 0.0) + minutes
+            day_duration[day] = day_duration.get(day, 0.0) + minutes
+            by_category = day_category.setdefault(day, {})
+            by_category[category] = by_category.get(category, 0.0) + minutes
+        
+        # 本月有记录的日期的平均有效率
+        daily_rates = [
+            efficiency_rate(day_category[day], total)
+            for day, total in day_duration.items() if day >= month_start and total > 0
+        ]
+        avg_daily_efficiency = round(sum(daily_rates) / len(daily_rates), 1) if daily_rates else 0.0
+        
+        top_activities = [
+            {
+                "activity": activity,
+                "duration": round(minutes),
+                "percentage": round(minutes / month_duration * 100, 1) if month_duration > 0 else 0.0
+            }
+            for activity, minutes in sorted(activity_duration.items(), key=lambda x: x[1], reverse=True)[:3]
+        ]
+        
+        # 本周完成的目标（与周报同一口径）
+        recent_achievements = [
+            {
+                "date": goal.updated_at.astimezone(self.time_agent.timezone).date().isoformat(),
+                "title": f"完成{goal.title}",
+                "type": "goal_completed"
+            }
+            for goal in completed_goals
+        ]
+        
+        # 截至今天（或昨天，今天尚未记录时）的连续记录天数
+        streak = 0
+        day = today if day_duration.get(today) else today - timedelta(days=1)
+        while day >= range_start and day_duration.get(day):
+            streak += 1
+            day -= timedelta(days=1)
+        if streak >= 3:
+            recent_achievements.append({
+                "date": today.isoformat(),
+                "title": f"连续{streak}天记录时间",
+                "type": "streak"
+            })
+        
+        return {
+            "today_duration": round(today_duration),
+            "week_duration": round(week_duration),
+            "month_duration": round(month_duration),
+            "active_goals": len(active_goals),
+            "completed_goals_this_week": len(completed_goals),
+            "avg_daily_efficiency": avg_daily_efficiency,
+            "top_activities": top_activities,
+            "recent_achievements": recent_achievements
+        }
+    
     async def generate_weekly_report(self, week_date: date = None) -> WeeklyReport:
         """生成周报"""
         try:
             if week_date is None:
-                week_date = date.today()
+                week_date = self.today()
             
             # 计算周的开始和结束日期
             weekday = week_date.weekday()  # 0是周一，6是周日
@@ -519,62 +1081,37 @@ class TimeAgentService:
             # 生成周标识
             week_str = f"{week_start.year}-W{week_start.isocalendar()[1]:02d}"
             
-            # 收集一周内每日的数据
-            daily_breakdown = []
-            weekly_records = []
+            # 从预聚合数据读取整周统计（缺失的日期按一次范围查询重建）
+            totals = await self.aggregate_range(week_start, week_end)
+            day_duration = {day: round(minutes) for day, minutes in totals.by_day.items()}
+            category_duration = {category: round(minutes) for category, minutes in totals.by_category.items()}
             
-            for i in range(7):
-                day = week_start + timedelta(days=i)
-                try:
-                    day_records, _ = await self.get_time_records(day)
-                    daily_duration = sum(record.duration for record in day_records)
-                    
-                    daily_breakdown.append(DailyBreakdown(
-                        breakdown_date=day,
-                        duration=daily_duration
-                    ))
-                    
-                    weekly_records.extend(day_records)
-                except Exception as e:
-                    logger.warning(f"获取{day}的记录失败: {e}")
-                    daily_breakdown.append(DailyBreakdown(
-                        breakdown_date=day,
-                        duration=0
-                    ))
+            daily_breakdown = [
+                DailyBreakdown(breakdown_date=day, duration=duration)
+                for day, duration in day_duration.items()
+            ]
             
             # 计算周总统计
-            total_duration = sum(record.duration for record in weekly_records)
+            total_duration = round(totals.minutes)
             
             # 计算分类汇总
             category_summary = {}
-            category_duration = {}
-            
-            for record in weekly_records:
-                category = record.category
-                if category not in category_duration:
-                    category_duration[category] = 0
-                category_duration[category] += record.duration
-            
             for category, duration in category_duration.items():
                 percentage = (duration / total_duration * 100) if total_duration > 0 else 0
                 category_summary[category] = CategoryStats(duration=duration, percentage=round(percentage, 1))
             
             # 计算有效率
-            productive_duration = category_duration.get("生产", 0) + category_duration.get("投资", 0)
-            efficiency_rate = (productive_duration / total_duration * 100) if total_duration > 0 else 0
+            efficiency = efficiency_rate(category_duration, total_duration)
             
             # 获取本周完成的目标
             completed_goals = []
             try:
-                active_goals = await self.get_active_goals(week_end)
-                for goal in active_goals:
-                    # 检查目标是否在本周完成（简化逻辑：实际时间>=预估时间）
-                    if goal.actual_time >= goal.estimated_time and goal.status == "Completed":
-                        completed_goals.append(CompletedGoal(
-                            title=goal.title,
-                            estimated_time=goal.estimated_time,
-                            actual_time=goal.actual_time
-                        ))
+                for goal in await self.get_completed_goals(week_start, week_end):
+                    completed_goals.append(CompletedGoal(
+                        title=goal.title,
+                        estimated_time=goal.estimated_time,
+                        actual_time=goal.actual_time
+                    ))
             except Exception as e:
                 logger.warning(f"获取完成目标失败: {e}")
             
@@ -582,7 +1119,7 @@ class TimeAgentService:
                 week=week_str,
                 date_range=[week_start, week_end],
                 total_duration=total_duration,
-                efficiency_rate=round(efficiency_rate, 1),
+                efficiency_rate=efficiency,
                 daily_breakdown=daily_breakdown,
                 category_summary=category_summary,
                 completed_goals=completed_goals
@@ -595,6 +1132,13 @@ class TimeAgentService:
             logger.error(f"生成周报失败: {e}")
             raise
     
+    # =============== 数据导出 ===============
+    
+    def export_records(self, start_date: date, end_date: date, format_type: str) -> AsyncIterator[bytes]:
+        """按游标分页读取 [start_date, end_date] 内的记录，边读边编码为导出格式的字节流"""
+        logger.info(f"开始导出数据: {start_date} - {end_date} ({format_type})")
+        return encode_records(self._iter_records(start_date, end_date), format_type)
+    
     # =============== 智能解析服务 (使用原有time_agent.py) ===============
     
     # =============== Notion 集成方法 ===============
@@ -602,72 +1146,152 @@ class TimeAgentService:
     async def _save_parsed_data_to_notion(self, parsed_data: dict, goal_id: str = None) -> dict:
         """保存原有time_agent解析结果到Notion数据库"""
         try:
-            # 按照原有time_agent.py的逻辑构建数据
-            start_time = parsed_data["start_time"]
-            end_time = parsed_data["end_time"]
-            activity = parsed_data["activity"]
-            description = parsed_data["description"]
-            
-            # 生成task格式: mmddHHmmmmddHHmm + description（与原有time_agent.py一致）
-            task_format = f"{start_time.strftime('%m%d%H%M')}{end_time.strftime('%m%d%H%M')}{description}"
-            
-            # 构建Notion页面属性
-            properties = {
-                "Task": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": task_format
-                            }
+            properties = self._record_properties(parsed_data, goal_id)
+            return await self._create_record_page(properties, goal_id, parsed_data["duration_minutes"])
+        except Exception as e:
+            logger.error(f"保存到Notion失败: {e}")
+            raise
+    
+    async def _journal_record(self, parsed_data: dict, goal_id: Optional[str], goal) -> dict:
+        """把记录登记到写后日志，返回带临时ID的页面占位"""
+        payload = {
+            "properties": self._record_properties(parsed_data, goal_id),
+            "goal_id": goal_id,
+            "estimated_time": goal.estimated_time if goal else 0,
+            "duration": parsed_data["duration_minutes"],
+            "date": parsed_data["start_time"].date().isoformat()
+        }
+        entry_id = await self.gateway.run(self.journal.append, payload)
+        # 未经 start() 启动提交任务时（如脚本直接使用服务），条目留在日志中，下次启动后重放
+        if self._journal_event is not None:
+            self._journal_event.set()
+        return {"id": entry_id, "created_time": datetime.now(parsed_data["start_time"].tzinfo).isoformat()}
+    
+    def _record_properties(self, parsed_data: dict, goal_id: str = None) -> dict:
+        """按原有time_agent.py的格式构建时间记录的Notion页面属性"""
+        # 按照原有time_agent.py的逻辑构建数据
+        start_time = parsed_data["start_time"]
+        end_time = parsed_data["end_time"]
+        activity = parsed_data["activity"]
+        description = parsed_data["description"]
+        
+        # 生成task格式: mmddHHmmmmddHHmm + description（与原有time_agent.py一致）
+        task_format = f"{start_time.strftime('%m%d%H%M')}{end_time.strftime('%m%d%H%M')}{description}"
+        
+        # 构建Notion页面属性
+        properties = {
+            "Task": {
+                "title": [
+                    {
+                        "text": {
+                            "content": task_format
                         }
-                    ]
-                },
-                "支出项": {
-                    "select": {
-                        "name": activity  # 支出项存储活动名称（如：编程）
                     }
-                },
-                "Duration (Minutes)": {
-                    "number": parsed_data["duration_minutes"]
-                },
-                "Start Time": {
+                ]
+            },
+            "支出项": {
+                "select": {
+                    "name": activity  # 支出项存储活动名称（如：编程）
+                }
+            },
+            "Duration (Minutes)": {
+                "number": parsed_data["duration_minutes"]
+            },
+            "Start Time": {
+                "date": {
+                    "start": start_time.isoformat()
+                }
+            },
+            "End Time": {
+                "date": {
+                    "start": end_time.isoformat()
+                }
+            }
+            # 注意：不写入"性质"字段，由Notion函数自动计算
+        }
+        
+        # 如果有关联目标，添加Goal关系
+        if goal_id:
+            properties["Goal"] = {
+                "relation": [{"id": goal_id}]
+            }
+        
+        return properties
+    
+    async def _create_record_page(self, properties: dict, goal_id: Optional[str], duration: int) -> dict:
+        """创建时间记录页面，并回写本地镜像与目标累计时间"""
+        response = await self.gateway.create_page(
+            parent={"database_id": self.settings.database_id},
+            properties=properties
+        )
+        await self._record_page_created(response, goal_id, duration)
+        logger.info(f"成功保存到Notion: {response['id']}")
+        return response
+    
+    async def _record_page_created(self, response: dict, goal_id: Optional[str], duration: int):
+        """页面已在Notion中创建：回写本地镜像、目标累计时间与预聚合数据"""
+        await self._mirror_write_through(response)
+        self.time_agent.goal_ledger.apply_record(response["id"], [goal_id] if goal_id else [], duration)
+        record = await self._convert_notion_page_to_record(response)
+        if record:
+            self._data_changed(self.cube.apply(response["id"], record), goals=bool(goal_id))
+        else:
+            self._data_changed(None, goals=bool(goal_id))
+    
+    
+    def _mirror_day_page(self, target_date: date, limit: int, offset: int) -> Tuple[List[dict], int]:
+        """从本地镜像读取单日记录的一页及总数（同步方法，在线程池中执行）"""
+        pages = self.mirror.record_pages(target_date, target_date, limit=limit, offset=offset, descending=True)
+        return pages, self.mirror.count_records(target_date, target_date)
+    
+    async def _iter_records(self, start_date: date, end_date: date) -> AsyncIterator[TimeRecord]:
+        """逐条读取 [start_date, end_date] 内的全部时间记录（按游标分页，不截断）"""
+        if self._mirror_ready():
+            chunk_size = 500
+            offset = 0
+            while True:
+                pages = await self.gateway.run(
+                    self.mirror.record_pages, start_date, end_date, limit=chunk_size, offset=offset
+                )
+                for page in pages:
+                    record = await self._convert_notion_page_to_record(page)
+                    if record:
+                        yield record
+                if len(pages) < chunk_size:
+                    return
+                offset += chunk_size
+        
+        filter_conditions = {
+            "and": [
+                {
+                    "property": "Start Time",
                     "date": {
-                        "start": start_time.isoformat()
+                        "on_or_after": start_date.isoformat()
                     }
                 },
-                "End Time": {
+                {
+                    "property": "Start Time",
                     "date": {
-                        "start": end_time.isoformat()
+                        "before": (end_date + timedelta(days=1)).isoformat()
                     }
                 }
-                # 注意：不写入"性质"字段，由Notion函数自动计算
-            }
-            
-            # 如果有关联目标，添加Goal关系
-            if goal_id:
-                properties["Goal"] = {
-                    "relation": [{"id": goal_id}]
-                }
-            
-            # 创建Notion页面
-            response = self.notion.pages.create(
-                parent={"database_id": self.settings.database_id},
-                properties=properties
-            )
-            
-            logger.info(f"成功保存到Notion: {response['id']}")
-            return response
-            
-        except Exception as e:
-            logger.error(f"保存到Notion失败: {e}")
-            raise
-    
+            ]
+        }
+        
+        async for page in self.gateway.iter_query(
+            database_id=self.settings.database_id,
+            filter=filter_conditions,
+            sorts=[{"property": "Start Time", "direction": "ascending"}]
+        ):
+            record = await self._convert_notion_page_to_record(page)
+            if record:
+                yield record
     
-    async def _fetch_from_notion(self, target_date: date, limit: int, offset: int) -> List[TimeRecord]:
-        """从Notion数据库获取时间记录"""
-        try:
-            # 构建查询过滤器
-            filter_conditions = {
+    def _day_query(self, target_date: date) -> dict:
+        """构建单日时间记录查询（按开始时间倒序）"""
+        return {
+            "database_id": self.settings.database_id,
+            "filter": {
                 "and": [
                     {
                         "property": "Start Time",
@@ -682,21 +1306,86 @@ class TimeAgentService:
                         }
                     }
                 ]
-            }
+            },
+            "sorts": [
+                {
+                    "property": "Start Time",
+                    "direction": "descending"
+                }
+            ]
+        }
+    
+    async def _seek_cursor(self, target_date: date, offset: int) -> Optional[str]:
+        """定位到 offset 处的Notion游标：从最近的已知偏移量续读，只跳过中间的部分"""
+        key = target_date.isoformat()
+        position, notion_cursor = self.page_index.nearest(key, offset)
+        
+        while position < offset:
+            query = self._day_query(target_date)
+            query["page_size"] = min(100, offset - position)
+            if notion_cursor:
+                query["start_cursor"] = notion_cursor
+            response = await self.gateway.query_database(**query)
+            
+            position += len(response["results"])
+            if not response.get("has_more"):
+                # 偏移量超出范围：顺带得到了精确总数
+                self.page_index.set_total(key, position)
+                return None
+            
+            notion_cursor = response["next_cursor"]
+            self.page_index.remember(key, position, notion_cursor)
+        
+        return notion_cursor
+    
+    async def _count_records(self, target_date: date) -> int:
+        """统计当日记录总数（按最大页扫描一次，并顺带缓存每页的游标）"""
+        key = target_date.isoformat()
+        position = 0
+        notion_cursor = None
+        
+        while True:
+            query = self._day_query(target_date)
+            query["page_size"] = 100
+            if notion_cursor:
+                query["start_cursor"] = notion_cursor
+            response = await self.gateway.query_database(**query)
+            
+            position += len(response["results"])
+            if not response.get("has_more"):
+                break
+            notion_cursor = response["next_cursor"]
+            self.page_index.remember(key, position, notion_cursor)
+        
+        self.page_index.set_total(key, position)
+        return position
+    
+    async def _fetch_from_notion(
+        self,
+        target_date: date,
+        limit: int,
+        offset: int,
+        start_cursor: Optional[str] = None
+    ) -> Tuple[List[TimeRecord], int, Optional[str]]:
+        """从Notion数据库获取一页时间记录
+        
+        Returns:
+            (记录, 本页页面数, 下一页Notion游标)；无法转换的页面不在记录中，但计入页面数，
+            偏移量与游标都按页面数推进
+        """
+        if offset > 0 and not start_cursor:
+            # 偏移量超出当日记录范围
+            return [], 0, None
+        
+        try:
+            key = target_date.isoformat()
+            query = self._day_query(target_date)
+            query["page_size"] = limit
+            if start_cursor:
+                query["start_cursor"] = start_cursor
             
             # 查询Notion数据库
-            response = self.notion.databases.query(
-                database_id=self.settings.database_id,
-                filter=filter_conditions,
-                sorts=[
-                    {
-                        "property": "Start Time",
-                        "direction": "descending"
-                    }
-                ],
-                start_cursor=None,  # TODO: 实现分页
-                page_size=limit
-            )
+            response = await self.gateway.query_database(**query)
             
             records = []
             for page in response["results"]:
@@ -704,12 +1393,18 @@ class TimeAgentService:
                 if record:
                     records.append(record)
             
+            next_cursor = response.get("next_cursor") if response.get("has_more") else None
+            if next_cursor:
+                self.page_index.remember(key, offset + len(response["results"]), next_cursor)
+            else:
+                self.page_index.set_total(key, offset + len(response["results"]))
+            
             logger.info(f"从Notion获取到 {len(records)} 条记录")
-            return records
+            return records, len(response["results"]), next_cursor
             
         except Exception as e:
             logger.error(f"从Notion获取数据失败: {e}")
-            return []  # 返回空列表而不是抛出异常
+            return [], 0, None  # 返回空列表而不是抛出异常
     
     async def _convert_notion_page_to_record(self, page: dict) -> Optional[TimeRecord]:
         """将Notion页面转换为TimeRecord对象"""
@@ -782,4 +1477,9 @@ class TimeAgentService:
             
         except Exception as e:
             logger.error(f"转换Notion页面失败: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+def get_time_agent_service(request: Request) -> TimeAgentService:
+    """获取进程级共享的TimeAgentService实例（依赖注入）"""
+    return request.app.state.time_agent_service
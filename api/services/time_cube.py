@@ -0,0 +1,253 @@
+"""
+时间立方体 - 按 本地日期 × 小时 × 分类 × 活动 预聚合的时长统计
+
+每条记录按实际时间跨度拆分到所经过的各小时（跨午夜的记录分摊到两天），
+条数计入开始所在的小时。记录的创建、更新、归档按增量修正；
+某天首次查询或超过有效期时从数据源重建，用于吸收外部修改。
+报告只需遍历所需日期的单元格（每天至多 24 × 分类 × 活动 个），与原始记录数无关。
+"""
+
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+# 计入有效时间的分类（生产 + 投资），日报、周报、趋势共用同一口径
+PRODUCTIVE_CATEGORIES = ("生产", "投资")
+
+# 单元格键（日期以外部分）: (小时, 分类, 活动)
+CellKey = Tuple[int, str, str]
+# 一条记录的贡献: [(日期, 单元格键, 分钟, 条数)]
+Contribution = List[Tuple[date, CellKey, float, int]]
+
+@dataclass
+class CubeTotals:
+    """日期范围内的汇总"""
+    records: int = 0
+    minutes: float = 0.0
+    by_day: Dict[date, float] = field(default_factory=dict)
+    by_category: Dict[str, float] = field(default_factory=dict)
+    by_activity: Dict[str, float] = field(default_factory=dict)
+
+def efficiency_rate(category_duration: Dict[str, float], total_duration: float) -> float:
+    """有效率：生产+投资类别时长占总时长的百分比（保留一位小数）"""
+    if total_duration <= 0:
+        return 0.0
+    productive = sum(category_duration.get(category, 0) for category in PRODUCTIVE_CATEGORIES)
+    return round(productive / total_duration * 100, 1)
+
+def split_record(record: Any, tz) -> Contribution:
+    """把一条记录的时长按实际时间跨度拆分到各小时
+
+    Args:
+        record: 具有 start_time / end_time / duration / category / activity 属性的记录
+        tz: 本地时区
+    """
+    start = record.start_time.astimezone(tz) if record.start_time.tzinfo else record.start_time
+    end = record.end_time.astimezone(tz) if record.end_time.tzinfo else record.end_time
+    category, activity, duration = str(record.category), record.activity, record.duration
+
+    span = (end - start).total_seconds()
+    if span <= 0 or duration <= 0:
+        return [(start.date(), (start.hour, category, activity), float(max(duration, 0)), 1)]
+
+    cells: Contribution = []
+    cursor = start
+    count = 1
+    while cursor < end:
+        boundary = cursor.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        segment_end = min(boundary, end)
+        # 记录的时长以 duration 为准，按时间跨度比例分摊
+        minutes = (segment_end - cursor).total_seconds() / span * duration
+        cells.append((cursor.date(), (cursor.hour, category, activity), minutes, count))
+        cursor = segment_end
+        count = 0
+    return cells
+
+class TimeCube:
+    """预聚合的时长立方体"""
+
+    def __init__(self, tz, ttl: float = 600, max_days: int = 800):
+        """初始化
+
+        Args:
+            tz: 本地时区（日期与小时按该时区划分）
+            ttl: 已加载日期的有效期(秒)，过期后从数据源重建
+            max_days: 最多保留的日期数，超出时淘汰最久未使用的日期
+        """
+        self.tz = tz
+        self.ttl = ttl
+        self.max_days = max_days
+        self._cells: Dict[date, Dict[CellKey, List[float]]] = {}
+        self._loaded: "OrderedDict[date, float]" = OrderedDict()
+        self._records: Dict[str, Tuple[date, Contribution]] = {}  # 记录ID -> (开始日期, 贡献)
+        self._by_day: Dict[date, Set[str]] = defaultdict(set)    # 开始日期 -> 记录ID
+        self._writes: Dict[str, int] = {}                        # 记录ID -> 最近写入序号
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    # =============== 增量维护 ===============
+
+    def _add(self, record_id: str, contribution: Contribution):
+        """调用方需持有锁"""
+        start_day = contribution[0][0]
+        for day, key, minutes, count in contribution:
+            cell = self._cells.setdefault(day, {}).setdefault(key, [0.0, 0])
+            cell[0] += minutes
+            cell[1] += count
+        self._records[record_id] = (start_day, contribution)
+        self._by_day[start_day].add(record_id)
+
+    def _subtract(self, record_id: str) -> Set[date]:
+        """调用方需持有锁，返回受影响的日期"""
+        entry = self._records.pop(record_id, None)
+        if entry is None:
+            return set()
+        start_day, contribution = entry
+        for day, key, minutes, count in contribution:
+            cells = self._cells.get(day)
+            cell = cells.get(key) if cells else None
+            if cell is None:
+                continue
+            cell[0] -= minutes
+            cell[1] -= count
+            if cell[1] <= 0 and cell[0] < 1e-6:
+                del cells[key]
+        self._by_day[start_day].discard(record_id)
+        return {day for day, _, _, _ in contribution}
+
+    def apply(self, record_id: str, record: Any) -> Set[date]:
+        """记录创建或更新后调用，替换该记录之前的贡献，返回受影响的日期（新旧两部分）"""
+        contribution = split_record(record, self.tz)
+        with self._lock:
+            self._seq += 1
+            self._writes[record_id] = self._seq
+            affected = self._subtract(record_id)
+            self._add(record_id, contribution)
+        return affected | {day for day, _, _, _ in contribution}
+
+    def remove(self, record_id: str) -> Set[date]:
+        """记录归档后调用，返回受影响的日期（记录未被跟踪时为空）"""
+        with self._lock:
+            self._seq += 1
+            self._writes[record_id] = self._seq
+            return self._subtract(record_id)
+
+    # =============== 从数据源重建 ===============
+
+    def missing_ranges(self, start_date: date, end_date: date) -> List[Tuple[date, date]]:
+        """[start_date, end_date] 中未加载或已过期的连续日期区间
+
+        前一天开始的记录可能跨午夜计入 start_date，因此前一天也需要已加载。
+        """
+        now = time.monotonic()
+        ranges: List[Tuple[date, date]] = []
+        day = start_date - timedelta(days=1)
+        with self._lock:
+            while day <= end_date:
+                loaded_at = self._loaded.get(day)
+                if loaded_at is None or now - loaded_at >= self.ttl:
+                    if ranges and ranges[-1][1] == day - timedelta(days=1):
+                        ranges[-1] = (ranges[-1][0], day)
+                    else:
+                        ranges.append((day, day))
+                day += timedelta(days=1)
+        return ranges
+
+    def write_seq(self) -> int:
+        """当前写入序号，读取数据源前取得，传给 load 以保留读取期间的并发写入"""
+        with self._lock:
+            return self._seq
+
+    def load(self, start_date: date, end_date: date, records: Iterable[Tuple[str, Any]], since: int):
+        """用数据源读取的 [start_date, end_date] 内全部记录重建这些日期
+
+        Args:
+            records: [(记录ID, 记录)]
+            since: 读取数据源前的 write_seq()；之后被写入过的记录以增量结果为准
+        """
+        contributions = [(record_id, split_record(record, self.tz)) for record_id, record in records]
+        with self._lock:
+            day = start_date
+            while day <= end_date:
+                for record_id in list(self._by_day.get(day, ())):
+                    if self._writes.get(record_id, 0) <= since:
+                        self._subtract(record_id)
+                day += timedelta(days=1)
+
+            for record_id, contribution in contributions:
+                if self._writes.get(record_id, 0) > since:
+                    continue
+                self._subtract(record_id)
+                self._add(record_id, contribution)
+
+            now = time.monotonic()
+            day = start_date
+            while day <= end_date:
+                self._loaded[day] = now
+                self._loaded.move_to_end(day)
+                day += timedelta(days=1)
+            self._evict()
+            self._prune_writes(since)
+
+    def _evict(self):
+        """淘汰最久未使用的日期，调用方需持有锁"""
+        while len(self._loaded) > self.max_days:
+            day, _ = self._loaded.popitem(last=False)
+            for record_id in list(self._by_day.pop(day, ())):
+                self._subtract(record_id)
+            self._cells.pop(day, None)
+            # 被淘汰日期开始的记录可能计入了后一天，后一天需要重建
+            self._loaded.pop(day + timedelta(days=1), None)
+
+    def _prune_writes(self, since: int):
+        """写入序号只用于和正在进行的加载比较，已早于本次加载的可以丢弃，调用方需持有锁"""
+        if len(self._writes) > 10000:
+            self._writes = {rid: seq for rid, seq in self._writes.items() if seq > since}
+
+    def invalidate(self):
+        """丢弃全部聚合，下次查询时重建"""
+        with self._lock:
+            self._cells.clear()
+            self._loaded.clear()
+            self._records.clear()
+            self._by_day.clear()
+
+    # =============== 查询 ===============
+
+    def cells(self, start_date: date, end_date: date) -> Iterator[Tuple[date, int, str, str, float, int]]:
+        """遍历日期范围内的单元格 (日期, 小时, 分类, 活动, 分钟, 条数)"""
+        with self._lock:
+            snapshot = []
+            day = start_date
+            while day <= end_date:
+                for (hour, category, activity), (minutes, count) in self._cells.get(day, {}).items():
+                    snapshot.append((day, hour, category, activity, minutes, int(count)))
+                day += timedelta(days=1)
+        return iter(snapshot)
+
+    def totals(self, start_date: date, end_date: date) -> CubeTotals:
+        """日期范围内的条数、总时长及按日/分类/活动的时长"""
+        totals = CubeTotals()
+        day = start_date
+        while day <= end_date:
+            totals.by_day[day] = 0.0
+            day += timedelta(days=1)
+        for day, _, category, activity, minutes, count in self.cells(start_date, end_date):
+            totals.records += count
+            totals.minutes += minutes
+            totals.by_day[day] += minutes
+            totals.by_category[category] = totals.by_category.get(category, 0.0) + minutes
+            totals.by_activity[activity] = totals.by_activity.get(activity, 0.0) + minutes
+        return totals
+
+    def stats(self) -> Dict[str, int]:
+        """已加载日期数、单元格数、跟踪的记录数"""
+        with self._lock:
+            return {
+                "days": len(self._loaded),
+                "cells": sum(len(cells) for cells in self._cells.values()),
+                "records": len(self._records)
+            }
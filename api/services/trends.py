@@ -0,0 +1,134 @@
+"""
+趋势统计 - 基于预聚合单元格的向量化计算
+
+时间立方体的单元格（日期 × 小时 × 分类 × 活动）先转换为列式NumPy数组：
+日期下标、小时、分类编码、活动编码、分钟数，之后各项趋势都是一次 bincount。
+90天窗口至多 90 × 24 × 活动数 个单元格，计算耗时在毫秒级。
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from api.services.time_cube import PRODUCTIVE_CATEGORIES
+
+# 趋势中固定展示的分类（与 CategoryEnum 一致）
+CATEGORIES = ("生产", "投资", "支出")
+
+def _efficiency(productive: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """逐元素计算有效率百分比，总时长为0处为0（与 time_cube.efficiency_rate 同一口径）"""
+    total = total.astype(np.float64)
+    rate = np.divide(productive * 100.0, total, out=np.zeros_like(total), where=total > 0)
+    return np.round(rate, 1)
+
+def compute_trends(
+    cells: Iterable[Tuple[date, int, str, str, float, int]],
+    start_date: date,
+    days: int,
+    top_activities: int = 5,
+    top_hours: int = 5
+) -> Dict[str, Any]:
+    """计算趋势数据
+
+    Args:
+        cells: TimeCube.cells() 产出的 (日期, 小时, 分类, 活动, 分钟, 条数)
+        start_date: 窗口第一天
+        days: 窗口天数
+        top_activities: 活动分布中单独列出的活动数，其余合并为"其他"
+        top_hours: 列出的高效时段数
+
+    Returns:
+        daily_efficiency / category_trends / activity_distribution / peak_hours
+    """
+    day_index: List[int] = []
+    hours: List[int] = []
+    category_codes: List[int] = []
+    activity_codes: List[int] = []
+    minutes: List[float] = []
+
+    category_names: Dict[str, int] = {name: code for code, name in enumerate(CATEGORIES)}
+    activity_names: Dict[str, int] = {}
+    for day, hour, category, activity, cell_minutes, _ in cells:
+        offset = (day - start_date).days
+        if not 0 <= offset < days:
+            continue
+        day_index.append(offset)
+        hours.append(hour)
+        category_codes.append(category_names.setdefault(category, len(category_names)))
+        activity_codes.append(activity_names.setdefault(activity, len(activity_names)))
+        minutes.append(cell_minutes)
+
+    day_index_arr = np.asarray(day_index, dtype=np.int64)
+    hour_arr = np.asarray(hours, dtype=np.int64)
+    category_arr = np.asarray(category_codes, dtype=np.int64)
+    activity_arr = np.asarray(activity_codes, dtype=np.int64)
+    minutes_arr = np.asarray(minutes, dtype=np.float64)
+
+    productive_codes = [category_names[name] for name in PRODUCTIVE_CATEGORIES if name in category_names]
+    productive_mask = np.isin(category_arr, productive_codes)
+    productive_minutes = np.where(productive_mask, minutes_arr, 0.0)
+
+    # 每日有效率
+    daily_total = np.bincount(day_index_arr, weights=minutes_arr, minlength=days)
+    daily_productive = np.bincount(day_index_arr, weights=productive_minutes, minlength=days)
+    daily_rate = _efficiency(daily_productive, daily_total)
+    dates = [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
+
+    # 分类 × 日期 的时长矩阵
+    n_categories = len(category_names)
+    category_matrix = np.bincount(
+        category_arr * days + day_index_arr, weights=minutes_arr, minlength=n_categories * days
+    ).reshape(n_categories, days)
+    category_trends = {
+        name: np.rint(category_matrix[code]).astype(int).tolist()
+        for name, code in category_names.items()
+    }
+
+    # 活动分布
+    activity_total = np.bincount(activity_arr, weights=minutes_arr, minlength=len(activity_names))
+    grand_total = float(activity_total.sum())
+    activity_distribution = []
+    if grand_total > 0:
+        names = list(activity_names)
+        order = np.argsort(-activity_total, kind="stable")
+        for code in order[:top_activities]:
+            if activity_total[code] <= 0:
+                break
+            activity_distribution.append({
+                "activity": names[code],
+                "duration": int(round(activity_total[code])),
+                "percentage": round(float(activity_total[code] / grand_total * 100), 1)
+            })
+        rest = float(activity_total[order[top_activities:]].sum())
+        if rest > 0:
+            activity_distribution.append({
+                "activity": "其他",
+                "duration": int(round(rest)),
+                "percentage": round(rest / grand_total * 100, 1)
+            })
+
+    # 按一天中的小时统计有效率，列出有效时长最多的时段（按小时排序）
+    hour_total = np.bincount(hour_arr, weights=minutes_arr, minlength=24)
+    hour_productive = np.bincount(hour_arr, weights=productive_minutes, minlength=24)
+    hour_rate = _efficiency(hour_productive, hour_total)
+    peak = [int(h) for h in np.argsort(-hour_productive, kind="stable")[:top_hours] if hour_productive[h] > 0]
+    peak_hours = [
+        {
+            "hour": hour,
+            "productivity": float(hour_rate[hour]),
+            "productive_minutes": int(round(hour_productive[hour]))
+        }
+        for hour in sorted(peak)
+    ]
+
+    return {
+        "dates": dates,
+        "daily_efficiency": [
+            {"date": dates[i], "efficiency": float(daily_rate[i]), "duration": int(round(daily_total[i]))}
+            for i in range(days)
+        ],
+        "category_trends": category_trends,
+        "activity_distribution": activity_distribution,
+        "peak_hours": peak_hours
+    }
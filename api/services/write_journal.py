@@ -0,0 +1,214 @@
+"""
+写后日志 - 时间记录先写入本地追加日志并立即确认，再由后台任务写入Notion
+
+日志为JSON Lines文件，每行一个事件：
+    {"op": "create", "id": 临时ID, "payload": {...}, "ts": ...}   待写入的记录
+    {"op": "attempt", "id": 临时ID}                                 即将调用Notion创建页面
+    {"op": "done", "id": 临时ID, "page_id": Notion页面ID}           已写入
+    {"op": "failed", "id": 临时ID, "error": ...}                    不可重试的失败
+每次追加都 fsync，进程重启后重放日志即可恢复未完成的条目。
+创建页面前先落盘"attempt"：读超时、504或崩溃时无法确定Notion是否已创建页面，
+之后再提交带有"attempt"的条目时先按标记在Notion中对账，找到已创建的页面则不再重复创建。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROVISIONAL_PREFIX = "pending-"
+
+def is_provisional_id(record_id: str) -> bool:
+    """是否为写后日志分配的临时ID"""
+    return record_id.startswith(PROVISIONAL_PREFIX)
+
+class WriteJournal:
+    """持久化的追加日志"""
+
+    def __init__(self, path: str, keep_resolved: int = 10000, compact_bytes: int = 4 * 1024 * 1024):
+        """打开（必要时创建）日志并重放
+
+        Args:
+            path: 日志文件路径
+            keep_resolved: 压缩时保留的最近"临时ID -> 页面ID"映射数（供客户端用临时ID继续访问）
+            compact_bytes: 无待写入条目且文件超过该大小时压缩
+        """
+        self.path = path
+        self.keep_resolved = keep_resolved
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._resolved: "OrderedDict[str, str]" = OrderedDict()
+        self._failed: Dict[str, str] = {}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._replay()
+        self._compact()
+        self._file = open(path, "a", encoding="utf-8")
+
+        if self._pending:
+            logger.info(f"写后日志中有 {len(self._pending)} 条待写入记录，将重新提交")
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # 崩溃时最后一行可能只写了一半
+                    logger.warning(f"写后日志第 {line_no} 行损坏，已跳过")
+                    continue
+                self._apply(event)
+
+    def _apply(self, event: Dict[str, Any]):
+        op = event.get("op")
+        entry_id = event.get("id")
+        if op == "create":
+            self._pending[entry_id] = event
+        elif op == "attempt":
+            if entry_id in self._pending:
+                # 压缩时随 create 事件一起写回
+                self._pending[entry_id]["attempted"] = True
+        elif op == "done":
+            self._pending.pop(entry_id, None)
+            self._resolved[entry_id] = event["page_id"]
+            while len(self._resolved) > self.keep_resolved:
+                self._resolved.popitem(last=False)
+        elif op == "failed":
+            self._pending.pop(entry_id, None)
+            self._failed[entry_id] = event.get("error", "")
+
+    def _append(self, event: Dict[str, Any]):
+        """写入一行并落盘，调用方需持有锁"""
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._apply(event)
+
+    def _compact(self):
+        """重写日志，只保留待写入条目和最近的ID映射（打开文件前或持有锁时调用）"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < self.compact_bytes:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry_id, page_id in self._resolved.items():
+                f.write(json.dumps({"op": "done", "id": entry_id, "page_id": page_id}) + "\n")
+            for event in self._pending.values():
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._failed.clear()
+
+    def append(self, payload: Dict[str, Any]) -> str:
+        """登记一条待写入记录，落盘后返回临时ID"""
+        entry_id = f"{PROVISIONAL_PREFIX}{uuid.uuid4().hex}"
+        with self._lock:
+            self._append({"op": "create", "id": entry_id, "payload": payload, "ts": time.time()})
+        return entry_id
+
+    def begin(self, entry_id: str):
+        """即将调用Notion创建页面（之后结果未知时需先对账）"""
+        with self._lock:
+            self._append({"op": "attempt", "id": entry_id})
+
+    def complete(self, entry_id: str, page_id: str):
+        """记录已写入Notion，登记临时ID到页面ID的映射"""
+        with self._lock:
+            self._append({"op": "done", "id": entry_id, "page_id": page_id})
+            if not self._pending and os.path.getsize(self.path) >= self.compact_bytes:
+                self._file.close()
+                self._compact()
+                self._file = open(self.path, "a", encoding="utf-8")
+
+    def fail(self, entry_id: str, error: str):
+        """记录不可重试的失败（如属性校验错误），不再重放"""
+        with self._lock:
+            self._append({"op": "failed", "id": entry_id, "error": error})
+
+    def pending(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """按登记顺序返回待写入条目 [(临时ID, payload)]"""
+        with self._lock:
+            return [(entry_id, event["payload"]) for entry_id, event in self._pending.items()]
+
+    def pending_entries(self) -> List[Tuple[str, Dict[str, Any], bool]]:
+        """按登记顺序返回待写入条目 [(临时ID, payload, 是否已尝试过创建)]"""
+        with self._lock:
+            return [
+                (entry_id, event["payload"], bool(event.get("attempted")))
+                for entry_id, event in self._pending.items()
+            ]
+
+    def resolve(self, entry_id: str) -> Tuple[Optional[str], str]:
+        """查询临时ID的状态
+
+        Returns:
+            (页面ID或None, 状态)，状态为 "done" / "pending" / "failed" / "unknown"
+        """
+        with self._lock:
+            if entry_id in self._resolved:
+                return self._resolved[entry_id], "done"
+            if entry_id in self._pending:
+                return None, "pending"
+            if entry_id in self._failed:
+                return None, "failed"
+            return None, "unknown"
+
+    def stats(self) -> Dict[str, int]:
+        """待写入与失败条目数"""
+        with self._lock:
+            return {"pending": len(self._pending), "failed": len(self._failed)}
+
+    def close(self):
+        """关闭日志文件（未完成的条目在下次启动时重放）"""
+        with self._lock:
+            self._file.close()
+
+async def flush_pending(
+    journal: WriteJournal,
+    create: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    lookup: Callable[[str, Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]],
+    run_blocking: Callable[..., Awaitable[Any]]
+) -> AsyncIterator[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """按登记顺序提交待写入条目，逐条产出已写入的 (临时ID, payload, 页面)
+
+    Args:
+        create: 创建页面 create(临时ID, payload)
+        lookup: 按标记查找此前可能已创建的页面 lookup(临时ID, payload)，未找到返回 None
+        run_blocking: 在线程池中执行日志的阻塞调用（落盘）
+
+    请求被拒绝（4xx，429除外）的条目记为失败；其他错误保持顺序，留待下一轮。
+    """
+    for entry_id, payload, attempted in await run_blocking(journal.pending_entries):
+        page = await lookup(entry_id, payload) if attempted else None
+        if page is not None:
+            logger.info(f"写后日志条目 {entry_id} 已存在于Notion: {page['id']}")
+        else:
+            await run_blocking(journal.begin, entry_id)
+            try:
+                page = await create(entry_id, payload)
+            except Exception as e:
+                status = getattr(e, "status", None)
+                if isinstance(status, int) and 400 <= status < 500 and status != 429:
+                    # 请求本身有误，重试也不会成功
+                    await run_blocking(journal.fail, entry_id, str(e))
+                    logger.error(f"写后日志条目 {entry_id} 写入失败，已放弃: {e}")
+                    continue
+                # 瞬时错误（已由限流器重试过）或结果未知，下一轮先对账再决定是否重新创建
+                logger.warning(f"写后日志条目 {entry_id} 暂时无法写入，稍后重试: {e}")
+                break
+
+        await run_blocking(journal.complete, entry_id, page["id"])
+        yield entry_id, payload, page
@@ -0,0 +1,212 @@
+"""
+批量导入管线 - 解析、目标匹配、写入三个阶段并发流水线
+
+各阶段之间用有界队列连接，每个阶段有自己的工作线程；上游过快时在队列上阻塞（背压）。
+按序输出的重排缓冲区同样有界：已读入但尚未输出的条目数不超过重排窗口，
+队首条目处理缓慢时读取暂停，而不是把后续结果全部堆积在缓冲区中，内存占用与文件大小无关。写入阶段共享Notion令牌桶，吞吐受配额而非单次请求延迟限制。
+结果按输入顺序回调，因此进度输出保持有序。
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+@dataclass
+class IngestItem:
+    """流经管线的一条输入"""
+    seq: int
+    line_no: int
+    text: str
+    parsed: Optional[Dict[str, Any]] = None
+    goal: Any = None
+    success: bool = False
+    error: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class IngestStats:
+    """批量导入统计"""
+    total: int = 0
+    succeeded: int = 0
+    parse_failed: int = 0
+    write_failed: int = 0
+    elapsed: float = 0.0
+    max_buffered: int = 0  # 重排缓冲区中等待输出的最大条目数
+
+    @property
+    def throughput(self) -> float:
+        return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+class BatchIngestPipeline:
+    """解析 -> 目标匹配 -> 写入 流水线"""
+
+    def __init__(
+        self,
+        parse_batch: Callable[[List[str]], List[Optional[Dict[str, Any]]]],
+        match: Callable[[Dict[str, Any]], Any],
+        write: Callable[[IngestItem], bool],
+        on_result: Callable[[IngestItem], None],
+        batch_size: int = 20,
+        parse_workers: int = 2,
+        write_workers: int = 3,
+        queue_size: int = 100,
+        reorder_window: Optional[int] = None
+    ):
+        """初始化管线
+
+        Args:
+            parse_batch: 批量解析函数，返回与输入等长的结果列表
+            match: 为解析结果匹配目标，返回目标或 None
+            write: 写入一条记录，返回是否成功（可在 item.extra 中附带输出信息）
+            on_result: 按输入顺序回调每条处理结果
+            batch_size: 解析阶段每批条数
+            parse_workers: 解析线程数
+            write_workers: 写入线程数
+            queue_size: 阶段间队列容量
+            reorder_window: 已读入但尚未按序输出的最大条目数，默认 2 × queue_size（至少一批）
+        """
+        self.parse_batch = parse_batch
+        self.match = match
+        self.write = write
+        self.on_result = on_result
+        self.batch_size = max(1, batch_size)
+        self.parse_workers = max(1, parse_workers)
+        self.write_workers = max(1, write_workers)
+
+        self._parse_q: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size // self.batch_size))
+        self._match_q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._write_q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._done_q: "queue.Queue" = queue.Queue()
+        # 每读入一条取一个许可，按序输出后归还；完成队列与重排缓冲区因此都不超过窗口大小
+        self.reorder_window = max(self.batch_size, reorder_window or 2 * queue_size)
+        self._window = threading.Semaphore(self.reorder_window)
+
+    def run(self, entries: Iterable[Tuple[int, str, Optional[Dict[str, Any]]]]) -> IngestStats:
+        """处理全部输入
+
+        Args:
+            entries: (行号, 文本, 预先解析的结果或 None)，按顺序产出
+
+        Returns:
+            导入统计
+        """
+        stats = IngestStats()
+        started = time.perf_counter()
+
+        parse_threads = self._start(self._parse_worker, self.parse_workers, "ingest-parse")
+        match_threads = self._start(self._match_worker, 1, "ingest-match")
+        write_threads = self._start(self._write_worker, self.write_workers, "ingest-write")
+        printer = self._start(lambda: self._collect(stats), 1, "ingest-output")
+
+        try:
+            batch: List[IngestItem] = []
+            for seq, (line_no, text, parsed) in enumerate(entries):
+                self._window.acquire()
+                batch.append(IngestItem(seq=seq, line_no=line_no, text=text, parsed=parsed))
+                if len(batch) >= self.batch_size:
+                    self._parse_q.put(batch)
+                    batch = []
+            if batch:
+                self._parse_q.put(batch)
+        finally:
+            # 逐级关闭：上一阶段全部退出后再通知下一阶段
+            self._shutdown(self._parse_q, parse_threads)
+            self._shutdown(self._match_q, match_threads)
+            self._shutdown(self._write_q, write_threads)
+            self._shutdown(self._done_q, printer)
+
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    @staticmethod
+    def _start(target: Callable[[], None], count: int, name: str) -> List[threading.Thread]:
+        threads = [threading.Thread(target=target, name=f"{name}-{i}", daemon=True) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    @staticmethod
+    def _shutdown(q: "queue.Queue", threads: List[threading.Thread]):
+        for _ in threads:
+            q.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    def _parse_worker(self):
+        while True:
+            batch = self._parse_q.get()
+            if batch is _STOP:
+                return
+            pending = [item for item in batch if item.parsed is None]
+            if pending:
+                try:
+                    results = self.parse_batch([item.text for item in pending])
+                except Exception as e:
+                    logger.error(f"❌ 批量解析失败: {e}")
+                    results = [None] * len(pending)
+                for item, parsed in zip(pending, results):
+                    item.parsed = parsed
+            for item in batch:
+                if item.parsed:
+                    self._match_q.put(item)
+                else:
+                    item.error = "parse"
+                    self._done_q.put(item)
+
+    def _match_worker(self):
+        while True:
+            item = self._match_q.get()
+            if item is _STOP:
+                return
+            try:
+                item.goal = self.match(item.parsed)
+            except Exception as e:
+                logger.warning(f"⚠️ 目标匹配失败: {e}")
+            self._write_q.put(item)
+
+    def _write_worker(self):
+        while True:
+            item = self._write_q.get()
+            if item is _STOP:
+                return
+            try:
+                item.success = self.write(item)
+            except Exception as e:
+                logger.error(f"❌ 写入失败: {e}")
+                item.success = False
+            if not item.success:
+                item.error = "write"
+            self._done_q.put(item)
+
+    def _collect(self, stats: IngestStats):
+        """按输入顺序输出结果（乱序完成的条目在缓冲区中等待）"""
+        pending: Dict[int, IngestItem] = {}
+        next_seq = 0
+        while True:
+            item = self._done_q.get()
+            if item is _STOP:
+                return
+            pending[item.seq] = item
+            stats.max_buffered = max(stats.max_buffered, len(pending))
+            while next_seq in pending:
+                ready = pending.pop(next_seq)
+                next_seq += 1
+                self._window.release()
+                stats.total += 1
+                if ready.success:
+                    stats.succeeded += 1
+                elif ready.error == "parse":
+                    stats.parse_failed += 1
+                else:
+                    stats.write_failed += 1
+                try:
+                    self.on_result(ready)
+                except Exception as e:
+                    logger.warning(f"⚠️ 输出处理结果失败: {e}")
@@ -0,0 +1,354 @@
+"""
+目标追踪 - 目标实际投入时间的增量汇总、活跃目标缓存与目标匹配索引
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+def page_goal_contribution(page: Dict[str, Any]) -> Tuple[List[str], int]:
+    """从时间记录的Notion页面中提取 (关联目标ID列表, 时长分钟)"""
+    props = page.get('properties', {})
+    goal_ids = [rel['id'] for rel in (props.get('Goal') or {}).get('relation', [])]
+    duration = (props.get('Duration (Minutes)') or {}).get('number')
+    try:
+        duration = int(duration or 0)
+    except (TypeError, ValueError):
+        duration = 0
+    return goal_ids, duration
+
+class GoalTimeLedger:
+    """每个目标的实际投入时间累计
+
+    首次查询某个目标时从数据源（Notion或本地镜像）重建，之后记录的创建、更新、归档
+    按增量修正，查询为O(1)。不变量：已加载目标的每一条关联记录都在 _contributions 中，
+    因此未见过的记录一定不属于任何已加载目标，更新时可直接按新值累加。
+    """
+
+    def __init__(self, loader: Callable[[Sequence[str]], Iterable[Tuple[str, List[str], int]]], ttl: float = 600):
+        """初始化
+
+        Args:
+            loader: 数据源批量读取函数，接收一组目标ID，返回关联到其中任一目标的全部记录
+                [(record_id, 记录关联的目标ID列表, duration), ...]
+            ttl: 已加载目标的有效期(秒)，过期后从数据源重建，用于吸收外部修改
+        """
+        self._loader = loader
+        self.ttl = ttl
+        self._totals: Dict[str, int] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._contributions: Dict[str, Tuple[Tuple[str, ...], int]] = {}
+        self._goal_writes: Dict[str, int] = {}  # 每个目标的写入计数，用于检测加载期间的并发写入
+        self._lock = threading.RLock()
+
+    def get(self, goal_id: str) -> int:
+        """获取目标的实际投入时间(分钟)，未加载或已过期时从数据源重建"""
+        return self.get_many([goal_id])[goal_id]
+
+    def get_many(self, goal_ids: Sequence[str]) -> Dict[str, int]:
+        """批量获取目标的实际投入时间；所有未加载的目标通过一次数据源查询一并重建"""
+        result: Dict[str, int] = {}
+        missing: List[str] = []
+        with self._lock:
+            for goal_id in dict.fromkeys(goal_ids):
+                if self._is_fresh(goal_id):
+                    result[goal_id] = self._totals[goal_id]
+                else:
+                    missing.append(goal_id)
+            writes_before = {goal_id: self._goal_writes.get(goal_id, 0) for goal_id in missing}
+
+        if not missing:
+            return result
+
+        # 在锁外读取数据源，避免慢查询阻塞其他目标；按目标关系在内存中分组
+        totals = {goal_id: 0 for goal_id in missing}
+        members: Dict[str, Dict[str, int]] = {goal_id: {} for goal_id in missing}
+        for record_id, record_goal_ids, duration in self._loader(missing):
+            for goal_id in record_goal_ids:
+                if goal_id in totals:
+                    totals[goal_id] += duration
+                    members[goal_id][record_id] = duration
+
+        with self._lock:
+            now = time.monotonic()
+            for goal_id in missing:
+                result[goal_id] = totals[goal_id]
+                if self._goal_writes.get(goal_id, 0) != writes_before[goal_id]:
+                    # 加载期间该目标有写入，结果可能已包含或遗漏该写入，本次不缓存
+                    continue
+                self._totals[goal_id] = totals[goal_id]
+                self._loaded_at[goal_id] = now
+                self._index_members(goal_id, members[goal_id])
+        return result
+
+    def _index_members(self, goal_id: str, records: Dict[str, int]):
+        """登记目标的关联记录，调用方需持有锁"""
+        # 数据源中已不再关联该目标的记录（外部修改）从贡献表中解除关联
+        for record_id, (goal_ids, duration) in list(self._contributions.items()):
+            if goal_id in goal_ids and record_id not in records:
+                self._contributions[record_id] = (tuple(g for g in goal_ids if g != goal_id), duration)
+
+        for record_id, duration in records.items():
+            goal_ids, _ = self._contributions.get(record_id, ((), 0))
+            if goal_id not in goal_ids:
+                goal_ids = goal_ids + (goal_id,)
+            self._contributions[record_id] = (goal_ids, duration)
+
+    def _is_fresh(self, goal_id: str) -> bool:
+        """调用方需持有锁"""
+        loaded_at = self._loaded_at.get(goal_id)
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    def _touch(self, goal_ids: Iterable[str]):
+        """调用方需持有锁"""
+        for goal_id in goal_ids:
+            self._goal_writes[goal_id] = self._goal_writes.get(goal_id, 0) + 1
+
+    def apply_record(self, record_id: str, goal_ids: Sequence[str], duration: int):
+        """记录创建或更新后修正相关目标的累计值"""
+        with self._lock:
+            old_goal_ids, old_duration = self._contributions.get(record_id, ((), 0))
+            self._touch(old_goal_ids + tuple(goal_ids))
+            for goal_id in old_goal_ids:
+                if goal_id in self._totals:
+                    self._totals[goal_id] -= old_duration
+            for goal_id in goal_ids:
+                if goal_id in self._totals:
+                    self._totals[goal_id] += duration
+            self._contributions[record_id] = (tuple(goal_ids), duration)
+
+    def remove_record(self, record_id: str):
+        """记录归档后从相关目标的累计值中扣除"""
+        with self._lock:
+            goal_ids, duration = self._contributions.pop(record_id, ((), 0))
+            self._touch(goal_ids)
+            for goal_id in goal_ids:
+                if goal_id in self._totals:
+                    self._totals[goal_id] -= duration
+
+    def rebuild(self, goal_id: Optional[str] = None):
+        """丢弃指定目标（或全部目标）的累计值，下次查询时从数据源重建"""
+        with self._lock:
+            goal_ids = [goal_id] if goal_id else list(self._totals)
+            self._touch(goal_ids)
+            for gid in goal_ids:
+                self._totals.pop(gid, None)
+                self._loaded_at.pop(gid, None)
+            if goal_id is None:
+                self._contributions.clear()
+
+class ActiveGoalCache:
+    """活跃目标集合的缓存（按日期，带TTL）
+
+    每条解析出的记录都要做目标匹配，而活跃目标列表很少变化。
+    CLI与API共享同一个 SimpleTimeAgent 实例上的缓存；目标的增删改需显式失效。
+    命中时返回同一个列表对象，调用方可据此判断目标集合是否变化。
+    """
+
+    def __init__(self, ttl: float = 300, max_dates: int = 32):
+        self.ttl = ttl
+        self.max_dates = max_dates
+        self._entries: Dict[Any, Tuple[float, List[Any]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, current_date: Any, loader: Callable[[], List[Any]]) -> List[Any]:
+        """获取某日期的活跃目标，未命中或过期时调用 loader 加载（加载失败时异常向上抛出）"""
+        with self._lock:
+            entry = self._entries.get(current_date)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        goals = loader()
+
+        with self._lock:
+            if len(self._entries) >= self.max_dates:
+                oldest = min(self._entries, key=lambda key: self._entries[key][0])
+                self._entries.pop(oldest)
+            self._entries[current_date] = (time.monotonic(), goals)
+        return goals
+
+    def invalidate(self, goal_id: Optional[str] = None):
+        """失效缓存：不指定 goal_id 时清空全部；指定时仅从各日期的集合中移除该目标"""
+        with self._lock:
+            if goal_id is None:
+                self._entries.clear()
+                return
+            for key, (loaded_at, goals) in list(self._entries.items()):
+                if any(goal.goal_id == goal_id for goal in goals):
+                    self._entries[key] = (loaded_at, [goal for goal in goals if goal.goal_id != goal_id])
+
+    def refresh_goal(self, goal_id: str, **fields):
+        """就地更新缓存中目标的字段（如进度、状态），不影响集合成员"""
+        with self._lock:
+            for _, goals in self._entries.values():
+                for goal in goals:
+                    if goal.goal_id == goal_id:
+                        for name, value in fields.items():
+                            setattr(goal, name, value)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "cached_dates": len(self._entries)
+            }
+
+_CJK_RUN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_WORD = re.compile(r'[a-z0-9]+')
+
+def tokenize_goal_text(text: str, keywords: Iterable[str] = ()) -> Dict[str, int]:
+    """分词：连续汉字切为字符二元组（单字成段时保留单字），拉丁字母/数字按词切分
+
+    Args:
+        text: 待分词文本
+        keywords: 文本中识别出的活动关键词，作为额外的整词token（提高已配置活动的权重）
+
+    Returns:
+        {token: 出现次数}
+    """
+    tokens: Dict[str, int] = {}
+    for keyword in keywords:
+        token = f"#{keyword.lower()}"
+        tokens[token] = tokens.get(token, 0) + 1
+    text = text.lower()
+    for run in _CJK_RUN.findall(text):
+        grams = [run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)]
+        for gram in grams:
+            tokens[gram] = tokens.get(gram, 0) + 1
+    for word in _WORD.findall(text):
+        if len(word) > 1:
+            tokens[word] = tokens.get(word, 0) + 1
+    return tokens
+
+class GoalMatcher:
+    """活跃目标的倒排索引匹配器
+
+    目标标题分词后建立 token -> 目标ID 的倒排表。匹配时只遍历输入文本的token及其倒排表，
+    开销与输入长度成正比，与目标数量基本无关。候选按 token长度 × idf 的加权重合度排序，
+    原始重合度（共享token的总长度）至少为2才视为匹配，与原先的阈值一致。
+    """
+
+    MIN_OVERLAP = 2
+
+    def __init__(self, keyword_finder: Optional[Callable[[str], Iterable[str]]] = None):
+        """初始化匹配器
+
+        Args:
+            keyword_finder: 从文本中识别活动关键词的函数（如 ActivityMatcher.find_all）
+        """
+        self._keyword_finder = keyword_finder
+        self._goals: Dict[str, Tuple[Any, Dict[str, int], int]] = {}  # goal_id -> (goal, tokens, 序号)
+        self._postings: Dict[str, set] = {}
+        self._source: Optional[List[Any]] = None
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def add(self, goal: Any):
+        """加入或更新目标（标题未变时仅替换目标对象）"""
+        with self._lock:
+            self._add(goal)
+
+    def remove(self, goal_id: str):
+        """移除目标"""
+        with self._lock:
+            self._remove(goal_id)
+
+    def sync(self, goals: List[Any]):
+        """与活跃目标列表同步；传入与上次相同的列表对象时不做任何工作"""
+        with self._lock:
+            self._sync(goals)
+
+    def match(self, text: str, goals: Optional[List[Any]] = None) -> Optional[Tuple[Any, int]]:
+        """为活动描述找到最匹配的目标
+
+        Args:
+            text: 活动描述
+            goals: 当前活跃目标列表，传入时先与索引同步
+
+        Returns:
+            (目标, 原始重合度)，无匹配时返回 None
+        """
+        tokens = self._tokenize(text)
+        with self._lock:
+            if goals is not None:
+                self._sync(goals)
+            if not tokens or not self._goals:
+                return None
+
+            total = len(self._goals)
+            weighted: Dict[str, float] = {}
+            overlap: Dict[str, int] = {}
+            for token in tokens:
+                posting = self._postings.get(token)
+                if not posting:
+                    continue
+                # 活动关键词token只提高排序权重，不计入原始重合度
+                keyword = token.startswith('#')
+                length = len(token) - 1 if keyword else len(token)
+                weight = length * (1.0 + math.log(total / len(posting)))
+                for goal_id in posting:
+                    weighted[goal_id] = weighted.get(goal_id, 0.0) + weight
+                    if not keyword:
+                        overlap[goal_id] = overlap.get(goal_id, 0) + length
+
+            if not weighted:
+                return None
+            # 得分相同时保留先加入的目标
+            best_id = max(weighted, key=lambda goal_id: (weighted[goal_id], -self._goals[goal_id][2]))
+            if overlap.get(best_id, 0) < self.MIN_OVERLAP:
+                return None
+            return self._goals[best_id][0], overlap[best_id]
+
+    def _tokenize(self, text: str) -> Dict[str, int]:
+        keywords = self._keyword_finder(text) if self._keyword_finder else ()
+        return tokenize_goal_text(text, keywords)
+
+    def _sync(self, goals: List[Any]):
+        """调用方需持有锁"""
+        if goals is self._source:
+            return
+        current = {goal.goal_id for goal in goals}
+        for goal_id in [goal_id for goal_id in self._goals if goal_id not in current]:
+            self._remove(goal_id)
+        for goal in goals:
+            self._add(goal)
+        self._source = goals
+
+    def _add(self, goal: Any):
+        """调用方需持有锁"""
+        existing = self._goals.get(goal.goal_id)
+        if existing and existing[0].title == goal.title:
+            self._goals[goal.goal_id] = (goal, existing[1], existing[2])
+            return
+        if existing:
+            self._remove(goal.goal_id)
+        tokens = self._tokenize(goal.title)
+        self._seq += 1
+        self._goals[goal.goal_id] = (goal, tokens, self._seq)
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(goal.goal_id)
+
+    def _remove(self, goal_id: str):
+        """调用方需持有锁"""
+        entry = self._goals.pop(goal_id, None)
+        if not entry:
+            return
+        for token in entry[1]:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.discard(goal_id)
+                if not posting:
+                    del self._postings[token]
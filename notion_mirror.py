@@ -0,0 +1,360 @@
+"""
+Notion本地镜像 - 将时间记录与目标数据库增量同步到本地SQLite
+
+读路径（报告、仪表板、目标进度）查询本地镜像，写入仍然直接发往Notion，
+Notion始终是唯一的数据源；写入成功后用Notion返回的页面回写镜像。
+"""
+
+import datetime
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    start_ts INTEGER,
+    activity TEXT,
+    duration INTEGER NOT NULL DEFAULT 0,
+    last_edited_time TEXT,
+    page_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_start ON records(start_ts);
+CREATE INDEX IF NOT EXISTS idx_records_activity ON records(activity, start_ts);
+
+CREATE TABLE IF NOT EXISTS record_goals (
+    record_id TEXT NOT NULL,
+    goal_id TEXT NOT NULL,
+    PRIMARY KEY (record_id, goal_id)
+);
+CREATE INDEX IF NOT EXISTS idx_record_goals_goal ON record_goals(goal_id);
+
+CREATE TABLE IF NOT EXISTS goals (
+    id TEXT PRIMARY KEY,
+    deadline TEXT,
+    status TEXT,
+    last_edited_time TEXT,
+    page_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_goals_deadline ON goals(deadline, status);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    database_id TEXT PRIMARY KEY,
+    watermark TEXT,
+    synced_at REAL
+);
+"""
+
+def _normalize_id(notion_id: Optional[str]) -> str:
+    """Notion ID 去掉连字符后比较（配置中的ID可能不带连字符）"""
+    return (notion_id or '').replace('-', '')
+
+def _parse_iso(value: str) -> datetime.datetime:
+    """解析Notion返回的ISO时间（兼容 Z 结尾）"""
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+class NotionMirror:
+    """Notion数据库的本地SQLite镜像
+
+    同步方式：以页面的 last_edited_time 为水位线轮询，只拉取水位线之后变更的页面；
+    归档/删除的页面在本地删除。databases.query 不会返回已归档页面，
+    因此经由本程序的归档操作会直接调用 mark_archived，外部归档由定期全量同步（full=True）清理。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        iter_query: Callable[..., Iterator[Dict[str, Any]]],
+        database_id: str,
+        goals_database_id: Optional[str] = None,
+        timezone: Optional[datetime.tzinfo] = None,
+        sync_interval: int = 60
+    ):
+        """初始化镜像
+
+        Args:
+            db_path: SQLite文件路径
+            iter_query: 分页读取Notion数据库的函数，签名为 iter_query(database_id, **query)
+            database_id: 时间记录数据库ID
+            goals_database_id: 目标数据库ID（可选）
+            timezone: 按日期查询时使用的本地时区
+            sync_interval: 后台同步间隔(秒)；超过 3 个间隔未成功同步的镜像视为过期，读路径不再使用
+        """
+        self.db_path = db_path
+        self.iter_query = iter_query
+        self.database_id = database_id
+        self.goals_database_id = goals_database_id
+        self.timezone = timezone or datetime.timezone.utc
+        self.sync_interval = sync_interval
+
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._last_sync = 0.0
+
+    # =============== 同步 ===============
+
+    @property
+    def ready(self) -> bool:
+        """所有已配置的数据库都至少完成过一次同步"""
+        with self._lock:
+            rows = self._conn.execute("SELECT database_id FROM sync_state").fetchall()
+        synced = {row['database_id'] for row in rows}
+        return all(db_id in synced for db_id in self._database_ids())
+
+    @property
+    def usable(self) -> bool:
+        """读路径是否可以使用镜像：已完成首次同步，且最近一次同步未过期
+
+        读路径只做判断、不触发同步（同步由后台任务负责），不可用时调用方直接读取Notion。
+        """
+        if time.monotonic() - self._last_sync >= 3 * self.sync_interval:
+            return False
+        return self.ready
+
+    def _database_ids(self) -> List[str]:
+        return [db_id for db_id in (self.database_id, self.goals_database_id) if db_id]
+
+    def sync(self, full: bool = False) -> int:
+        """同步所有数据库，返回变更的页面数
+
+        Args:
+            full: 全量同步，并删除Notion中已不存在（包括被外部归档）的页面
+        """
+        with self._sync_lock:
+            return self._sync_all(full)
+
+    def _sync_all(self, full: bool) -> int:
+        """同步所有数据库，调用方需持有 _sync_lock"""
+        changed = 0
+        for db_id in self._database_ids():
+            changed += self._sync_database(db_id, full)
+        self._last_sync = time.monotonic()
+        if changed:
+            logger.info(f"🔄 本地镜像同步完成: {changed} 个页面变更")
+        return changed
+
+    def _sync_database(self, database_id: str, full: bool) -> int:
+        """按 last_edited_time 水位线同步单个数据库"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT watermark FROM sync_state WHERE database_id = ?", (database_id,)
+            ).fetchone()
+        watermark = row['watermark'] if row else None
+
+        query: Dict[str, Any] = {
+            "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]
+        }
+        if watermark and not full:
+            # last_edited_time 精度为分钟，使用 on_or_after 并依赖幂等的 upsert
+            query["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": watermark}
+            }
+
+        changed = 0
+        seen: Set[str] = set()
+        new_watermark = watermark
+        for page in self.iter_query(database_id, **query):
+            seen.add(page['id'])
+            edited = page.get('last_edited_time')
+            if edited and (new_watermark is None or edited > new_watermark):
+                new_watermark = edited
+            if self._apply_page(page, database_id):
+                changed += 1
+
+        with self._lock, self._conn:
+            if full:
+                changed += self._delete_missing(database_id, seen)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (database_id, watermark, synced_at) VALUES (?, ?, ?)",
+                (database_id, new_watermark, time.time())
+            )
+        return changed
+
+    def _delete_missing(self, database_id: str, seen: Set[str]) -> int:
+        """全量同步后删除本地多余的页面，调用方需持有锁并处于事务中"""
+        table = 'records' if database_id == self.database_id else 'goals'
+        local_ids = {row['id'] for row in self._conn.execute(f"SELECT id FROM {table}")}
+        missing = local_ids - seen
+        for page_id in missing:
+            self._delete(page_id)
+        return len(missing)
+
+    # =============== 写入 ===============
+
+    def upsert_page(self, page: Dict[str, Any]) -> bool:
+        """写穿：用Notion写入接口返回的页面更新镜像"""
+        parent_id = _normalize_id((page.get('parent') or {}).get('database_id'))
+        for db_id in self._database_ids():
+            if parent_id == _normalize_id(db_id):
+                return self._apply_page(page, db_id)
+        return False
+
+    def mark_archived(self, page_id: str):
+        """页面已在Notion中归档，从镜像中删除"""
+        with self._lock, self._conn:
+            self._delete(page_id)
+
+    def _apply_page(self, page: Dict[str, Any], database_id: str) -> bool:
+        """写入或删除单个页面，返回是否产生变更"""
+        with self._lock, self._conn:
+            if page.get('archived') or page.get('in_trash'):
+                return self._delete(page['id'])
+            if database_id == self.database_id:
+                self._upsert_record(page)
+            else:
+                self._upsert_goal(page)
+            return True
+
+    def _upsert_record(self, page: Dict[str, Any]):
+        props = page.get('properties', {})
+        start = ((props.get('Start Time') or {}).get('date') or {}).get('start')
+        start_ts = int(_parse_iso(start).timestamp()) if start else None
+        activity = ((props.get('支出项') or {}).get('select') or {}).get('name')
+        duration = (props.get('Duration (Minutes)') or {}).get('number')
+        goal_ids = [rel['id'] for rel in (props.get('Goal') or {}).get('relation', [])]
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO records (id, start_ts, activity, duration, last_edited_time, page_json) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (page['id'], start_ts, activity, int(duration or 0),
+             page.get('last_edited_time'), json.dumps(page, ensure_ascii=False))
+        )
+        self._conn.execute("DELETE FROM record_goals WHERE record_id = ?", (page['id'],))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO record_goals (record_id, goal_id) VALUES (?, ?)",
+            [(page['id'], goal_id) for goal_id in goal_ids]
+        )
+
+    def _upsert_goal(self, page: Dict[str, Any]):
+        props = page.get('properties', {})
+        deadline = ((props.get('Deadline') or {}).get('date') or {}).get('start')
+        status = ((props.get('Status') or {}).get('status') or {}).get('name')
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO goals (id, deadline, status, last_edited_time, page_json) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (page['id'], deadline[:10] if deadline else None, status,
+             page.get('last_edited_time'), json.dumps(page, ensure_ascii=False))
+        )
+
+    def _delete(self, page_id: str) -> bool:
+        """删除页面，调用方需持有锁并处于事务中"""
+        deleted = self._conn.execute("DELETE FROM records WHERE id = ?", (page_id,)).rowcount
+        deleted += self._conn.execute("DELETE FROM goals WHERE id = ?", (page_id,)).rowcount
+        self._conn.execute("DELETE FROM record_goals WHERE record_id = ?", (page_id,))
+        return deleted > 0
+
+    # =============== 查询 ===============
+
+    def _day_bounds(self, start_date: datetime.date, end_date: datetime.date):
+        """本地时区下 [start_date 00:00, end_date+1 00:00) 对应的epoch秒"""
+        def midnight(day: datetime.date) -> int:
+            naive = datetime.datetime.combine(day, datetime.time())
+            if hasattr(self.timezone, 'localize'):
+                aware = self.timezone.localize(naive)
+            else:
+                aware = naive.replace(tzinfo=self.timezone)
+            return int(aware.timestamp())
+        return midnight(start_date), midnight(end_date + datetime.timedelta(days=1))
+
+    def record_pages(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        descending: bool = False
+    ) -> List[Dict[str, Any]]:
+        """按开始时间查询日期范围内的时间记录页面"""
+        lower, upper = self._day_bounds(start_date, end_date)
+        order = 'DESC' if descending else 'ASC'
+        sql = (f"SELECT page_json FROM records WHERE start_ts >= ? AND start_ts < ? "
+               f"ORDER BY start_ts {order}, id {order}")
+        params: List[Any] = [lower, upper]
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row['page_json']) for row in rows]
+
+    def iter_record_pages(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        chunk_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """分块逐条读取日期范围内的时间记录页面（按开始时间升序）"""
+        offset = 0
+        while True:
+            chunk = self.record_pages(start_date, end_date, limit=chunk_size, offset=offset)
+            yield from chunk
+            if len(chunk) < chunk_size:
+                break
+            offset += chunk_size
+
+    def count_records(self, start_date: datetime.date, end_date: datetime.date) -> int:
+        """统计日期范围内的时间记录条数"""
+        lower, upper = self._day_bounds(start_date, end_date)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS n FROM records WHERE start_ts >= ? AND start_ts < ?",
+                (lower, upper)
+            ).fetchone()
+        return row['n']
+
+    def active_goal_pages(self, current_date: datetime.date) -> List[Dict[str, Any]]:
+        """截止日期>=current_date 且状态不是 Completed 的目标页面"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page_json FROM goals WHERE deadline >= ? AND (status IS NULL OR status != 'Completed') "
+                "ORDER BY deadline",
+                (current_date.isoformat(),)
+            ).fetchall()
+        return [json.loads(row['page_json']) for row in rows]
+
+    def completed_goal_pages(self, since: datetime.datetime) -> List[Dict[str, Any]]:
+        """状态为 Completed 且在 since 之后编辑过的目标页面"""
+        # last_edited_time 为Notion返回的UTC时间字符串，同格式前缀可直接按字符串比较
+        bound = since.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page_json FROM goals WHERE status = 'Completed' AND last_edited_time >= ? "
+                "ORDER BY last_edited_time",
+                (bound,)
+            ).fetchall()
+        return [json.loads(row['page_json']) for row in rows]
+
+    def goal_records(self, goal_ids: List[str]) -> List[Tuple[str, List[str], int]]:
+        """关联到任一给定目标的时间记录 (记录ID, 关联目标ID列表, 时长分钟)"""
+        if not goal_ids:
+            return []
+        placeholders = ','.join('?' * len(goal_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT r.id, r.duration, g.goal_id FROM record_goals g "
+                f"JOIN records r ON r.id = g.record_id WHERE g.goal_id IN ({placeholders})",
+                list(goal_ids)
+            ).fetchall()
+
+        records: Dict[str, Tuple[List[str], int]] = {}
+        for row in rows:
+            goal_list, _ = records.setdefault(row['id'], ([], int(row['duration'])))
+            goal_list.append(row['goal_id'])
+        return [(record_id, goal_list, duration) for record_id, (goal_list, duration) in records.items()]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,198 @@
+"""
+Notion请求限流与重试 - 进程内共享的令牌桶，以及包装Notion客户端的限流重试代理
+
+Notion API 对每个集成的平均请求速率有限制（约3次/秒）。所有Notion调用都经由
+ThrottledNotion 取令牌；遇到429或瞬时5xx时按指数退避（带抖动）重试，并遵循 Retry-After，
+限流期间整个进程暂停发送，避免并发请求一起撞上限制。
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from notion_client.errors import RequestTimeoutError
+except ImportError:
+    RequestTimeoutError = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# 可以安全重试的瞬时错误状态码
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# 非幂等调用（创建类）只在确认请求未被处理时重试
+NON_IDEMPOTENT_RETRYABLE_STATUS = {429, 503}
+NON_IDEMPOTENT_CALLS = {"pages.create", "blocks.children.append", "comments.create"}
+# 代理只包装这些命名空间及其中的方法
+ENDPOINTS = {"databases", "pages", "blocks", "children", "users", "comments", "data_sources"}
+UNWRAPPED = {"close"}
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数（<=0 表示不限流）
+            burst: 桶容量，即允许的最大突发请求数
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited = 0.0  # 累计等待时间(秒)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """取出令牌，不足或处于暂停期时阻塞等待，返回本次等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._paused_until - now
+                if delay <= 0:
+                    if self.rate <= 0:
+                        self.waited += waited
+                        return waited
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        self.waited += waited
+                        return waited
+                    delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """在指定时间内暂停发放令牌（收到429时由调用方设置）"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            # 暂停期间不补充令牌，恢复后从零开始按速率发放，避免暂停结束时整桶突发
+            self._updated = self._paused_until
+
+class RetryPolicy:
+    """重试策略：指数退避 + 全抖动，优先使用服务端的 Retry-After"""
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """第 attempt 次重试前的等待秒数（attempt 从0开始）"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            return max(retry_after, backoff)
+        return backoff
+
+def _error_status(error: Exception) -> Optional[int]:
+    """从Notion客户端异常中取HTTP状态码
+
+    连接未建立（请求肯定未送达）视为503；读超时等请求可能已被处理的情况视为504。
+    """
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status
+    if httpx is not None and isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return 503
+    if RequestTimeoutError is not None and isinstance(error, RequestTimeoutError):
+        return 504
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return 504
+    return None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(error, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class NotionThrottle:
+    """共享的限流器与重试执行器，并统计重试与等待指标"""
+
+    def __init__(self, bucket: TokenBucket, policy: Optional[RetryPolicy] = None):
+        self.bucket = bucket
+        self.policy = policy or RetryPolicy()
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, float] = {
+            "calls": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "failures": 0,
+            "backoff_wait": 0.0
+        }
+
+    def _count(self, name: str, value: float = 1):
+        with self._lock:
+            self._metrics[name] += value
+
+    def call(self, name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """取令牌后执行调用，瞬时错误按策略重试"""
+        retryable = NON_IDEMPOTENT_RETRYABLE_STATUS if name in NON_IDEMPOTENT_CALLS else RETRYABLE_STATUS
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self._count("calls")
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                status = _error_status(e)
+                if status is None or status not in retryable:
+                    raise
+                self._count("rate_limited" if status == 429 else "server_errors")
+                if attempt >= self.policy.max_retries:
+                    self._count("failures")
+                    raise
+
+                retry_after = _retry_after(e)
+                delay = self.policy.delay(attempt, retry_after)
+                if status == 429:
+                    # 限流对整个集成生效，所有线程一起暂停
+                    self.bucket.pause(delay)
+                logger.warning(f"⚠️ Notion {name} 返回 {status}，{delay:.1f}秒后第 {attempt + 1} 次重试")
+                self._count("retries")
+                self._count("backoff_wait", delay)
+                time.sleep(delay)
+                attempt += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """重试次数、限流/服务端错误次数、退避与令牌等待时间"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["backoff_wait"] = round(metrics["backoff_wait"], 3)
+        metrics["throttled_wait"] = round(self.bucket.waited, 3)
+        return metrics
+
+class ThrottledNotion:
+    """Notion客户端代理：databases/pages/blocks 等命名空间下的所有方法调用都经过 NotionThrottle"""
+
+    def __init__(self, target: Any, throttle: NotionThrottle, path: str = ""):
+        self._target = target
+        self._throttle = throttle
+        self._path = path
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._target, name)
+        if name.startswith("_") or name in UNWRAPPED:
+            return value
+        path = f"{self._path}.{name}" if self._path else name
+        if name in ENDPOINTS and not callable(value):
+            return ThrottledNotion(value, self._throttle, path)
+        if callable(value) and (self._path or name == "search"):
+            return lambda *args, **kwargs: self._throttle.call(path, value, *args, **kwargs)
+        return value
@@ -0,0 +1,220 @@
+"""
+解析结果缓存 - 在Claude之前缓存自然语言输入的结构化解析结果
+
+同一句输入（如每天都会写的"7点到9点阅读"）解析出的结构只与参考日期相关：
+缓存中的时间以相对参考日零点的偏移量保存，命中时再落到当天。
+缓存使用SQLite文件，CLI与API配置同一路径即可共享。
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parse_cache (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_parse_cache_last_used ON parse_cache(last_used);
+"""
+
+# 相对"此刻"的表达（"2小时前"、"刚才"）每次解析结果都不同，不缓存
+_NOW_RELATIVE = re.compile(
+    r'[\d一二两三四五六七八九十半]+\s*个?\s*(小时|钟头|分钟|分)\s*(之)?前|刚才|刚刚|现在|此刻|目前'
+)
+# 星期表达（"周一"）的含义取决于参考日期是星期几
+_WEEKDAY = re.compile(r'(周|星期|礼拜)[一二三四五六日天]')
+# 绝对日期表达（"8月1日"、"2025-08-01"、"3号"、"月底"）相对参考日期的偏移量每天都不同
+# 数字前后不能紧挨数字或冒号，且须是合法的月/日，避免把"14:30-16:00"、"8-9点"、"1.5小时"当作日期
+_MONTH = r'(?:1[0-2]|0?[1-9])'
+_DAY = r'(?:3[01]|[12]\d|0?[1-9])'
+_ABSOLUTE_DATE = re.compile(
+    rf'(?<![\d:.])(?:\d{{4}}\s*[年/\-.]\s*)?{_MONTH}\s*(?:月\s*{_DAY}|[/\-.]\s*{_DAY}(?![\d:.\-]|\s*(?:点|时|小时|分|h)))'
+    rf'|(?<![\d:.]){_DAY}[号日]'
+    r'|月[初中底]|年[初底]'
+)
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_input(text: str) -> str:
+    """规范化输入文本：全角转半角、小写、合并空白"""
+    text = unicodedata.normalize('NFKC', text)
+    return _WHITESPACE.sub(' ', text).strip().lower()
+
+def activity_version(activities: Iterable[str], *extra: str) -> str:
+    """活动分类列表（以及解析模型等影响结果的配置）的版本号"""
+    payload = json.dumps([sorted(activities), list(extra)], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+def reference_scope(normalized: str, reference_date: datetime.date) -> Optional[str]:
+    """输入对参考日期的依赖程度，作为缓存键的一部分
+
+    Returns:
+        None: 相对当前时刻的输入，不可缓存
+        "": 只依赖参考日零点（"7点到9点"、"昨天8点到9点"），任意一天都可复用
+        其他: 依赖星期几或具体日期
+    """
+    if _NOW_RELATIVE.search(normalized):
+        return None
+    if _ABSOLUTE_DATE.search(normalized):
+        return reference_date.isoformat()
+    if _WEEKDAY.search(normalized):
+        return f"w{reference_date.isoweekday()}"
+    return ""
+
+class ParseCache:
+    """基于SQLite的解析结果缓存（LRU淘汰，限制条目数）"""
+
+    def __init__(self, db_path: str = ":memory:", max_entries: int = 5000, timezone: Optional[datetime.tzinfo] = None):
+        """初始化缓存
+
+        Args:
+            db_path: SQLite文件路径，":memory:" 表示仅进程内缓存
+            max_entries: 最大条目数，超出时淘汰最久未使用的条目
+            timezone: 参考日期所在时区
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.timezone = timezone or datetime.timezone.utc
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+
+    def _key(self, text: str, version: str, reference_date: datetime.date) -> Optional[str]:
+        normalized = normalize_input(text)
+        scope = reference_scope(normalized, reference_date)
+        if scope is None:
+            return None
+        return hashlib.sha1(f"{version}\x1f{scope}\x1f{normalized}".encode('utf-8')).hexdigest()
+
+    def _midnight(self, reference_date: datetime.date) -> datetime.datetime:
+        naive = datetime.datetime.combine(reference_date, datetime.time.min)
+        if hasattr(self.timezone, 'localize'):
+            return self.timezone.localize(naive)
+        return naive.replace(tzinfo=self.timezone)
+
+    def get(self, text: str, version: str, reference_date: datetime.date) -> Optional[Dict[str, Any]]:
+        """查询缓存，命中时返回落到参考日期上的解析结果"""
+        key = self._key(text, version, reference_date)
+        if key is None:
+            with self._lock:
+                self.uncacheable += 1
+            return None
+
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM parse_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE parse_cache SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                    (time.time(), key)
+                )
+
+        payload = json.loads(row[0])
+        midnight = self._midnight(reference_date)
+        start_time = self._at(midnight, payload.pop('start_offset'))
+        end_time = self._at(midnight, payload.pop('end_offset'))
+        payload.update(
+            start_time=start_time,
+            end_time=end_time,
+            duration=int((end_time - start_time).total_seconds() / 60)
+        )
+        return payload
+
+    def _at(self, midnight: datetime.datetime, offset: int) -> datetime.datetime:
+        moment = midnight + datetime.timedelta(seconds=offset)
+        if hasattr(self.timezone, 'normalize'):
+            moment = self.timezone.normalize(moment)
+        return moment
+
+    def put(self, text: str, version: str, reference_date: datetime.date, result: Dict[str, Any]):
+        """写入解析结果（时间转换为相对参考日零点的偏移量）"""
+        key = self._key(text, version, reference_date)
+        if key is None:
+            return
+
+        midnight = self._midnight(reference_date)
+        payload = {
+            'activity': result['activity'],
+            'description': result.get('description', ''),
+            'confidence': result.get('confidence', 1.0),
+            'start_offset': int((result['start_time'] - midnight).total_seconds()),
+            'end_offset': int((result['end_time'] - midnight).total_seconds())
+        }
+        now = time.time()
+        with self._lock, self._conn:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO parse_cache (key, payload, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payload, ensure_ascii=False), now, now)
+            ).rowcount
+            if not inserted:
+                self._conn.execute(
+                    "UPDATE parse_cache SET payload = ?, last_used = ? WHERE key = ?",
+                    (json.dumps(payload, ensure_ascii=False), now, key)
+                )
+            self._count += inserted
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的条目至上限的90%，调用方需持有锁并处于事务中"""
+        # 文件可能被多个进程共享，淘汰前重新计数
+        self._count = self._conn.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess <= 0:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM parse_cache WHERE key IN "
+            "(SELECT key FROM parse_cache ORDER BY last_used LIMIT ?)",
+            (excess,)
+        ).rowcount
+        self._count -= deleted
+        self.evictions += deleted
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM parse_cache")
+            self._count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": self._count,
+                "evictions": self.evictions
+            }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
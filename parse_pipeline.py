@@ -0,0 +1,183 @@
+"""
+分级解析管线 - 按成本从低到高依次尝试缓存、规则引擎、Claude
+
+每一级都有置信度阈值：结果达到阈值即采用，否则交给下一级；
+所有级别都未达到阈值时，采用置信度最高的结果。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 管线级别名称 -> 解析方法（与API的 ParsingMethodEnum 取值一致）
+PARSING_METHODS = {
+    "cache": "Cache",
+    "rules": "Rules",
+    "claude": "Claude"
+}
+
+@dataclass
+class ParseStage:
+    """管线中的一级解析器
+
+    parse_batch 为可选的批量实现（如一次请求解析多条的Claude），
+    批量解析时该级别所有待解析条目合并交给它处理。
+    """
+    name: str
+    parse: Callable[[str], Optional[Dict[str, Any]]]
+    min_confidence: float = 0.0
+    parse_batch: Optional[Callable[[List[str]], List[Optional[Dict[str, Any]]]]] = None
+
+class _StageStats:
+    """单级统计：调用次数、采用/低置信度/失败次数、最近若干次的耗时"""
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.accepted = 0
+        self.low_confidence = 0
+        self.failed = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+        return {
+            "calls": self.calls,
+            "accepted": self.accepted,
+            "low_confidence": self.low_confidence,
+            "failed": self.failed,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95)
+        }
+
+class ParsePipeline:
+    """分级解析管线"""
+
+    def __init__(
+        self,
+        stages: List[ParseStage],
+        on_accept: Optional[Callable[[str, str, Dict[str, Any]], None]] = None,
+        latency_window: int = 1000
+    ):
+        """初始化管线
+
+        Args:
+            stages: 按顺序尝试的解析级别
+            on_accept: 结果被采用后的回调 on_accept(级别名称, 输入文本, 结果)，如写入缓存
+            latency_window: 每级保留的最近耗时样本数
+        """
+        self.stages = stages
+        self.on_accept = on_accept
+        self._stats = {stage.name: _StageStats(latency_window) for stage in stages}
+        self._lock = threading.Lock()
+
+    def parse(self, text: str) -> Optional[Dict[str, Any]]:
+        """依次尝试各级解析器，返回的结果中 parsing_method 标明产生结果的级别"""
+        return self._run([text], batched=False)[0]
+
+    def parse_many(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """批量解析：逐级处理仍未解析的条目，支持批量的级别一次处理全部剩余条目
+
+        Returns:
+            与 texts 等长的结果列表，无法解析的条目为 None
+        """
+        return self._run(texts, batched=True)
+
+    def _run(self, texts: List[str], batched: bool) -> List[Optional[Dict[str, Any]]]:
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        fallbacks: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+        pending = list(range(len(texts)))
+
+        for stage in self.stages:
+            if not pending:
+                break
+            if batched and stage.parse_batch:
+                started = time.perf_counter()
+                try:
+                    outputs = stage.parse_batch([texts[i] for i in pending])
+                except Exception as e:
+                    logger.error(f"❌ 解析级别 {stage.name} 批量解析出错: {e}")
+                    outputs = [None] * len(pending)
+                # 批量中每一条的耗时即整个批量请求的耗时
+                elapsed = time.perf_counter() - started
+                timed = [(output, elapsed) for output in outputs]
+            else:
+                timed = [self._call(stage, texts[i]) for i in pending]
+
+            remaining = []
+            for i, (result, elapsed) in zip(pending, timed):
+                if self._consider(stage, texts[i], result, elapsed, fallbacks, i):
+                    results[i] = result
+                else:
+                    remaining.append(i)
+            pending = remaining
+
+        # 所有级别都未达到阈值时，采用置信度最高的结果
+        for i in pending:
+            if i in fallbacks:
+                stage_name, result = fallbacks[i]
+                self._accept(stage_name, texts[i], result)
+                results[i] = result
+        return results
+
+    def _call(self, stage: ParseStage, text: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        started = time.perf_counter()
+        try:
+            result = stage.parse(text)
+        except Exception as e:
+            logger.error(f"❌ 解析级别 {stage.name} 出错: {e}")
+            result = None
+        return result, time.perf_counter() - started
+
+    def _consider(self, stage: ParseStage, text: str, result: Optional[Dict[str, Any]], elapsed: float,
+                  fallbacks: Dict[int, Tuple[str, Dict[str, Any]]], index: int) -> bool:
+        """记录统计并判断是否采用该级别的结果；未采用的结果作为候选保留"""
+        stats = self._stats[stage.name]
+        confidence = result.get('confidence', 0.0) if result else 0.0
+        accepted = result is not None and confidence >= stage.min_confidence
+        with self._lock:
+            stats.calls += 1
+            stats.latencies.append(elapsed)
+            if result is None:
+                stats.failed += 1
+            elif accepted:
+                stats.accepted += 1
+            else:
+                stats.low_confidence += 1
+
+        if result is None:
+            return False
+        result['parsing_method'] = PARSING_METHODS.get(stage.name, stage.name)
+        if accepted:
+            logger.info(f"✅ {stage.name} 解析成功 ({confidence:.2f}, {elapsed*1000:.1f}ms)")
+            self._accept(stage.name, text, result)
+            return True
+
+        logger.info(f"↪️ {stage.name} 置信度不足 ({confidence:.2f} < {stage.min_confidence:.2f})")
+        previous = fallbacks.get(index)
+        if previous is None or confidence > previous[1].get('confidence', 0.0):
+            fallbacks[index] = (stage.name, result)
+        return False
+
+    def _accept(self, stage_name: str, text: str, result: Dict[str, Any]):
+        if not self.on_accept:
+            return
+        try:
+            self.on_accept(stage_name, text, result)
+        except Exception as e:
+            logger.warning(f"⚠️ 解析结果回调失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """各级调用次数、结果分布与耗时分位数"""
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in self._stats.items()}
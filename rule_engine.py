@@ -0,0 +1,132 @@
+"""
+规则解析引擎 - 预编译的时间范围表达式解析
+
+所有格式合并为一个带命名分组的正则，在模块加载时编译一次：
+    7点到9点阅读 / 13点到13点40编程 / 14:30-16:00编程 / 14：30～16：00编程
+    上午9点到11点开会 / 晚上8点半到9点一刻运动 / 中午12点到1点午饭 / 晚上11点到1点看书
+    晚上10点到12点看书（晚上12点即午夜24:00）/ 9点到10点3刻写作
+"点"后的分钟数必须紧跟"点"，且不能是时长（"9点 30分钟阅读"中的"30分钟"属于描述）。
+批量文件可用 scan() 在整段文本上一次 finditer 完成解析。
+"""
+
+import re
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+_BLANK = r'[ \t　]*'
+_PERIOD = r'上午|早上|早晨|中午|下午|傍晚|晚上|夜里|凌晨'
+_FRACTIONS = {'半': 30, '一刻': 15, '1刻': 15, '两刻': 30, '二刻': 30, '2刻': 30, '三刻': 45, '3刻': 45}
+
+def _clock(prefix: str) -> str:
+    """单个时刻：[时段] 时(:分 | 点[分|半|N刻])"""
+    return (
+        rf'(?P<{prefix}p>{_PERIOD})?{_BLANK}'
+        rf'(?P<{prefix}h>\d{{1,2}}){_BLANK}'
+        rf'(?:[:：]{_BLANK}(?P<{prefix}m>\d{{2}})'
+        rf'|点(?:(?P<{prefix}n>\d{{1,2}})(?:分(?!钟)|(?![\d分钟刻]))|(?P<{prefix}f>半|[一两二三1-3]刻))?)'
+    )
+
+_RANGE = (
+    _clock('s')
+    + rf'{_BLANK}(?:到|至|-|－|~|～|—){_BLANK}'
+    + _clock('e')
+    + rf'{_BLANK}(?P<desc>[^\r\n]+?)[ \t　\r]*'
+)
+
+# 单条输入
+_SINGLE = re.compile(rf'{_BLANK}{_RANGE}$')
+# 整段文本逐行匹配（不匹配的行在 scan 中单独产出）
+_MULTILINE = re.compile(rf'^{_BLANK}{_RANGE}$', re.MULTILINE)
+
+class RuleMatch(NamedTuple):
+    """规则匹配结果，时间为相对参考日零点的分钟数（跨午夜时结束时间超过1440）"""
+    start_minutes: int
+    end_minutes: int
+    description: str
+    inferred_end: bool  # 结束时刻是否按推断顺延了12小时（"11点到1点"、"下午3点到12点"），结果不够确定
+
+def _to_24h(hour: int, period: Optional[str]) -> int:
+    """按时段换算为24小时制（晚上12点为午夜，记为24）"""
+    if period in ('晚上', '夜里'):
+        return hour + 12 if hour <= 12 else hour
+    if period in ('下午', '傍晚'):
+        return hour + 12 if hour < 12 else hour
+    if period == '中午':
+        return hour + 12 if hour < 11 else hour
+    if period == '凌晨':
+        return 0 if hour == 12 else hour
+    return hour
+
+def _minute(exact: Optional[str], spoken: Optional[str], fraction: Optional[str]) -> Optional[int]:
+    """分钟数：":30" / "点30分" / "点半"，不合法时返回 None"""
+    minute = exact or spoken
+    if minute is not None:
+        minute = int(minute)
+        return minute if minute < 60 else None
+    return _FRACTIONS[fraction] if fraction else 0
+
+def _convert(match: re.Match) -> Optional[RuleMatch]:
+    """正则匹配 -> RuleMatch，时刻不合法时返回 None"""
+    sp, sh, sm, sn, sf, ep, eh, em, en, ef, desc = match.group(
+        'sp', 'sh', 'sm', 'sn', 'sf', 'ep', 'eh', 'em', 'en', 'ef', 'desc'
+    )
+    end_period = ep or sp  # "晚上8点到9点"：结束时刻沿用开始时刻的时段
+
+    start_hour = int(sh)
+    end_hour = int(eh)
+    start_minute = _minute(sm, sn, sf)
+    end_minute = _minute(em, en, ef)
+    if start_hour > 24 or end_hour > 24 or start_minute is None or end_minute is None:
+        return None
+
+    start = _to_24h(start_hour, sp) * 60 + start_minute
+    end = _to_24h(end_hour, end_period) * 60 + end_minute
+    if end == start:
+        return None  # "8点到8点"
+    inferred_end = False
+    if end < start:
+        if not ep and end_hour < 12 and end + 12 * 60 > start:
+            end += 12 * 60  # "11点到1点"：结束时刻在下午（"晚上11点到1点"则由时段确定为跨午夜）
+            inferred_end = sp is None
+        elif not ep and sp and end_hour == 12 and em is None:
+            end += 12 * 60  # "下午3点到12点"：口语的12点指午夜而非次日中午
+            inferred_end = True
+        else:
+            end += 24 * 60  # "晚上11点到1点"：跨午夜
+    if start >= 24 * 60:
+        # "晚上12点到1点"：从参考日零点开始
+        start -= 24 * 60
+        end -= 24 * 60
+
+    return RuleMatch(start, end, desc.strip(), inferred_end)
+
+class RuleEngine:
+    """规则解析引擎（无状态，正则在模块加载时编译）"""
+
+    def parse(self, text: str) -> Optional[RuleMatch]:
+        """解析单条输入，无法识别时返回 None"""
+        match = _SINGLE.match(text.strip())
+        return _convert(match) if match else None
+
+    def scan(self, content: str) -> Iterator[Tuple[int, str, Optional[RuleMatch]]]:
+        """一次遍历解析整段文本（如批量文件）
+
+        Yields:
+            (行号, 行文本, RuleMatch 或 None)，按行号顺序产出所有行
+        """
+        line_no = 1
+        pos = 0
+        for match in _MULTILINE.finditer(content):
+            # 两次匹配之间的行都未匹配
+            for line in content[pos:match.start()].split('\n')[:-1]:
+                yield line_no, line, None
+                line_no += 1
+            yield line_no, match.group(0), _convert(match)
+            line_no += 1
+            pos = match.end() + 1  # 跳过行尾换行符
+
+        tail = content[pos:].split('\n')
+        if tail and not tail[-1]:
+            tail.pop()
+        for line in tail:
+            yield line_no, line, None
+            line_no += 1
@@ -0,0 +1,8 @@
+"""
+测试配置 - 把项目根目录加入导入路径（与 api/main.py 相同的做法）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
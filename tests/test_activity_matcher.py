@@ -0,0 +1,71 @@
+"""
+活动匹配（Aho-Corasick自动机）测试
+"""
+
+import random
+
+import pytest
+
+from activity_matcher import ActivityMatcher
+
+# 与配置中默认的活动分类同一组关键词
+KEYWORDS = (
+    "沟通,管理,输出,总结,目标,吉他,家庭,助人,分享,商业,写作,组织,执行,创新,编程,"
+    "健康,旅行,人脉,交易,运动,冥想,阅读,恋爱,学习,朋友,播客,"
+    "购物,日常,睡觉,情绪,无意识,通勤,视频,社交,耍手机,吃饭,杂事,游戏,看电视,休息"
+).split(",")
+
+matcher = ActivityMatcher(KEYWORDS)
+
+def _brute_force_find(keywords, text):
+    """逐位置逐关键词比较的参考实现"""
+    for start in range(len(text)):
+        candidates = [kw for kw in keywords if text.startswith(kw, start)]
+        if candidates:
+            return max(candidates, key=len)
+    return None
+
+@pytest.mark.parametrize("text, expected", [
+    ("晚上阅读三十页", "阅读"),
+    ("通勤路上听播客", "通勤"),        # 最早出现优先
+    ("听播客然后通勤", "播客"),
+    ("耍手机刷视频", "耍手机"),
+    ("一边吃饭一边看电视", "吃饭"),
+    ("看电视", "看电视"),
+    ("发呆", None),
+    ("", None),
+])
+def test_find_earliest(text, expected):
+    assert matcher.find(text) == expected
+
+def test_longest_at_same_position():
+    overlapping = ActivityMatcher(["学习", "学习英语", "英语"])
+    assert overlapping.find("今天学习英语") == "学习英语"
+    assert overlapping.find("复习英语") == "英语"
+    assert overlapping.find_all("学习英语和学习") == ["学习英语", "学习"]
+
+def test_suffix_keywords_via_failure_links():
+    # "手机" 只能经由 "耍手" 分支的失败指针找到
+    suffixes = ActivityMatcher(["耍手机", "手机", "机"])
+    assert list(suffixes.iter_matches("耍手机")) == [(0, "耍手机"), (1, "手机"), (2, "机")]
+    assert suffixes.find("玩手机") == "手机"
+
+def test_find_all_non_overlapping():
+    assert matcher.find_all("写作后运动，再阅读和冥想") == ["写作", "运动", "阅读", "冥想"]
+    assert matcher.find_all("没有活动") == []
+
+def test_mixed_script_and_fullwidth():
+    assert matcher.find("ＡＢＣ编程ｘｙｚ") == "编程"
+    assert matcher.find("code review 沟通 with team") == "沟通"
+
+def test_empty_keywords_ignored():
+    empty = ActivityMatcher(["", "运动"])
+    assert empty.keywords == ("运动",)
+    assert ActivityMatcher([]).find("运动") is None
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    alphabet = "".join(sorted(set("".join(KEYWORDS)))) + "的了和在"
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert matcher.find(text) == _brute_force_find(KEYWORDS, text), text
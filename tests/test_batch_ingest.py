@@ -0,0 +1,75 @@
+"""
+批量导入管线测试
+"""
+
+import threading
+
+from batch_ingest import BatchIngestPipeline
+
+def _parse_batch(texts):
+    return [{"text": text} for text in texts]
+
+def test_results_in_input_order():
+    results = []
+    pipeline = BatchIngestPipeline(
+        _parse_batch,
+        match=lambda parsed: None,
+        write=lambda item: item.seq % 5 != 3,
+        on_result=lambda item: results.append(item.seq),
+        batch_size=4,
+        write_workers=4,
+        queue_size=8
+    )
+    stats = pipeline.run((i + 1, f"line {i}", None) for i in range(50))
+    assert results == list(range(50))
+    assert (stats.total, stats.succeeded, stats.write_failed) == (50, 40, 10)
+
+def test_parse_failures_are_reported():
+    results = []
+    pipeline = BatchIngestPipeline(
+        lambda texts: [None if "bad" in text else {"text": text} for text in texts],
+        match=lambda parsed: None,
+        write=lambda item: True,
+        on_result=lambda item: results.append((item.seq, item.error)),
+        batch_size=3
+    )
+    stats = pipeline.run((i, text, None) for i, text in enumerate(["ok", "bad", "ok", "bad"]))
+    assert results == [(0, None), (1, "parse"), (2, None), (3, "parse")]
+    assert stats.parse_failed == 2
+
+def test_slow_head_bounds_reorder_buffer():
+    window = 10
+    lock = threading.Lock()
+    others_written = []
+    others_before_head = []
+    enough = threading.Event()
+
+    def write(item):
+        if item.seq == 0:
+            # 队首条目阻塞，直到窗口内的后续条目都已完成（或超时）
+            enough.wait(timeout=1.0)
+            with lock:
+                others_before_head.append(len(others_written))
+            return True
+        with lock:
+            others_written.append(item.seq)
+            if len(others_written) >= window - 1:
+                enough.set()
+        return True
+
+    pipeline = BatchIngestPipeline(
+        _parse_batch,
+        match=lambda parsed: None,
+        write=write,
+        on_result=lambda item: None,
+        batch_size=2,
+        write_workers=4,
+        queue_size=4,
+        reorder_window=window
+    )
+    stats = pipeline.run((i, f"line {i}", None) for i in range(200))
+
+    assert stats.total == stats.succeeded == 200
+    # 队首完成前最多只有窗口内的其余条目被读入并完成
+    assert others_before_head == [window - 1]
+    assert stats.max_buffered <= window
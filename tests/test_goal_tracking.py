@@ -0,0 +1,169 @@
+"""
+目标投入时间增量汇总测试
+"""
+
+import random
+
+import pytest
+
+import goal_tracking
+from goal_tracking import GoalTimeLedger, page_goal_contribution
+
+class _Store:
+    """模拟数据源：record_id -> (关联目标ID列表, 时长)"""
+
+    def __init__(self):
+        self.records = {}
+        self.loads = []
+
+    def load(self, goal_ids):
+        self.loads.append(list(goal_ids))
+        wanted = set(goal_ids)
+        return [(record_id, list(goals), duration)
+                for record_id, (goals, duration) in self.records.items()
+                if wanted & set(goals)]
+
+    def totals(self, goal_ids):
+        """全量重新计算"""
+        return {goal_id: sum(duration for goals, duration in self.records.values() if goal_id in goals)
+                for goal_id in goal_ids}
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def store():
+    store = _Store()
+    store.records = {
+        "r1": (["g1"], 30),
+        "r2": (["g1", "g2"], 45),
+        "r3": (["g2"], 60),
+        "r4": ([], 15),
+    }
+    return store
+
+GOALS = ["g1", "g2", "g3"]
+
+def test_initial_load_matches_recompute(store):
+    ledger = GoalTimeLedger(store.load)
+    assert ledger.get_many(GOALS) == store.totals(GOALS) == {"g1": 75, "g2": 105, "g3": 0}
+    assert store.loads == [GOALS]
+
+def test_loaded_goals_are_served_without_reloading(store):
+    ledger = GoalTimeLedger(store.load)
+    ledger.get_many(GOALS)
+    ledger.get("g1")
+    ledger.get_many(["g2", "g3"])
+    assert len(store.loads) == 1
+
+def test_create_update_delete_match_recompute(store):
+    ledger = GoalTimeLedger(store.load)
+    ledger.get_many(GOALS)
+
+    # 创建
+    store.records["r5"] = (["g3"], 20)
+    ledger.apply_record("r5", ["g3"], 20)
+    assert ledger.get_many(GOALS) == store.totals(GOALS)
+
+    # 更新时长
+    store.records["r1"] = (["g1"], 90)
+    ledger.apply_record("r1", ["g1"], 90)
+    assert ledger.get_many(GOALS) == store.totals(GOALS)
+
+    # 更新关联目标
+    store.records["r2"] = (["g3"], 45)
+    ledger.apply_record("r2", ["g3"], 45)
+    assert ledger.get_many(GOALS) == store.totals(GOALS)
+
+    # 未关联目标的记录补上关联
+    store.records["r4"] = (["g1"], 15)
+    ledger.apply_record("r4", ["g1"], 15)
+    assert ledger.get_many(GOALS) == store.totals(GOALS)
+
+    # 删除
+    del store.records["r3"]
+    ledger.remove_record("r3")
+    assert ledger.get_many(GOALS) == store.totals(GOALS)
+
+    assert len(store.loads) == 1
+
+def test_random_edits_match_recompute(store):
+    rng = random.Random(7)
+    ledger = GoalTimeLedger(store.load)
+    ledger.get_many(GOALS)
+    for step in range(300):
+        op = rng.random()
+        if op < 0.2 and store.records:
+            record_id = rng.choice(sorted(store.records))
+            del store.records[record_id]
+            ledger.remove_record(record_id)
+        else:
+            record_id = f"r{rng.randint(1, 20)}"
+            goals = rng.sample(GOALS, rng.randint(0, 2))
+            duration = rng.randint(0, 120)
+            store.records[record_id] = (goals, duration)
+            ledger.apply_record(record_id, goals, duration)
+        assert ledger.get_many(GOALS) == store.totals(GOALS), step
+
+def test_edits_before_goal_is_loaded_are_picked_up_on_load(store):
+    ledger = GoalTimeLedger(store.load)
+    assert ledger.get("g1") == 75
+
+    store.records["r5"] = (["g2"], 10)
+    ledger.apply_record("r5", ["g2"], 10)
+    assert ledger.get_many(GOALS) == store.totals(GOALS)
+
+def test_ttl_expiry_reloads_external_changes(monkeypatch, store):
+    clock = _Clock()
+    monkeypatch.setattr(goal_tracking, "time", clock)
+    ledger = GoalTimeLedger(store.load, ttl=60)
+    assert ledger.get("g1") == 75
+
+    # 外部修改（未经过 apply_record）在TTL内不可见
+    store.records["r1"] = (["g2"], 30)
+    clock.now += 59
+    assert ledger.get("g1") == 75
+
+    clock.now += 2
+    assert ledger.get("g1") == 45
+    assert len(store.loads) == 2
+
+    # 重建后解除关联的记录不应再影响 g1
+    store.records["r1"] = (["g2"], 100)
+    ledger.apply_record("r1", ["g2"], 100)
+    assert ledger.get("g1") == 45
+
+def test_write_during_load_is_not_cached(store):
+    ledger = GoalTimeLedger(store.load)
+    original = store.load
+
+    def racing_load(goal_ids):
+        rows = original(goal_ids)
+        store.records["r5"] = (["g1"], 5)
+        ledger.apply_record("r5", ["g1"], 5)
+        return rows
+
+    ledger._loader = racing_load
+    assert ledger.get("g1") == 75
+    ledger._loader = original
+    assert ledger.get("g1") == 80
+
+def test_rebuild_forces_reload(store):
+    ledger = GoalTimeLedger(store.load)
+    ledger.get_many(GOALS)
+    store.records["r1"] = (["g1"], 50)
+    ledger.rebuild("g1")
+    assert ledger.get_many(GOALS) == store.totals(GOALS)
+    assert store.loads[-1] == ["g1"]
+
+def test_page_goal_contribution():
+    page = {"properties": {
+        "Goal": {"relation": [{"id": "g1"}, {"id": "g2"}]},
+        "Duration (Minutes)": {"number": 40},
+    }}
+    assert page_goal_contribution(page) == (["g1", "g2"], 40)
+    assert page_goal_contribution({"properties": {"Duration (Minutes)": {"number": None}}}) == ([], 0)
@@ -0,0 +1,147 @@
+"""
+Notion限流与重试测试
+"""
+
+import pytest
+
+import notion_throttle
+from notion_throttle import NotionThrottle, RetryPolicy, ThrottledNotion, TokenBucket
+
+class _Clock:
+    """替换模块中的 time：sleep 只推进虚拟时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+class _ApiError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"status {status}")
+        self.status = status
+        self.headers = headers or {}
+
+class _Flaky:
+    """前若干次调用抛出指定异常，之后返回结果"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"ok": True}
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(notion_throttle, "time", clock)
+    return clock
+
+def _throttle(max_retries=3):
+    return NotionThrottle(TokenBucket(rate=0), RetryPolicy(max_retries=max_retries, base_delay=0.01, max_delay=0.01))
+
+def test_bucket_allows_burst_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert clock.slept == []
+
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert bucket.waited == pytest.approx(0.5)
+
+def test_bucket_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate=2, burst=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    assert [bucket.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(0.5)
+
+def test_bucket_pause_blocks_until_deadline(clock):
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.pause(2.0)
+    assert bucket.acquire() == pytest.approx(2.1)
+
+def test_unlimited_bucket_never_waits(clock):
+    bucket = TokenBucket(rate=0)
+    assert all(bucket.acquire() == 0.0 for _ in range(100))
+    assert clock.slept == []
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_create_retries_when_request_was_not_processed(clock, status):
+    throttle = _throttle()
+    create = _Flaky(_ApiError(status), _ApiError(status))
+    assert throttle.call("pages.create", create, parent={}) == {"ok": True}
+    assert create.calls == 3
+    metrics = throttle.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["rate_limited" if status == 429 else "server_errors"] == 2
+
+def test_rate_limit_honours_retry_after_and_pauses_bucket(clock):
+    throttle = _throttle()
+    query = _Flaky(_ApiError(429, {"retry-after": "3"}))
+    throttle.call("databases.query", query)
+    assert query.calls == 2
+    assert clock.slept[0] == pytest.approx(3.0)
+    assert throttle.bucket._paused_until == pytest.approx(1003.0)
+
+@pytest.mark.parametrize("name", ["pages.create", "blocks.children.append", "comments.create"])
+def test_create_is_not_retried_on_gateway_timeout(clock, name):
+    throttle = _throttle()
+    create = _Flaky(_ApiError(504))
+    with pytest.raises(_ApiError):
+        throttle.call(name, create)
+    assert create.calls == 1
+    assert throttle.metrics()["retries"] == 0
+
+def test_create_is_not_retried_on_read_timeout(clock):
+    httpx = pytest.importorskip("httpx")
+    throttle = _throttle()
+    create = _Flaky(httpx.ReadTimeout("timed out"))
+    with pytest.raises(httpx.ReadTimeout):
+        throttle.call("pages.create", create)
+    assert create.calls == 1
+
+def test_read_is_retried_on_gateway_timeout(clock):
+    throttle = _throttle()
+    query = _Flaky(_ApiError(504), _ApiError(502))
+    assert throttle.call("databases.query", query) == {"ok": True}
+    assert query.calls == 3
+
+def test_client_errors_are_not_retried(clock):
+    throttle = _throttle()
+    update = _Flaky(_ApiError(400))
+    with pytest.raises(_ApiError):
+        throttle.call("pages.update", update)
+    assert update.calls == 1
+
+def test_gives_up_after_max_retries(clock):
+    throttle = _throttle(max_retries=2)
+    query = _Flaky(*[_ApiError(503) for _ in range(5)])
+    with pytest.raises(_ApiError):
+        throttle.call("databases.query", query)
+    assert query.calls == 3
+    assert throttle.metrics()["failures"] == 1
+
+def test_proxy_routes_namespaced_calls_through_throttle(clock):
+    class _Pages:
+        def __init__(self):
+            self.create = _Flaky(_ApiError(504))
+
+    class _Client:
+        def __init__(self):
+            self.pages = _Pages()
+
+    client = _Client()
+    proxy = ThrottledNotion(client, _throttle())
+    with pytest.raises(_ApiError):
+        proxy.pages.create(parent={})
+    assert client.pages.create.calls == 1
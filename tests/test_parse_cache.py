@@ -0,0 +1,42 @@
+"""
+解析结果缓存测试
+"""
+
+import datetime
+
+import pytest
+
+from parse_cache import normalize_input, reference_scope
+
+REFERENCE = datetime.date(2025, 8, 4)  # 星期一
+
+@pytest.mark.parametrize("text", [
+    "7点到9点阅读",
+    "14:30-16:00编程",
+    "14：30～16：00编程",
+    "20:00-21:00 日常",
+    "8-9点阅读",
+    "9点半-10点30 写作",
+    "学习了1.5小时",
+    "10.5-11.5 小时",
+    "昨天下午3点到5点跑步",
+])
+def test_reference_independent(text):
+    assert reference_scope(normalize_input(text), REFERENCE) == ""
+
+@pytest.mark.parametrize("text", [
+    "8月1日 9点到10点开会",
+    "8月1号开会",
+    "2025-08-01 9点到10点开会",
+    "2025年8月1日写作",
+    "8/1 14:00-15:00 编程",
+    "12-25 圣诞聚会",
+    "3号下午开会",
+    "月底复盘",
+])
+def test_absolute_date(text):
+    assert reference_scope(normalize_input(text), REFERENCE) == REFERENCE.isoformat()
+
+def test_weekday_and_now_relative():
+    assert reference_scope(normalize_input("周三晚上8点到9点运动"), REFERENCE) == "w1"
+    assert reference_scope(normalize_input("2小时前开始写作"), REFERENCE) is None
@@ -0,0 +1,55 @@
+"""
+报告缓存测试
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from api.services.report_cache import ReportCache
+
+def _run(cache, report_type, start_date, end_date, value):
+    async def compute():
+        return value
+    return asyncio.run(cache.get_or_compute(report_type, start_date, end_date, compute))
+
+def test_etag_stable_across_open_period_recompute():
+    tz = timezone(timedelta(hours=8))
+    today = datetime.now(tz).date()
+    cache = ReportCache(tz, open_ttl=0)
+
+    first = _run(cache, "daily", today, today, "v1")
+    second = _run(cache, "daily", today, today, "v2")
+    assert second.value == "v2"             # 有效期已过，重新生成
+    assert second.etag == first.etag        # 数据版本未变，ETag 不变
+    assert not second.closed
+
+    cache.touch([today])
+    assert _run(cache, "daily", today, today, "v3").etag != first.etag
+
+def test_etag_depends_on_type_and_period():
+    tz = timezone.utc
+    day = datetime.now(tz).date() - timedelta(days=3)
+    cache = ReportCache(tz)
+    daily = _run(cache, "daily", day, day, "d")
+    weekly = _run(cache, "weekly", day, day + timedelta(days=6), "w")
+    other = _run(cache, "daily", day - timedelta(days=1), day - timedelta(days=1), "d")
+    assert len({daily.etag, weekly.etag, other.etag}) == 3
+
+def test_closed_uses_configured_timezone():
+    # 东14区与西12区的"今天"相差一天以上
+    ahead, behind = timezone(timedelta(hours=14)), timezone(timedelta(hours=-12))
+    yesterday_ahead = datetime.now(ahead).date() - timedelta(days=1)
+    assert _run(ReportCache(ahead), "daily", yesterday_ahead, yesterday_ahead, 1).closed
+    assert not _run(ReportCache(behind), "daily", yesterday_ahead, yesterday_ahead, 1).closed
+
+def test_closed_period_cached_until_touched():
+    tz = timezone.utc
+    day = datetime.now(tz).date() - timedelta(days=10)
+    cache = ReportCache(tz, open_ttl=0)
+    assert _run(cache, "daily", day, day, "old").value == "old"
+    assert _run(cache, "daily", day, day, "new").value == "old"
+    cache.touch([day + timedelta(days=1)])
+    assert _run(cache, "daily", day, day, "new").value == "old"
+    cache.touch([day])
+    assert _run(cache, "daily", day, day, "new").value == "new"
+    assert cache.stats() == {"hits": 2, "misses": 2, "entries": 1}
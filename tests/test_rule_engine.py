@@ -0,0 +1,98 @@
+"""
+规则解析引擎测试
+"""
+
+import pytest
+
+from rule_engine import RuleEngine
+
+engine = RuleEngine()
+
+@pytest.mark.parametrize("text, start, end, description", [
+    ("7点到9点阅读", "07:00", "09:00", "阅读"),
+    ("13点到13点40编程", "13:00", "13:40", "编程"),
+    ("14:30-16:00编程", "14:30", "16:00", "编程"),
+    ("14：30～16：00编程", "14:30", "16:00", "编程"),  # 全角冒号与波浪线
+    ("上午9点到11点开会", "09:00", "11:00", "开会"),
+    ("上午9点到12点开会", "09:00", "12:00", "开会"),
+    ("11点到1点开会", "11:00", "13:00", "开会"),
+    ("下午3点到5点写作", "15:00", "17:00", "写作"),
+    ("中午12点到1点午饭", "12:00", "13:00", "午饭"),
+    ("晚上8点半到9点一刻运动", "20:30", "21:15", "运动"),
+    ("晚上8点三刻到9点半运动", "20:45", "21:30", "运动"),
+    ("晚上8点到9点10分跑步", "20:00", "21:10", "跑步"),
+    ("9点到10点3刻写作", "09:00", "10:45", "写作"),
+    ("9点到10点1刻写作", "09:00", "10:15", "写作"),
+    ("9点半到10点两刻写作", "09:30", "10:30", "写作"),
+    # 分钟数不能与"点"分开，也不能是时长
+    ("7点到9点 30分钟阅读", "07:00", "09:00", "30分钟阅读"),
+    ("7点到9点30分钟阅读", "07:00", "09:00", "30分钟阅读"),
+    ("9点30到10点阅读", "09:30", "10:00", "阅读"),
+])
+def test_same_day_ranges(text, start, end, description):
+    match = engine.parse(text)
+    assert match is not None
+    assert _clock(match.start_minutes) == start
+    assert _clock(match.end_minutes) == end
+    assert match.description == description
+
+@pytest.mark.parametrize("text, start_minutes, end_minutes", [
+    # 晚上12点是当天结束的午夜，而不是中午或次日中午
+    ("晚上11点到12点看书", 23 * 60, 24 * 60),
+    ("晚上10点到12点看书", 22 * 60, 24 * 60),
+    ("晚上10点到晚上12点看书", 22 * 60, 24 * 60),
+    ("夜里11点半到12点看书", 23 * 60 + 30, 24 * 60),
+    ("下午3点到12点编程", 15 * 60, 24 * 60),
+    # 跨午夜
+    ("晚上11点到1点看书", 23 * 60, 25 * 60),
+    ("22:00-0:30看书", 22 * 60, 24 * 60 + 30),
+    # 从午夜开始
+    ("晚上12点到1点睡觉", 0, 60),
+    ("晚上12点半到1点睡觉", 30, 60),
+])
+def test_midnight(text, start_minutes, end_minutes):
+    match = engine.parse(text)
+    assert match is not None
+    assert (match.start_minutes, match.end_minutes) == (start_minutes, end_minutes)
+
+@pytest.mark.parametrize("text", [
+    "晚上11点到12点看书",
+    "晚上10点到12点看书",
+    "晚上11点到1点看书",
+    "22:00-0:30看书",
+    "下午3点到12点编程",
+])
+def test_evening_ranges_are_short(text):
+    match = engine.parse(text)
+    assert 0 < match.end_minutes - match.start_minutes <= 9 * 60
+
+@pytest.mark.parametrize("text, inferred", [
+    ("11点到1点开会", True),         # 结束时刻推断为下午
+    ("下午3点到12点编程", True),     # 结束时刻推断为午夜
+    ("上午11点到下午1点开会", False),
+    ("11:00-13:00开会", False),
+    ("晚上11点到1点看书", False),
+    ("8点到9点运动", False),
+])
+def test_inferred_end(text, inferred):
+    assert engine.parse(text).inferred_end is inferred
+
+@pytest.mark.parametrize("text", [
+    "今天下午学习了两小时",
+    "14:70-15:00编程",
+    "25点到26点睡觉",
+    "8点到9点",
+    "8点到8点运动",
+])
+def test_unrecognized(text):
+    assert engine.parse(text) is None
+
+def test_scan_yields_every_line():
+    content = "7点到9点阅读\n随便写点什么\n晚上10点到12点看书\n"
+    lines = list(engine.scan(content))
+    assert [line_no for line_no, _, _ in lines] == [1, 2, 3]
+    assert lines[1][2] is None
+    assert (lines[2][2].start_minutes, lines[2][2].end_minutes) == (22 * 60, 24 * 60)
+
+def _clock(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
@@ -0,0 +1,128 @@
+"""
+时间立方体测试
+"""
+
+import random
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from api.services.time_cube import TimeCube, efficiency_rate, split_record
+
+TZ = timezone(timedelta(hours=8))
+DAY = date(2025, 8, 4)
+ACTIVITIES = {"编程": "生产", "阅读": "投资", "吃饭": "支出", "睡觉": "支出"}
+
+def _record(start: datetime, minutes: int, activity: str = "编程"):
+    return SimpleNamespace(
+        start_time=start,
+        end_time=start + timedelta(minutes=minutes),
+        duration=minutes,
+        activity=activity,
+        category=ACTIVITIES[activity]
+    )
+
+def _at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=TZ)
+
+def _brute_force(records, start_date, end_date):
+    """逐分钟展开记录后求和的参考实现"""
+    by_day, by_category, by_activity = {}, {}, {}
+    count = 0
+    for record in records.values():
+        if start_date <= record.start_time.date() <= end_date:
+            count += 1
+        for i in range(record.duration):
+            day = (record.start_time + timedelta(minutes=i)).date()
+            if start_date <= day <= end_date:
+                by_day[day] = by_day.get(day, 0) + 1
+                by_category[record.category] = by_category.get(record.category, 0) + 1
+                by_activity[record.activity] = by_activity.get(record.activity, 0) + 1
+    return count, by_day, by_category, by_activity
+
+def _assert_matches(cube, records, start_date, end_date):
+    count, by_day, by_category, by_activity = _brute_force(records, start_date, end_date)
+    totals = cube.totals(start_date, end_date)
+    assert totals.records == count
+    assert totals.minutes == pytest.approx(sum(by_day.values()))
+    for day, minutes in totals.by_day.items():
+        assert minutes == pytest.approx(by_day.get(day, 0))
+    assert {k: round(v, 6) for k, v in totals.by_category.items() if v > 1e-6} == by_category
+    assert {k: round(v, 6) for k, v in totals.by_activity.items() if v > 1e-6} == by_activity
+
+def test_split_across_hours():
+    cells = split_record(_record(_at(DAY, 9, 30), 90), TZ)
+    assert [(day, key[0], minutes, count) for day, key, minutes, count in cells] == [
+        (DAY, 9, 30.0, 1), (DAY, 10, 60.0, 0)
+    ]
+
+def test_split_across_midnight():
+    cells = split_record(_record(_at(DAY, 23), 120, "睡觉"), TZ)
+    assert [(day, key[0], minutes) for day, key, minutes, _ in cells] == [
+        (DAY, 23, 60.0), (DAY + timedelta(days=1), 0, 60.0)
+    ]
+
+def test_split_uses_local_timezone():
+    utc_start = datetime(2025, 8, 3, 16, 0, tzinfo=timezone.utc)  # 本地 8月4日 00:00
+    (day, (hour, _, _), _, _), = split_record(_record(utc_start, 30), TZ)
+    assert (day, hour) == (DAY, 0)
+
+def test_apply_update_remove():
+    cube = TimeCube(TZ)
+    records = {"a": _record(_at(DAY, 9), 60), "b": _record(_at(DAY, 23, 30), 60, "睡觉")}
+    for record_id, record in records.items():
+        cube.apply(record_id, record)
+    _assert_matches(cube, records, DAY, DAY + timedelta(days=1))
+
+    # 更新：旧贡献被替换，返回新旧两部分影响的日期
+    records["b"] = _record(_at(DAY + timedelta(days=2), 8), 30, "阅读")
+    affected = cube.apply("b", records["b"])
+    assert affected == {DAY, DAY + timedelta(days=1), DAY + timedelta(days=2)}
+    _assert_matches(cube, records, DAY, DAY + timedelta(days=2))
+
+    assert cube.remove("a") == {DAY}
+    del records["a"]
+    _assert_matches(cube, records, DAY, DAY + timedelta(days=2))
+    assert cube.remove("a") == set()
+    assert cube.stats()["records"] == 1
+
+def test_random_operations_match_brute_force():
+    rng = random.Random(20)
+    cube = TimeCube(TZ)
+    records = {}
+    for step in range(400):
+        record_id = f"r{rng.randrange(40)}"
+        if record_id in records and rng.random() < 0.3:
+            cube.remove(record_id)
+            del records[record_id]
+        else:
+            start = _at(DAY + timedelta(days=rng.randrange(5)), rng.randrange(24), rng.randrange(60))
+            record = _record(start, rng.randint(1, 300), rng.choice(list(ACTIVITIES)))
+            cube.apply(record_id, record)
+            records[record_id] = record
+        if step % 50 == 0:
+            _assert_matches(cube, records, DAY, DAY + timedelta(days=5))
+    _assert_matches(cube, records, DAY, DAY + timedelta(days=5))
+    _assert_matches(cube, records, DAY + timedelta(days=2), DAY + timedelta(days=3))
+
+def test_load_keeps_concurrent_writes():
+    cube = TimeCube(TZ)
+    since = cube.write_seq()
+    # 读取数据源期间发生的写入以增量结果为准
+    cube.apply("a", _record(_at(DAY, 9), 45))
+    cube.load(DAY, DAY, [("a", _record(_at(DAY, 9), 30)), ("b", _record(_at(DAY, 14), 60, "阅读"))], since)
+    totals = cube.totals(DAY, DAY)
+    assert totals.records == 2
+    assert totals.by_activity == {"编程": 45.0, "阅读": 60.0}
+
+def test_load_replaces_stale_records():
+    cube = TimeCube(TZ)
+    cube.load(DAY, DAY, [("a", _record(_at(DAY, 9), 30))], cube.write_seq())
+    cube.load(DAY, DAY, [("b", _record(_at(DAY, 10), 20))], cube.write_seq())
+    assert cube.totals(DAY, DAY).by_activity == {"编程": 20.0}
+    assert cube.missing_ranges(DAY, DAY) == [(DAY - timedelta(days=1), DAY - timedelta(days=1))]
+
+def test_efficiency_rate():
+    assert efficiency_rate({"生产": 60, "投资": 30, "支出": 30}, 120) == 75.0
+    assert efficiency_rate({}, 0) == 0.0
@@ -0,0 +1,189 @@
+"""
+写后日志测试
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from api.services.write_journal import WriteJournal, flush_pending, is_provisional_id
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "journal" / "write_journal.jsonl")
+
+def test_append_returns_provisional_id(path):
+    journal = WriteJournal(path)
+    entry_id = journal.append({"duration": 60})
+    assert is_provisional_id(entry_id)
+    assert journal.pending() == [(entry_id, {"duration": 60})]
+    assert journal.resolve(entry_id) == (None, "pending")
+    assert journal.stats() == {"pending": 1, "failed": 0}
+    journal.close()
+
+def test_replay_pending_after_crash(path):
+    journal = WriteJournal(path)
+    first = journal.append({"n": 1})
+    second = journal.append({"n": 2})
+    # 模拟崩溃：不调用 close()，直接从同一文件重新打开
+    replayed = WriteJournal(path)
+    assert replayed.pending() == [(first, {"n": 1}), (second, {"n": 2})]
+    replayed.close()
+    journal.close()
+
+def test_ack_survives_restart(path):
+    journal = WriteJournal(path)
+    done = journal.append({"n": 1})
+    waiting = journal.append({"n": 2})
+    journal.complete(done, "page-1")
+    assert journal.resolve(done) == ("page-1", "done")
+
+    replayed = WriteJournal(path)
+    assert replayed.pending() == [(waiting, {"n": 2})]
+    assert replayed.resolve(done) == ("page-1", "done")
+    replayed.close()
+    journal.close()
+
+def test_unacked_write_is_replayed(path):
+    """页面已创建但 done 未落盘时崩溃：至少一次语义，重放后再次提交"""
+    journal = WriteJournal(path)
+    entry_id = journal.append({"n": 1})
+    replayed = WriteJournal(path)
+    assert [eid for eid, _ in replayed.pending()] == [entry_id]
+    replayed.complete(entry_id, "page-2")
+    reopened = WriteJournal(path)
+    assert reopened.pending() == []
+    reopened.close()
+    replayed.close()
+    journal.close()
+
+def test_failed_entries_are_not_replayed(path):
+    journal = WriteJournal(path)
+    entry_id = journal.append({"n": 1})
+    journal.fail(entry_id, "validation_error")
+    assert journal.resolve(entry_id) == (None, "failed")
+    journal.close()
+
+    replayed = WriteJournal(path)
+    assert replayed.pending() == []
+    assert replayed.resolve(entry_id) == (None, "failed")
+    assert replayed.resolve("pending-unknown") == (None, "unknown")
+    replayed.close()
+
+def test_torn_last_line_is_skipped(path):
+    journal = WriteJournal(path)
+    entry_id = journal.append({"n": 1})
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "create", "id": "pending-torn", "payl')
+
+    replayed = WriteJournal(path)
+    assert [eid for eid, _ in replayed.pending()] == [entry_id]
+    replayed.close()
+
+def test_compaction_keeps_pending_and_mappings(path):
+    journal = WriteJournal(path, compact_bytes=1)
+    done = journal.append({"n": 1})
+    journal.complete(done, "page-1")
+    waiting = journal.append({"n": 2})
+    journal.close()
+
+    # 打开时压缩：已完成的条目只保留 ID 映射
+    replayed = WriteJournal(path, compact_bytes=1)
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f]
+    assert {(e["op"], e["id"]) for e in events} == {("done", done), ("create", waiting)}
+    assert replayed.pending() == [(waiting, {"n": 2})]
+    assert replayed.resolve(done) == ("page-1", "done")
+    replayed.close()
+
+class _FakeNotion:
+    """按标记保存页面的Notion替身；可设定下一次创建在页面写入后超时"""
+
+    def __init__(self):
+        self.pages = {}
+        self.creates = 0
+        self.lookups = 0
+        self.timeout_after_write = False
+        self.reject = None
+
+    async def create(self, entry_id, payload):
+        self.creates += 1
+        if self.reject:
+            raise self.reject
+        page = {"id": f"page-{self.creates}"}
+        self.pages[entry_id] = page
+        if self.timeout_after_write:
+            # 请求已被处理但响应丢失（读超时 / 504）
+            self.timeout_after_write = False
+            raise TimeoutError("read timeout")
+        return page
+
+    async def lookup(self, entry_id, payload):
+        self.lookups += 1
+        return self.pages.get(entry_id)
+
+async def _run_blocking(func, *args):
+    return func(*args)
+
+def _flush(journal, notion):
+    async def collect():
+        return [entry async for entry in flush_pending(journal, notion.create, notion.lookup, _run_blocking)]
+    return asyncio.run(collect())
+
+def test_timeout_then_flush_creates_once(path):
+    journal = WriteJournal(path)
+    notion = _FakeNotion()
+    entry_id = journal.append({"n": 1})
+    notion.timeout_after_write = True
+
+    assert _flush(journal, notion) == []
+    assert journal.resolve(entry_id) == (None, "pending")
+
+    written = _flush(journal, notion)
+    assert [(eid, page["id"]) for eid, _, page in written] == [(entry_id, "page-1")]
+    assert notion.creates == 1
+    assert journal.resolve(entry_id) == ("page-1", "done")
+    journal.close()
+
+def test_crash_after_create_reconciles_on_restart(path):
+    journal = WriteJournal(path)
+    notion = _FakeNotion()
+    entry_id = journal.append({"n": 1})
+    # 模拟崩溃：attempt 已落盘、页面已创建，但 done 未落盘
+    journal.begin(entry_id)
+    asyncio.run(notion.create(entry_id, {"n": 1}))
+
+    replayed = WriteJournal(path, compact_bytes=1)
+    assert replayed.pending_entries() == [(entry_id, {"n": 1}, True)]
+    _flush(replayed, notion)
+    assert notion.creates == 1
+    assert replayed.resolve(entry_id) == ("page-1", "done")
+    replayed.close()
+    journal.close()
+
+def test_fresh_entries_skip_lookup(path):
+    journal = WriteJournal(path)
+    notion = _FakeNotion()
+    first = journal.append({"n": 1})
+    second = journal.append({"n": 2})
+    written = _flush(journal, notion)
+    assert [eid for eid, _, _ in written] == [first, second]
+    assert (notion.creates, notion.lookups) == (2, 0)
+    journal.close()
+
+def test_rejected_entry_fails_and_flush_continues(path):
+    journal = WriteJournal(path)
+    notion = _FakeNotion()
+    rejected = journal.append({"n": 1})
+    error = ValueError("validation_error")
+    error.status = 400
+    notion.reject = error
+    _flush(journal, notion)
+    assert journal.resolve(rejected) == (None, "failed")
+
+    notion.reject = None
+    accepted = journal.append({"n": 2})
+    assert [eid for eid, _, _ in _flush(journal, notion)] == [accepted]
+    journal.close()
@@ -10,11 +10,23 @@ import datetime
 import logging
 import argparse
 import re
-from typing import Dict, Optional, List, Tuple, Any
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Tuple, Any, Iterable, Iterator
 from dataclasses import dataclass
 import pytz
 from dotenv import load_dotenv
 
+from notion_mirror import NotionMirror
+from parse_cache import ParseCache, activity_version
+from parse_pipeline import ParsePipeline, ParseStage
+from rule_engine import RuleEngine, RuleMatch
+from activity_matcher import ActivityMatcher
+from batch_ingest import BatchIngestPipeline, IngestItem
+from notion_throttle import NotionThrottle, RetryPolicy, ThrottledNotion, TokenBucket
+from goal_tracking import ActiveGoalCache, GoalMatcher, GoalTimeLedger, page_goal_contribution
+
 # 加载环境变量
 load_dotenv()
 
@@ -40,6 +52,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Notion单次查询返回的最大条数
+NOTION_PAGE_SIZE = 100
+
+def iter_notion_query(notion, database_id: str, prefetch: bool = True, **query) -> Iterator[Dict[str, Any]]:
+    """按 next_cursor 逐页读取Notion数据库查询结果（生成器）
+    
+    每次只在内存中保留一页结果；prefetch=True 时在调用方处理当前页的同时，
+    后台线程已开始请求下一页。
+    """
+    query.setdefault('page_size', NOTION_PAGE_SIZE)
+    
+    def fetch(cursor: Optional[str]) -> Dict[str, Any]:
+        kwargs = dict(query)
+        if cursor:
+            kwargs['start_cursor'] = cursor
+        return notion.databases.query(database_id=database_id, **kwargs)
+    
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notion-prefetch") if prefetch else None
+    try:
+        response = fetch(None)
+        while True:
+            next_cursor = response.get('next_cursor') if response.get('has_more') else None
+            pending = executor.submit(fetch, next_cursor) if executor and next_cursor else None
+            
+            for page in response.get('results', []):
+                yield page
+                
+            if not next_cursor:
+                break
+            response = pending.result() if pending else fetch(next_cursor)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
 @dataclass
 class TimeRecord:
     """时间记录数据类"""
@@ -66,28 +112,90 @@ class DailyGoal:
 class SimpleTimeAgent:
     """简化版时间记录AI助手"""
     
-    def __init__(self):
-        """初始化配置和客户端"""
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 notion_http_client=None, claude_http_client=None):
+        """初始化配置和客户端
+        
+        Args:
+            config: 配置字典（键为小写的环境变量名），未提供的项回退到环境变量。
+                API服务传入 api.config.settings 中已解析好的配置，避免重复读取环境。
+            notion_http_client: 可选的 httpx.Client，用于复用Notion连接池
+            claude_http_client: 可选的 httpx.Client，用于复用Claude连接池
+        """
+        self.config = config or {}
+        self.rule_engine = RuleEngine()
         self.load_config()
-        self.init_clients()
+        self.notion_throttle = NotionThrottle(
+            TokenBucket(self.notion_rate_limit, self.notion_rate_burst),
+            RetryPolicy(max_retries=self.notion_max_retries)
+        )
+        self.init_clients(notion_http_client, claude_http_client)
         self.init_activity_mapping()
+        self.init_parse_cache()
+        self.init_parse_pipeline()
+        self.init_mirror()
+        self.goal_ledger = GoalTimeLedger(self._load_goal_records, ttl=self.goal_ledger_ttl)
+        self.active_goal_cache = ActiveGoalCache(ttl=self.active_goals_cache_ttl)
+        self.goal_matcher = GoalMatcher(keyword_finder=lambda text: self.activity_matcher.find_all(text))
+        
+    def _get_config(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """读取配置项：优先使用传入的配置字典，其次是环境变量"""
+        value = self.config.get(key.lower())
+        if value is not None:
+            return value
+        return os.getenv(key, default)
         
     def load_config(self):
         """加载环境配置"""
         # Notion配置
-        self.notion_token = os.getenv('NOTION_TOKEN')
-        self.database_id = os.getenv('DATABASE_ID')
-        self.goals_database_id = os.getenv('GOALS_DATABASE_ID')
-        self.page_id = os.getenv('PAGE_ID')
+        self.notion_token = self._get_config('NOTION_TOKEN')
+        self.database_id = self._get_config('DATABASE_ID')
+        self.goals_database_id = self._get_config('GOALS_DATABASE_ID')
+        self.page_id = self._get_config('PAGE_ID')
         
         # Claude配置
-        self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
-        self.claude_model = os.getenv('CLAUDE_MODEL', 'claude-3-5-sonnet-20241022')
-        self.claude_max_tokens = int(os.getenv('CLAUDE_MAX_TOKENS', '1000'))
-        self.claude_temperature = float(os.getenv('CLAUDE_TEMPERATURE', '0.1'))
+        self.anthropic_api_key = self._get_config('ANTHROPIC_API_KEY')
+        self.claude_model = self._get_config('CLAUDE_MODEL', 'claude-3-5-sonnet-20241022')
+        self.claude_max_tokens = int(self._get_config('CLAUDE_MAX_TOKENS', '1000'))
+        self.claude_temperature = float(self._get_config('CLAUDE_TEMPERATURE', '0.1'))
+        # 批量解析：每次请求的最大条数与输出token预算
+        self.claude_batch_size = int(self._get_config('CLAUDE_BATCH_SIZE', '20'))
+        self.claude_batch_token_budget = int(self._get_config('CLAUDE_BATCH_TOKEN_BUDGET', '4000'))
+        
+        # Notion请求限流（次/秒，<=0 不限流）
+        self.notion_rate_limit = float(self._get_config('NOTION_RATE_LIMIT', '3'))
+        self.notion_rate_burst = int(self._get_config('NOTION_RATE_BURST', '3'))
+        self.notion_max_retries = int(self._get_config('NOTION_MAX_RETRIES', '5'))
+        
+        # 批量导入流水线
+        self.batch_parse_workers = int(self._get_config('BATCH_PARSE_WORKERS', '2'))
+        self.batch_write_workers = int(self._get_config('BATCH_WRITE_WORKERS', '3'))
+        self.batch_queue_size = int(self._get_config('BATCH_QUEUE_SIZE', '100'))
         
         # 时区配置
-        self.timezone = pytz.timezone(os.getenv('TIMEZONE', 'Asia/Shanghai'))
+        self.timezone = pytz.timezone(self._get_config('TIMEZONE', 'Asia/Shanghai'))
+        
+        # 本地镜像配置（为空则直接读取Notion）
+        self.mirror_db_path = self._get_config('MIRROR_DB_PATH', '')
+        self.mirror_sync_interval = int(self._get_config('MIRROR_SYNC_INTERVAL', '60'))
+        
+        # 目标累计时间缓存有效期（秒），过期后从数据源重建
+        self.goal_ledger_ttl = int(self._get_config('GOAL_LEDGER_TTL', '600'))
+        
+        # 活跃目标缓存有效期（秒）
+        self.active_goals_cache_ttl = int(self._get_config('ACTIVE_GOALS_CACHE_TTL', '300'))
+        
+        # 解析结果缓存（路径为空则仅在进程内缓存）
+        self.parse_cache_path = self._get_config('PARSE_CACHE_PATH', '')
+        self.parse_cache_max_entries = int(self._get_config('PARSE_CACHE_MAX_ENTRIES', '5000'))
+        
+        # 分级解析管线：级别顺序及各级采用结果的最低置信度
+        self.parse_pipeline_stages = self._get_config('PARSE_PIPELINE', 'rules,cache,claude')
+        self.parse_min_confidence = {
+            'rules': float(self._get_config('PARSE_RULES_MIN_CONFIDENCE', '0.9')),
+            'cache': float(self._get_config('PARSE_CACHE_MIN_CONFIDENCE', '0.0')),
+            'claude': float(self._get_config('PARSE_CLAUDE_MIN_CONFIDENCE', '0.0'))
+        }
         
         # 验证必要配置
         if not self.notion_token or not self.database_id:
@@ -97,11 +205,15 @@ class SimpleTimeAgent:
         if not self.anthropic_api_key:
             logger.warning("缺少Claude配置: ANTHROPIC_API_KEY，将禁用AI解析功能")
             
-    def init_clients(self):
+    def init_clients(self, notion_http_client=None, claude_http_client=None):
         """初始化API客户端"""
         # Notion客户端
         if NOTION_AVAILABLE and self.notion_token:
-            self.notion = NotionClient(auth=self.notion_token)
+            # 所有Notion调用经过共享的限流与重试代理
+            self.notion = ThrottledNotion(
+                NotionClient(auth=self.notion_token, client=notion_http_client),
+                self.notion_throttle
+            )
             logger.info("✅ Notion客户端初始化成功")
         else:
             self.notion = None
@@ -109,7 +221,10 @@ class SimpleTimeAgent:
             
         # Claude客户端
         if CLAUDE_AVAILABLE and self.anthropic_api_key:
-            self.claude_client = anthropic.Anthropic(api_key=self.anthropic_api_key)
+            self.claude_client = anthropic.Anthropic(
+                api_key=self.anthropic_api_key,
+                http_client=claude_http_client
+            )
             logger.info("✅ Claude客户端初始化成功")
         else:
             self.claude_client = None
@@ -118,9 +233,9 @@ class SimpleTimeAgent:
     def init_activity_mapping(self):
         """初始化活动分类映射"""
         # 从环境变量加载活动分类
-        production_activities = os.getenv('PRODUCTION_ACTIVITIES', '').split(',')
-        investment_activities = os.getenv('INVESTMENT_ACTIVITIES', '').split(',')
-        expense_activities = os.getenv('EXPENSE_ACTIVITIES', '').split(',')
+        production_activities = self._get_config('PRODUCTION_ACTIVITIES', '').split(',')
+        investment_activities = self._get_config('INVESTMENT_ACTIVITIES', '').split(',')
+        expense_activities = self._get_config('EXPENSE_ACTIVITIES', '').split(',')
         
         self.activity_mapping = {}
         
@@ -141,6 +256,97 @@ class SimpleTimeAgent:
                 
         logger.info(f"✅ 加载了 {len(self.activity_mapping)} 个活动分类")
         
+        # 活动关键词自动机仅在活动配置变化时重建
+        keywords = tuple(sorted(self.activity_mapping))
+        matcher = getattr(self, 'activity_matcher', None)
+        if matcher is None or matcher.keywords != keywords:
+            self.activity_matcher = ActivityMatcher(keywords)
+        
+    def init_parse_cache(self):
+        """初始化解析结果缓存，版本号随活动分类列表和Claude模型变化"""
+        self.parse_cache_version = activity_version(self.activity_mapping.keys(), self.claude_model)
+        try:
+            self.parse_cache = ParseCache(
+                self.parse_cache_path or ':memory:',
+                max_entries=self.parse_cache_max_entries,
+                timezone=self.timezone
+            )
+        except Exception as e:
+            logger.error(f"❌ 解析缓存初始化失败，使用进程内缓存: {e}")
+            self.parse_cache = ParseCache(max_entries=self.parse_cache_max_entries, timezone=self.timezone)
+            
+    def init_parse_pipeline(self):
+        """初始化分级解析管线（默认顺序：规则引擎 -> 解析缓存 -> Claude）"""
+        parsers = {
+            'rules': self.parse_with_rules,
+            'cache': self._parse_from_cache,
+            'claude': self.parse_with_claude
+        }
+        stages = []
+        for name in self.parse_pipeline_stages.split(','):
+            name = name.strip().lower()
+            if name not in parsers:
+                if name:
+                    logger.warning(f"⚠️ 未知的解析级别: {name}")
+                continue
+            if name == 'claude' and not self.claude_client:
+                continue
+            parse_batch = self.parse_batch_with_claude if name == 'claude' else None
+            stages.append(ParseStage(name, parsers[name], self.parse_min_confidence[name], parse_batch))
+        self.parse_pipeline = ParsePipeline(stages, on_accept=self._on_parse_accepted)
+        
+    def _parse_from_cache(self, text: str) -> Optional[Dict[str, Any]]:
+        """解析缓存级别：相同输入在同一参考日期下解析结果相同"""
+        reference_date = datetime.datetime.now(self.timezone).date()
+        return self.parse_cache.get(text, self.parse_cache_version, reference_date)
+        
+    def _on_parse_accepted(self, stage: str, text: str, result: Dict[str, Any]):
+        """Claude的解析结果写入缓存，供之后相同的输入复用"""
+        if stage == 'claude':
+            reference_date = datetime.datetime.now(self.timezone).date()
+            self.parse_cache.put(text, self.parse_cache_version, reference_date, result)
+            
+    def init_mirror(self):
+        """初始化Notion本地SQLite镜像（配置了MIRROR_DB_PATH时启用）"""
+        self.mirror = None
+        if not self.mirror_db_path or not self.notion:
+            return
+            
+        try:
+            self.mirror = NotionMirror(
+                self.mirror_db_path,
+                iter_query=lambda database_id, **query: iter_notion_query(self.notion, database_id, **query),
+                database_id=self.database_id,
+                goals_database_id=self.goals_database_id,
+                timezone=self.timezone,
+                sync_interval=self.mirror_sync_interval
+            )
+            logger.info(f"✅ 本地镜像已启用: {self.mirror_db_path}")
+        except Exception as e:
+            logger.error(f"❌ 本地镜像初始化失败，将直接读取Notion: {e}")
+            
+    def _use_mirror(self) -> bool:
+        """读路径是否使用本地镜像（镜像由API后台任务或 --sync-mirror 同步，过期时直接读取Notion）"""
+        return self.mirror is not None and self.mirror.usable
+        
+    def _mirror_write_through(self, page: Dict[str, Any]):
+        """将Notion写入接口返回的页面回写本地镜像"""
+        if self.mirror:
+            try:
+                self.mirror.upsert_page(page)
+            except Exception as e:
+                logger.warning(f"⚠️ 回写本地镜像失败: {e}")
+        
+    def close(self):
+        """关闭API客户端，释放底层HTTP连接池"""
+        self.parse_cache.close()
+        if self.mirror:
+            self.mirror.close()
+        if self.notion:
+            self.notion.close()
+        if self.claude_client:
+            self.claude_client.close()
+        
     def parse_with_claude(self, text: str) -> Optional[Dict[str, Any]]:
         """使用Claude AI解析自然语言时间记录"""
         if not self.claude_client:
@@ -185,27 +391,9 @@ class SimpleTimeAgent:
             )
             
             # 解析JSON响应
-            content = response.content[0].text.strip()
-            if content.startswith('```json'):
-                content = content[7:-3].strip()
-            elif content.startswith('```'):
-                content = content[3:-3].strip()
-                
-            result = json.loads(content)
-            
-            # 验证和转换时间格式
-            start_time = datetime.datetime.fromisoformat(result['start_time'])
-            end_time = datetime.datetime.fromisoformat(result['end_time'])
-            
-            # 设置时区
-            if start_time.tzinfo is None:
-                start_time = self.timezone.localize(start_time)
-            if end_time.tzinfo is None:
-                end_time = self.timezone.localize(end_time)
-                
-            result['start_time'] = start_time
-            result['end_time'] = end_time
-            result['duration'] = int((end_time - start_time).total_seconds() / 60)
+            result = self._normalize_claude_result(json.loads(self._strip_code_fence(response.content[0].text)))
+            if not result:
+                raise ValueError("返回结果未通过校验")
             
             logger.info(f"🤖 Claude解析成功: {result['activity']} ({result['confidence']:.2f})")
             return result
@@ -214,112 +402,182 @@ class SimpleTimeAgent:
             logger.error(f"❌ Claude解析失败: {e}")
             return None
             
-    def parse_with_rules(self, text: str) -> Optional[Dict[str, Any]]:
-        """使用规则引擎解析时间记录"""
-        try:
-            # 简单的时间模式匹配
-            patterns = [
-                # 13点到13点40编程 (带分钟)
-                r'(\d{1,2})点到(\d{1,2})点(\d{1,2})(.+)',
-                # 7点到9点阅读
-                r'(\d{1,2})点到(\d{1,2})点(.+)',
-                # 14:30-16:00编程
-                r'(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})(.+)',
-                # 上午9点到11点开会
-                r'上午(\d{1,2})点到(\d{1,2})点(.+)',
-                # 晚上8点到9点运动
-                r'晚上(\d{1,2})点到(\d{1,2})点(.+)'
-            ]
+    def parse_batch_with_claude(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """使用Claude批量解析，多条输入共用一次请求（活动列表等提示词只发送一次）
+        
+        按 CLAUDE_BATCH_SIZE 条数和 CLAUDE_BATCH_TOKEN_BUDGET 预估输出token数分组，
+        每组一次请求，返回JSON数组。单条未通过校验时该条返回 None，不影响同组其他条目。
+        
+        Returns:
+            与 texts 等长的解析结果列表
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        if not self.claude_client or not texts:
+            return results
             
-            for pattern in patterns:
-                match = re.match(pattern, text.strip())
-                if match:
-                    return self._parse_matched_pattern(match, text)
+        for chunk in self._claude_batches(texts):
+            try:
+                items = self._request_claude_batch([texts[i] for i in chunk])
+            except Exception as e:
+                logger.error(f"❌ Claude批量解析失败 ({len(chunk)} 条): {e}")
+                continue
+                
+            for item in items:
+                try:
+                    position = int(item['index'])
+                    if not 0 <= position < len(chunk):
+                        continue
+                    results[chunk[position]] = self._normalize_claude_result(item)
+                except Exception as e:
+                    logger.warning(f"⚠️ Claude批量结果第 {item.get('index')} 条无效: {e}")
                     
+        parsed = sum(1 for result in results if result)
+        logger.info(f"🤖 Claude批量解析: {parsed}/{len(texts)} 条成功")
+        return results
+        
+    def _claude_batches(self, texts: List[str]) -> Iterator[List[int]]:
+        """按条数上限和输出token预算切分批次（每条结果约80个token加上描述文本）"""
+        chunk: List[int] = []
+        budget = 0
+        for i, text in enumerate(texts):
+            cost = 80 + len(text)
+            if chunk and (len(chunk) >= self.claude_batch_size or budget + cost > self.claude_batch_token_budget):
+                yield chunk
+                chunk, budget = [], 0
+            chunk.append(i)
+            budget += cost
+        if chunk:
+            yield chunk
+            
+    def _request_claude_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """发送一次批量解析请求，返回原始JSON数组"""
+        numbered = json.dumps([{"index": i, "text": text} for i, text in enumerate(texts)], ensure_ascii=False)
+        prompt = f"""
+请逐条解析以下时间记录文本，返回JSON数组，每条输入对应一个元素：
+
+输入列表: {numbered}
+
+当前时间: {datetime.datetime.now(self.timezone).strftime('%Y-%m-%d %H:%M:%S')}
+
+数组元素格式:
+{{
+    "index": 0,
+    "start_time": "YYYY-MM-DDTHH:MM:SS",
+    "end_time": "YYYY-MM-DDTHH:MM:SS", 
+    "activity": "活动名称",
+    "description": "详细描述",
+    "confidence": 0.95
+}}
+
+可识别的活动类型: {', '.join(self.activity_mapping.keys())}
+
+解析规则:
+1. index 与输入列表中的 index 一致，无法解析的条目可以省略
+2. 识别时间范围（开始和结束时间）
+3. 提取活动类型（必须从可识别列表中选择最相近的）
+4. 生成描述文本
+5. 评估每条的解析置信度(0-1)
+6. 如果是相对时间("2小时前"等)，基于当前时间计算绝对时间
+7. 时间格式必须是ISO格式
+
+只返回JSON数组，不要其他文字。
+"""
+        response = self.claude_client.messages.create(
+            model=self.claude_model,
+            max_tokens=self.claude_batch_token_budget,
+            temperature=self.claude_temperature,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        
+        items = json.loads(self._strip_code_fence(response.content[0].text))
+        if not isinstance(items, list):
+            raise ValueError("返回结果不是JSON数组")
+        return [item for item in items if isinstance(item, dict)]
+        
+    @staticmethod
+    def _strip_code_fence(content: str) -> str:
+        """去掉Claude回复中的Markdown代码块标记"""
+        content = content.strip()
+        if content.startswith('```json'):
+            content = content[7:-3].strip()
+        elif content.startswith('```'):
+            content = content[3:-3].strip()
+        return content
+        
+    def _normalize_claude_result(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """校验并转换Claude返回的单条结果，不合法时返回 None"""
+        # 验证和转换时间格式
+        start_time = datetime.datetime.fromisoformat(result['start_time'])
+        end_time = datetime.datetime.fromisoformat(result['end_time'])
+        
+        # 设置时区
+        if start_time.tzinfo is None:
+            start_time = self.timezone.localize(start_time)
+        if end_time.tzinfo is None:
+            end_time = self.timezone.localize(end_time)
+        if end_time <= start_time or not result.get('activity'):
             return None
             
+        result['start_time'] = start_time
+        result['end_time'] = end_time
+        result['confidence'] = float(result.get('confidence', 0.0))
+        result.setdefault('description', result['activity'])
+        result.pop('index', None)
+        
+        # Claude偶尔返回列表外的活动名，按关键词归一到已知活动
+        if result['activity'] not in self.activity_mapping:
+            matched = self.activity_matcher.find(f"{result['activity']}{result['description']}")
+            if matched:
+                result['activity'] = matched
+        result['duration'] = int((end_time - start_time).total_seconds() / 60)
+        return result
+        
+    def parse_with_rules(self, text: str) -> Optional[Dict[str, Any]]:
+        """使用规则引擎解析时间记录"""
+        try:
+            match = self.rule_engine.parse(text)
+            if not match:
+                return None
+            return self._rule_result(match, datetime.datetime.now(self.timezone).date())
+            
         except Exception as e:
             logger.error(f"❌ 规则解析失败: {e}")
             return None
             
-    def _parse_matched_pattern(self, match, original_text: str) -> Dict[str, Any]:
-        """解析匹配的时间模式"""
-        groups = match.groups()
-        now = datetime.datetime.now(self.timezone)
-        today = now.date()
+    def _rule_result(self, match: RuleMatch, reference_date: datetime.date) -> Dict[str, Any]:
+        """规则匹配结果落到参考日期上"""
+        midnight = self.timezone.localize(datetime.datetime.combine(reference_date, datetime.time.min))
+        start_time = self.timezone.normalize(midnight + datetime.timedelta(minutes=match.start_minutes))
+        end_time = self.timezone.normalize(midnight + datetime.timedelta(minutes=match.end_minutes))
         
-        if len(groups) == 4:  # 新模式: 13点到13点40编程
-            start_hour = int(groups[0])
-            end_hour = int(groups[1])
-            end_minute = int(groups[2])
-            activity_text = groups[3].strip()
-            
-            start_time = self.timezone.localize(
-                datetime.datetime.combine(today, datetime.time(start_hour, 0))
-            )
-            end_time = self.timezone.localize(
-                datetime.datetime.combine(today, datetime.time(end_hour, end_minute))
-            )
-            
-        elif len(groups) == 3:  # 简单模式: 7点到9点阅读
-            start_hour = int(groups[0])
-            end_hour = int(groups[1])
-            activity_text = groups[2].strip()
-            
-            start_time = self.timezone.localize(
-                datetime.datetime.combine(today, datetime.time(start_hour, 0))
-            )
-            end_time = self.timezone.localize(
-                datetime.datetime.combine(today, datetime.time(end_hour, 0))
-            )
-            
-        elif len(groups) == 5:  # 时分模式: 14:30-16:00编程
-            start_hour, start_min = int(groups[0]), int(groups[1])
-            end_hour, end_min = int(groups[2]), int(groups[3])
-            activity_text = groups[4].strip()
-            
-            start_time = self.timezone.localize(
-                datetime.datetime.combine(today, datetime.time(start_hour, start_min))
-            )
-            end_time = self.timezone.localize(
-                datetime.datetime.combine(today, datetime.time(end_hour, end_min))
-            )
-            
         # 匹配活动类型
-        activity = self._match_activity(activity_text)
+        activity = self._match_activity(match.description)
         
         return {
             'start_time': start_time,
             'end_time': end_time,
             'activity': activity,
-            'description': activity_text,
-            'duration': int((end_time - start_time).total_seconds() / 60),
-            'confidence': 0.8
+            'description': match.description,
+            'duration': match.end_minutes - match.start_minutes,
+            # 结束时刻靠推断顺延到下午/午夜时低于规则级别的采用阈值，交给后续级别确认
+            'confidence': 0.6 if activity == '其他' else 0.8 if match.inferred_end else 0.95
         }
         
     def _match_activity(self, text: str) -> str:
-        """匹配活动类型"""
-        for activity in self.activity_mapping.keys():
-            if activity in text:
-                return activity
-        return '其他'
+        """匹配活动类型（最早出现的活动关键词，同位置取最长）"""
+        return self.activity_matcher.find(text) or '其他'
+        
+    def parse_many(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """批量解析（分级管线，Claude级别合并为少量批量请求）"""
+        return self.parse_pipeline.parse_many(texts)
         
     def parse_natural_input(self, text: str) -> Optional[Dict[str, Any]]:
-        """解析自然语言输入（优先Claude策略）"""
+        """解析自然语言输入（分级管线：低成本级别置信度不足时才升级到Claude）"""
         logger.info(f"🔍 开始解析: {text}")
         
-        # 优先使用Claude AI（准确性高）
-        claude_result = self.parse_with_claude(text)
-        
-        # 如果Claude失败，使用规则引擎作为备选
-        if not claude_result:
-            rule_result = self.parse_with_rules(text)
-            if rule_result:
-                logger.info("⚙️ Claude解析失败，使用规则引擎")
-                return rule_result
-        else:
-            logger.info("🤖 使用Claude解析")
-            return claude_result
+        result = self.parse_pipeline.parse(text)
+        if result:
+            return result
             
         logger.error(f"❌ 无法解析输入: {text}")
         return None
@@ -360,6 +618,8 @@ class SimpleTimeAgent:
                 parent={"database_id": self.database_id},
                 properties=properties
             )
+            self._mirror_write_through(response)
+            self.goal_ledger.apply_record(response['id'], [goal_id] if goal_id else [], data['duration'])
             
             logger.info(f"✅ 成功保存到Notion: {activity} ({data['duration']}分钟)")
             return True
@@ -368,10 +628,16 @@ class SimpleTimeAgent:
             logger.error(f"❌ 保存到Notion失败: {e}")
             return False
             
-    def process_single_input(self, text: str) -> bool:
-        """处理单条输入（集成目标管理）"""
+    def process_single_input(self, text: str, parsed_data: Optional[Dict[str, Any]] = None) -> bool:
+        """处理单条输入（集成目标管理）
+        
+        Args:
+            text: 原始输入
+            parsed_data: 已有的解析结果（如批量文件预先用规则引擎解析），为空时走解析管线
+        """
         # 解析输入
-        parsed_data = self.parse_natural_input(text)
+        if parsed_data is None:
+            parsed_data = self.parse_natural_input(text)
         if not parsed_data:
             print(f"❌ 解析失败: {text}")
             return False
@@ -388,70 +654,116 @@ class SimpleTimeAgent:
         
         if success:
             # 如果匹配到目标，更新目标进度
+            actual_time = 0
             if matched_goal:
-                # 计算目标实际投入时间
+                # 计算目标实际投入时间（增量累计，O(1)）
                 actual_time = self.calculate_goal_actual_time(matched_goal.goal_id)
                 # 更新目标进度
                 self.update_goal_progress(matched_goal.goal_id, actual_time, matched_goal.estimated_time)
             
-            # 输出成功信息
-            start_time = parsed_data['start_time']
-            end_time = parsed_data['end_time']
-            activity = parsed_data['activity']
-            duration = parsed_data['duration']
-            confidence = parsed_data.get('confidence', 1.0)
-            category = self.activity_mapping.get(activity, '支出')
-            
-            print(f"✅ 记录成功! ({'🤖 Claude解析' if confidence > 0.9 else '⚙️ 规则解析'})")
-            print(f"📅 时间: {start_time.strftime('%m/%d %H:%M')} - {end_time.strftime('%H:%M')}")
-            print(f"⏱️ 时长: {duration}分钟")
-            print(f"🏷️ 活动: {activity} ({category})")
-            print(f"📝 描述: {parsed_data.get('description', '')}")
-            
-            # 显示目标关联信息
-            if matched_goal:
-                actual_time = self.calculate_goal_actual_time(matched_goal.goal_id)
-                progress = min(100, int(actual_time / matched_goal.estimated_time * 100)) if matched_goal.estimated_time > 0 else 0
-                print(f"🎯 关联目标: {matched_goal.title}")
-                print(f"📊 目标进度: {actual_time}/{matched_goal.estimated_time}分钟 ({progress}%)")
-                print(f"⏰ 截止日期: {matched_goal.date.strftime('%m/%d')}")
-            
-            print(f"🟢 识别置信度: {confidence*100:.0f}%")
+            self._print_record_result(parsed_data, matched_goal, actual_time)
             return True
         else:
             print(f"❌ 保存失败: {text}")
             return False
             
-    def process_batch_file(self, file_path: str) -> Tuple[int, int]:
-        """处理批量文件输入"""
-        success_count = 0
-        total_count = 0
+    def _print_record_result(self, parsed_data: Dict[str, Any], matched_goal: Optional[DailyGoal], actual_time: int):
+        """输出单条记录的保存结果"""
+        start_time = parsed_data['start_time']
+        end_time = parsed_data['end_time']
+        activity = parsed_data['activity']
+        duration = parsed_data['duration']
+        confidence = parsed_data.get('confidence', 1.0)
+        category = self.activity_mapping.get(activity, '支出')
+        
+        method_labels = {'Claude': '🤖 Claude解析', 'Cache': '💾 缓存解析', 'Rules': '⚙️ 规则解析'}
+        print(f"✅ 记录成功! ({method_labels.get(parsed_data.get('parsing_method'), '⚙️ 规则解析')})")
+        print(f"📅 时间: {start_time.strftime('%m/%d %H:%M')} - {end_time.strftime('%H:%M')}")
+        print(f"⏱️ 时长: {duration}分钟")
+        print(f"🏷️ 活动: {activity} ({category})")
+        print(f"📝 描述: {parsed_data.get('description', '')}")
+        
+        # 显示目标关联信息
+        if matched_goal:
+            progress = min(100, int(actual_time / matched_goal.estimated_time * 100)) if matched_goal.estimated_time > 0 else 0
+            print(f"🎯 关联目标: {matched_goal.title}")
+            print(f"📊 目标进度: {actual_time}/{matched_goal.estimated_time}分钟 ({progress}%)")
+            print(f"⏰ 截止日期: {matched_goal.date.strftime('%m/%d')}")
         
+        print(f"🟢 识别置信度: {confidence*100:.0f}%")
+        
+    def process_batch_file(self, file_path: str) -> Tuple[int, int]:
+        """处理批量文件输入（解析、目标匹配、写入三阶段流水线，按行序输出进度）"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+                line_count = sum(1 for _ in f)
                 
             print(f"📄 开始处理批量文件: {file_path}")
-            print(f"📝 共 {len(lines)} 条记录")
+            print(f"📝 共 {line_count} 条记录")
             print("-" * 50)
             
-            for i, line in enumerate(lines, 1):
-                line = line.strip()
-                if not line or line.startswith('#'):  # 跳过空行和注释
-                    continue
-                    
-                total_count += 1
-                print(f"[{i}/{len(lines)}] 处理: {line}")
+            # 目标进度在全部写入后按目标合并更新一次
+            touched_goals: Dict[str, DailyGoal] = {}
+            touched_lock = threading.Lock()
+            
+            def match(parsed_data: Dict[str, Any]) -> Optional[DailyGoal]:
+                if not self.goals_database_id:
+                    return None
+                return self.find_matching_goal(parsed_data['description'], parsed_data['start_time'].date())
                 
-                if self.process_single_input(line):
-                    success_count += 1
-                    print()
-                else:
+            def write(item: IngestItem) -> bool:
+                goal_id = item.goal.goal_id if item.goal else None
+                if not self.save_to_notion(item.parsed, goal_id):
+                    return False
+                if item.goal:
+                    item.extra['actual_time'] = self.calculate_goal_actual_time(goal_id)
+                    with touched_lock:
+                        touched_goals[goal_id] = item.goal
+                return True
+                
+            def report(item: IngestItem):
+                print(f"[{item.line_no}/{line_count}] 处理: {item.text}")
+                if item.error == 'parse':
+                    print(f"❌ 解析失败: {item.text}")
+                    print("⚠️ 处理失败\n")
+                elif not item.success:
+                    print(f"❌ 保存失败: {item.text}")
                     print("⚠️ 处理失败\n")
+                else:
+                    self._print_record_result(item.parsed, item.goal, item.extra.get('actual_time', 0))
+                    print()
+                    
+            pipeline = BatchIngestPipeline(
+                parse_batch=self.parse_many,
+                match=match,
+                write=write,
+                on_result=report,
+                batch_size=self.claude_batch_size,
+                parse_workers=self.batch_parse_workers,
+                write_workers=self.batch_write_workers,
+                queue_size=self.batch_queue_size
+            )
+            with open(file_path, 'r', encoding='utf-8') as f:
+                stats = pipeline.run(self._iter_batch_entries(f))
+                
+            for goal_id, goal in touched_goals.items():
+                actual_time = self.calculate_goal_actual_time(goal_id)
+                self.update_goal_progress(goal_id, actual_time, goal.estimated_time)
                     
             print("-" * 50)
-            print(f"📊 批量处理完成: {success_count}/{total_count} 成功")
-            return success_count, total_count
+            print(f"📊 批量处理完成: {stats.succeeded}/{stats.total} 成功"
+                  f"（解析失败 {stats.parse_failed}, 保存失败 {stats.write_failed}）")
+            notion_metrics = self.notion_throttle.metrics()
+            print(f"🚀 用时 {stats.elapsed:.1f}秒, {stats.throughput:.1f} 条/秒, 更新目标 {len(touched_goals)} 个")
+            print(f"🚦 Notion: {notion_metrics['calls']} 次请求, 重试 {notion_metrics['retries']} 次, "
+                  f"限流等待 {notion_metrics['throttled_wait']:.1f}秒, 退避等待 {notion_metrics['backoff_wait']:.1f}秒")
+            cache_stats = self.parse_cache.stats()
+            print(f"💾 解析缓存: 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次 "
+                  f"(命中率 {cache_stats['hit_rate']*100:.0f}%)")
+            for stage, stage_stats in self.parse_pipeline.stats().items():
+                print(f"⏱️ {stage}: 采用 {stage_stats['accepted']}/{stage_stats['calls']} 次, "
+                      f"p50 {stage_stats['p50_ms']}ms, p95 {stage_stats['p95_ms']}ms")
+            return stats.succeeded, stats.total
             
         except FileNotFoundError:
             print(f"❌ 文件不存在: {file_path}")
@@ -459,113 +771,174 @@ class SimpleTimeAgent:
         except Exception as e:
             print(f"❌ 批量处理失败: {e}")
             return 0, 0
+            
+    def _iter_batch_entries(self, lines: Iterable[str], chunk_lines: int = 1000) -> Iterator[Tuple[int, str, Optional[Dict[str, Any]]]]:
+        """逐块读取批量文件，每块用规则引擎一次遍历解析
+        
+        Yields:
+            (行号, 文本, 规则解析结果)；规则置信度不足的行结果为 None，交给解析管线
+        """
+        use_rules = any(stage.name == 'rules' for stage in self.parse_pipeline.stages)
+        reference_date = datetime.datetime.now(self.timezone).date()
+        iterator = iter(lines)
+        offset = 0
+        
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_lines))
+            if not chunk:
+                return
+            for i, line, match in self.rule_engine.scan(''.join(chunk)):
+                line = line.strip()
+                if not line or line.startswith('#'):  # 跳过空行和注释
+                    continue
+                    
+                parsed_data = None
+                if use_rules and match:
+                    parsed_data = self._rule_result(match, reference_date)
+                    if parsed_data['confidence'] < self.parse_min_confidence['rules']:
+                        parsed_data = None
+                    else:
+                        parsed_data['parsing_method'] = 'Rules'
+                yield offset + i, line, parsed_data
+            offset += len(chunk)
     
     # ==================== 目标管理功能 ====================
     
     def query_active_goals(self, current_date: datetime.date) -> List[DailyGoal]:
-        """查询活跃目标（截止日期>=今天且未完成）"""
+        """查询活跃目标（截止日期>=今天且未完成），结果按日期缓存"""
         if not self.notion or not self.goals_database_id:
             logger.warning("Goals数据库未配置，无法查询目标")
             return []
             
         try:
-            # 构建查询条件：截止日期>=今天 且 状态!=Completed
-            filter_condition = {
-                "and": [
-                    {
-                        "property": "Deadline",
-                        "date": {
-                            "on_or_after": current_date.isoformat()
-                        }
-                    },
-                    {
-                        "property": "Status", 
-                        "status": {
-                            "does_not_equal": "Completed"
-                        }
+            return self.active_goal_cache.get(current_date, lambda: self._fetch_active_goals(current_date))
+        except Exception as e:
+            logger.error(f"❌ 查询目标失败: {e}")
+            return []
+            
+    def _fetch_active_goals(self, current_date: datetime.date) -> List[DailyGoal]:
+        """从数据源读取活跃目标（失败时抛出异常，避免缓存空结果）"""
+        # 构建查询条件：截止日期>=今天 且 状态!=Completed
+        filter_condition = {
+            "and": [
+                {
+                    "property": "Deadline",
+                    "date": {
+                        "on_or_after": current_date.isoformat()
                     }
-                ]
-            }
+                },
+                {
+                    "property": "Status", 
+                    "status": {
+                        "does_not_equal": "Completed"
+                    }
+                }
+            ]
+        }
+        
+        if self._use_mirror():
+            pages = self.mirror.active_goal_pages(current_date)
+        else:
+            pages = iter_notion_query(self.notion, self.goals_database_id, filter=filter_condition)
             
-            response = self.notion.databases.query(
-                database_id=self.goals_database_id,
-                filter=filter_condition
-            )
+        goals = []
+        for page in pages:
+            goal = self._parse_goal_page(page)
+            if goal:
+                goals.append(goal)
+                
+        logger.info(f"📋 查询到 {len(goals)} 个目标")
+        return goals
+    
+    def query_completed_goals(
+        self, since: datetime.datetime
+    ) -> List[Tuple[DailyGoal, datetime.datetime, datetime.datetime]]:
+        """查询 since 之后完成的目标（状态为Completed且之后有编辑），附带创建时间与最后编辑时间"""
+        if not self.notion or not self.goals_database_id:
+            logger.warning("Goals数据库未配置，无法查询目标")
+            return []
             
+        try:
+            if self._use_mirror():
+                pages = self.mirror.completed_goal_pages(since)
+            else:
+                filter_condition = {
+                    "and": [
+                        {
+                            "property": "Status",
+                            "status": {
+                                "equals": "Completed"
+                            }
+                        },
+                        {
+                            "timestamp": "last_edited_time",
+                            "last_edited_time": {
+                                "on_or_after": since.isoformat()
+                            }
+                        }
+                    ]
+                }
+                pages = iter_notion_query(self.notion, self.goals_database_id, filter=filter_condition)
+                
             goals = []
-            for page in response.get('results', []):
-                try:
-                    props = page['properties']
-                    
-                    # 提取目标数据
-                    title = props.get('Goal Title', {}).get('title', [{}])[0].get('text', {}).get('content', '')
-                    if not title:  # 如果Goal Title为空，尝试从主标题获取
-                        title = props.get('Goal Title', {}).get('title', [{}])[0].get('plain_text', '')
-                    
-                    date_str = props.get('Deadline', {}).get('date', {}).get('start', '')
-                    estimated_time = props.get('Estimated Time', {}).get('number', 0)
-                    priority = props.get('Priority', {}).get('select', {}).get('name', 'Medium')
-                    status = props.get('Status', {}).get('status', {}).get('name', 'Planned')
-                    progress = props.get('Progress', {}).get('number', 0)
-                    
-                    if title and date_str:
-                        goal_date = datetime.datetime.fromisoformat(date_str).date()
-                        goals.append(DailyGoal(
-                            goal_id=page['id'],
-                            title=title,
-                            date=goal_date,
-                            estimated_time=estimated_time or 0,
-                            priority=priority,
-                            status=status,
-                            progress=progress or 0
-                        ))
-                        
-                except Exception as e:
-                    logger.warning(f"解析目标记录失败: {e}")
-                    continue
-                    
-            logger.info(f"📋 查询到 {len(goals)} 个目标")
+            for page in pages:
+                goal = self._parse_goal_page(page)
+                created, edited = page.get('created_time'), page.get('last_edited_time')
+                if goal and created and edited:
+                    goals.append((
+                        goal,
+                        datetime.datetime.fromisoformat(created.replace('Z', '+00:00')),
+                        datetime.datetime.fromisoformat(edited.replace('Z', '+00:00'))
+                    ))
             return goals
             
         except Exception as e:
-            logger.error(f"❌ 查询目标失败: {e}")
+            logger.error(f"❌ 查询已完成目标失败: {e}")
             return []
     
+    def _parse_goal_page(self, page: Dict[str, Any]) -> Optional[DailyGoal]:
+        """将Goals数据库的Notion页面解析为DailyGoal"""
+        try:
+            props = page['properties']
+            
+            # 提取目标数据
+            title = props.get('Goal Title', {}).get('title', [{}])[0].get('text', {}).get('content', '')
+            if not title:  # 如果Goal Title为空，尝试从主标题获取
+                title = props.get('Goal Title', {}).get('title', [{}])[0].get('plain_text', '')
+            
+            date_str = props.get('Deadline', {}).get('date', {}).get('start', '')
+            estimated_time = props.get('Estimated Time', {}).get('number', 0)
+            priority = props.get('Priority', {}).get('select', {}).get('name', 'Medium')
+            status = props.get('Status', {}).get('status', {}).get('name', 'Planned')
+            progress = props.get('Progress', {}).get('number', 0)
+            
+            if title and date_str:
+                goal_date = datetime.datetime.fromisoformat(date_str).date()
+                return DailyGoal(
+                    goal_id=page['id'],
+                    title=title,
+                    date=goal_date,
+                    estimated_time=estimated_time or 0,
+                    priority=priority,
+                    status=status,
+                    progress=progress or 0
+                )
+                
+        except Exception as e:
+            logger.warning(f"解析目标记录失败: {e}")
+            
+        return None
+    
     def find_matching_goal(self, activity_text: str, current_date: datetime.date) -> Optional[DailyGoal]:
         """智能匹配时间记录与活跃目标（基于deadline逻辑）"""
         goals = self.query_active_goals(current_date)
         if not goals:
             return None
             
-        # 简单关键词匹配
-        activity_lower = activity_text.lower()
-        best_match = None
-        best_score = 0
-        
-        for goal in goals:
-            goal_lower = goal.title.lower()
-            
-            # 计算匹配分数 - 双向匹配
-            score = 0
-            
-            # 方向1：活动描述的词在目标中
-            words = activity_lower.split()
-            for word in words:
-                if len(word) > 1 and word in goal_lower:
-                    score += len(word)
-            
-            # 方向2：目标的词在活动描述中
-            goal_words = goal_lower.split()
-            for word in goal_words:
-                if len(word) > 1 and word in activity_lower:
-                    score += len(word)
-            
-            if score > best_score:
-                best_score = score
-                best_match = goal
-                
-        # 需要至少2分的匹配分数
-        if best_score >= 2:
+        # 倒排索引匹配（缓存命中时目标列表对象不变，索引无需同步）
+        match = self.goal_matcher.match(activity_text, goals)
+        if match:
+            best_match, best_score = match
             logger.info(f"🎯 找到匹配目标: {activity_text} -> {best_match.title} (分数: {best_score})")
             return best_match
         else:
@@ -573,42 +946,40 @@ class SimpleTimeAgent:
             return None
     
     def calculate_goal_actual_time(self, goal_id: str) -> int:
-        """计算目标的实际投入时间"""
-        if not self.notion:
-            return 0
+        """计算目标的实际投入时间（增量维护的累计值，首次查询时从数据源重建）"""
+        return self.calculate_goals_actual_time([goal_id]).get(goal_id, 0)
+            
+    def calculate_goals_actual_time(self, goal_ids: List[str]) -> Dict[str, int]:
+        """批量计算多个目标的实际投入时间（未缓存的目标合并为一次查询）"""
+        if not self.notion or not goal_ids:
+            return {}
             
         try:
-            # 查询关联到此目标的所有时间记录
-            filter_condition = {
-                "property": "Goal",
-                "relation": {
-                    "contains": goal_id
-                }
-            }
+            return self.goal_ledger.get_many(goal_ids)
+        except Exception as e:
+            logger.error(f"❌ 计算目标时间失败: {e}")
+            return {}
             
-            response = self.notion.databases.query(
-                database_id=self.database_id,
-                filter=filter_condition
-            )
+    def _load_goal_records(self, goal_ids: List[str]) -> List[Tuple[str, List[str], int]]:
+        """从数据源读取关联到任一目标的全部时间记录 (记录ID, 关联目标ID列表, 时长)"""
+        if self._use_mirror():
+            return self.mirror.goal_records(goal_ids)
             
-            total_time = 0
-            for page in response.get('results', []):
-                props = page['properties']
-                
-                # 使用Duration (Minutes)字段 - 现在是number类型
-                duration_number = props.get('Duration (Minutes)', {}).get('number')
-                if duration_number is not None:
-                    try:
-                        duration = int(duration_number)
-                        total_time += duration
-                    except:
-                        continue
-                        
-            return total_time
+        # Notion复合过滤条件最多100个子条件，按块合并查询关联到这些目标的记录
+        records = {}
+        for i in range(0, len(goal_ids), NOTION_PAGE_SIZE):
+            filter_condition = {
+                "or": [
+                    {"property": "Goal", "relation": {"contains": goal_id}}
+                    for goal_id in goal_ids[i:i + NOTION_PAGE_SIZE]
+                ]
+            }
             
-        except Exception as e:
-            logger.error(f"❌ 计算目标时间失败: {e}")
-            return 0
+            # 逐页读取，记录数超过100条时也不会被截断
+            for page in iter_notion_query(self.notion, self.database_id, filter=filter_condition):
+                record_goal_ids, duration = page_goal_contribution(page)
+                records[page['id']] = (page['id'], record_goal_ids, duration)
+        return list(records.values())
     
     def update_goal_progress(self, goal_id: str, actual_time: int, estimated_time: int) -> bool:
         """更新目标进度和状态"""
@@ -639,10 +1010,17 @@ class SimpleTimeAgent:
                 "Progress": {"number": progress}
             }
             
-            self.notion.pages.update(
+            response = self.notion.pages.update(
                 page_id=goal_id,
                 properties=properties
             )
+            self._mirror_write_through(response)
+            
+            # 已完成的目标退出活跃集合；其余只需更新缓存中的进度
+            if status == "Completed":
+                self.active_goal_cache.invalidate(goal_id)
+            else:
+                self.active_goal_cache.refresh_goal(goal_id, status=status, progress=progress)
             
             logger.info(f"📊 目标进度已更新: {progress}% ({status})")
             return True
@@ -679,79 +1057,87 @@ class SimpleTimeAgent:
                 
     def query_notion_data(self, start_date: datetime.date, end_date: datetime.date) -> List[Dict]:
         """查询Notion数据库中的时间记录"""
+        records = list(self.iter_notion_records(start_date, end_date))
+        logger.info(f"📊 查询到 {len(records)} 条记录")
+        return records
+        
+    def iter_notion_records(self, start_date: datetime.date, end_date: datetime.date) -> Iterator[Dict]:
+        """逐条读取日期范围内的时间记录（按页流式拉取，内存占用与总条数无关）"""
         if not self.notion:
-            return []
+            return
+            
+        # 构建查询条件
+        filter_condition = {
+            "and": [
+                {
+                    "property": "Start Time",
+                    "date": {
+                        "on_or_after": start_date.isoformat()
+                    }
+                },
+                {
+                    "property": "Start Time", 
+                    "date": {
+                        "on_or_before": end_date.isoformat()
+                    }
+                }
+            ]
+        }
+        
+        try:
+            if self._use_mirror():
+                pages = self.mirror.iter_record_pages(start_date, end_date)
+            else:
+                pages = iter_notion_query(self.notion, self.database_id, filter=filter_condition)
+                
+            for page in pages:
+                record = self._parse_record_page(page)
+                if record:
+                    yield record
+                    
+        except Exception as e:
+            logger.error(f"❌ 查询Notion数据失败: {e}")
             
+    def _parse_record_page(self, page: Dict[str, Any]) -> Optional[Dict]:
+        """将时间记录数据库的Notion页面解析为记录字典"""
         try:
-            # 构建查询条件
-            filter_condition = {
-                "and": [
-                    {
-                        "property": "Start Time",
-                        "date": {
-                            "on_or_after": start_date.isoformat()
-                        }
-                    },
-                    {
-                        "property": "Start Time", 
-                        "date": {
-                            "on_or_before": end_date.isoformat()
-                        }
-                    }
-                ]
-            }
+            props = page['properties']
             
-            response = self.notion.databases.query(
-                database_id=self.database_id,
-                filter=filter_condition
-            )
+            # 提取数据
+            task = props.get('Task', {}).get('title', [{}])[0].get('text', {}).get('content', '')
+            expense_item = props.get('支出项', {}).get('select', {})
+            expense_item = expense_item.get('name', '') if expense_item else ''
             
-            records = []
-            for page in response.get('results', []):
+            start_time_str = props.get('Start Time', {}).get('date', {}).get('start', '')
+            end_time_str = props.get('End Time', {}).get('date', {}).get('start', '')
+            
+            # 计算duration（如果有开始和结束时间）
+            duration = 0
+            if start_time_str and end_time_str:
                 try:
-                    props = page['properties']
-                    
-                    # 提取数据
-                    task = props.get('Task', {}).get('title', [{}])[0].get('text', {}).get('content', '')
-                    expense_item = props.get('支出项', {}).get('select', {})
-                    expense_item = expense_item.get('name', '') if expense_item else ''
-                    
-                    start_time_str = props.get('Start Time', {}).get('date', {}).get('start', '')
-                    end_time_str = props.get('End Time', {}).get('date', {}).get('start', '')
-                    
-                    # 计算duration（如果有开始和结束时间）
+                    start_dt = datetime.datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
+                    end_dt = datetime.datetime.fromisoformat(end_time_str.replace('Z', '+00:00'))
+                    duration = int((end_dt - start_dt).total_seconds() / 60)
+                except:
                     duration = 0
-                    if start_time_str and end_time_str:
-                        try:
-                            start_dt = datetime.datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
-                            end_dt = datetime.datetime.fromisoformat(end_time_str.replace('Z', '+00:00'))
-                            duration = int((end_dt - start_dt).total_seconds() / 60)
-                        except:
-                            duration = 0
-                    
-                    # 根据活动类型推断category
-                    category = self.activity_mapping.get(expense_item, '支出')
-                    
-                    if start_time_str and end_time_str:
-                        records.append({
-                            'task': task,
-                            'expense_item': expense_item,
-                            'start_time': datetime.datetime.fromisoformat(start_time_str.replace('Z', '+00:00')),
-                            'end_time': datetime.datetime.fromisoformat(end_time_str.replace('Z', '+00:00')),
-                            'duration': duration or 0,
-                            'category': category
-                        })
-                        
-                except Exception as e:
-                    logger.warning(f"解析记录失败: {e}")
-                    continue
-                    
-            logger.info(f"📊 查询到 {len(records)} 条记录")
-            return records
             
+            # 根据活动类型推断category
+            category = self.activity_mapping.get(expense_item, '支出')
+            
+            if start_time_str and end_time_str:
+                return {
+                    'task': task,
+                    'expense_item': expense_item,
+                    'start_time': datetime.datetime.fromisoformat(start_time_str.replace('Z', '+00:00')),
+                    'end_time': datetime.datetime.fromisoformat(end_time_str.replace('Z', '+00:00')),
+                    'duration': duration or 0,
+                    'category': category
+                }
+                
         except Exception as e:
-            logger.error(f"❌ 查询Notion数据失败: {e}")
-            return []
+            logger.warning(f"解析记录失败: {e}")
+            
+        return None
             
     def generate_daily_report(self, target_date: Optional[datetime.date] = None) -> str:
         """生成日报（控制台输出）"""
@@ -830,30 +1216,31 @@ class SimpleTimeAgent:
         
         print(f"📊 生成周报: {week_start} 到 {week_end}")
         
-        # 查询本周数据
-        records = self.query_notion_data(week_start, week_end)
-        
-        if not records:
-            print("❌ 本周暂无时间记录")
-            return False
-            
-        # 统计数据
-        total_duration = sum(record['duration'] for record in records)
-        week_total_minutes = 7 * 24 * 60  # 一周总分钟数
-        unrecorded_minutes = week_total_minutes - total_duration
-        effective_rate = total_duration / week_total_minutes * 100
-        
+        # 逐条读取本周数据并累计统计（不保留原始记录）
+        record_count = 0
+        total_duration = 0
         category_stats = {}
         activity_stats = {}
         
-        for record in records:
+        for record in self.iter_notion_records(week_start, week_end):
             category = record['category'] or '支出'
             activity = record['expense_item'] or '未知活动'
             duration = record['duration']
             
+            record_count += 1
+            total_duration += duration
             category_stats[category] = category_stats.get(category, 0) + duration
             activity_stats[activity] = activity_stats.get(activity, 0) + duration
             
+        if not record_count:
+            print("❌ 本周暂无时间记录")
+            return False
+            
+        # 统计数据
+        week_total_minutes = 7 * 24 * 60  # 一周总分钟数
+        unrecorded_minutes = week_total_minutes - total_duration
+        effective_rate = total_duration / week_total_minutes * 100
+        
         # 计算分类比例
         production_time = category_stats.get('生产', 0)
         investment_time = category_stats.get('投资', 0) 
@@ -986,6 +1373,7 @@ def main():
   python time_agent.py --file input.txt         # 批量输入
   python time_agent.py --daily-report           # 生成日报
   python time_agent.py --weekly-report          # 生成周报
+  python time_agent.py --sync-mirror            # 全量同步本地镜像
         """
     )
     
@@ -994,6 +1382,7 @@ def main():
     parser.add_argument('--daily-report', action='store_true', help='生成日报')
     parser.add_argument('--weekly-report', action='store_true', help='生成周报')
     parser.add_argument('--date', help='指定日期 (YYYY-MM-DD)')
+    parser.add_argument('--sync-mirror', action='store_true', help='全量同步本地镜像（需配置MIRROR_DB_PATH）')
     
     args = parser.parse_args()
     
@@ -1007,7 +1396,13 @@ def main():
             target_date = datetime.datetime.strptime(args.date, '%Y-%m-%d').date()
             
         # 根据参数执行相应功能
-        if args.daily_report:
+        if args.sync_mirror:
+            if agent.mirror:
+                changed = agent.mirror.sync(full=True)
+                print(f"✅ 本地镜像同步完成: {changed} 个页面变更")
+            else:
+                print("❌ 未配置MIRROR_DB_PATH，本地镜像未启用")
+        elif args.daily_report:
             agent.generate_daily_report(target_date)
         elif args.weekly_report:
             agent.generate_weekly_report(target_date)